@@ -8,9 +8,12 @@ AI处理器基类 - 统一处理所有AI功能
 from typing import final
 from collections.abc import AsyncGenerator
 
+from ..core.io_executor import run_io
 from .core import AIEngine
 from .config import PromptConfigFactory
-from .memory.session_resolver import SessionResolver
+from .memory.chat_history import DEFAULT_HISTORY_TOKENS
+from .memory.history_store import HistoryBackend
+from .memory.session_resolver import SessionResolver, session_id_for
 from .template import TemplateBuilder
 from .history import HistoryManager
 
@@ -19,13 +22,21 @@ from .history import HistoryManager
 class AIProcessor:
     """通用AI处理器 - 通过任务类型处理不同功能"""
 
-    def __init__(self, task_type: str, ai_engine: AIEngine):
+    def __init__(
+        self,
+        task_type: str,
+        ai_engine: AIEngine,
+        history_backend: HistoryBackend | None = None,
+        history_tokens: int = DEFAULT_HISTORY_TOKENS
+    ):
         """
         初始化处理器
 
         Args:
             task_type: 任务类型 ('optimize', 'advise', 'edit')
             ai_engine: AI 引擎实例
+            history_backend: 会话历史存储后端，为空时使用 JSONL 文件
+            history_tokens: 放入提示词的历史 token 预算（仅 advise/edit）
         """
         self.task_type = task_type
         self.ai_engine = ai_engine
@@ -44,10 +55,10 @@ class AIProcessor:
 
         if task_type == "advise":
             self.history_input_key = "question"
-            self.history_manager = HistoryManager(self.ai_engine)
+            self.history_manager = HistoryManager(self.ai_engine, history_backend, history_tokens)
         elif task_type == "edit":
             self.history_input_key = "requirement"
-            self.history_manager = HistoryManager(self.ai_engine)
+            self.history_manager = HistoryManager(self.ai_engine, history_backend, history_tokens)
 
     async def process_stream(self, **kwargs) -> AsyncGenerator[str, None]:
         """
@@ -86,8 +97,10 @@ class AIProcessor:
         if not self.history_manager:
             raise ValueError("当前任务类型不支持历史记忆")
 
-        # 内部解析 session_id
-        session_id = self.session_resolver.resolve(self.task_type, **kwargs)
+        # 内部解析 session_id（笔记路径的哈希），并把笔记路径登记到反向索引
+        note_path = self.session_resolver.resolve_note_path(self.task_type, **kwargs)
+        session_id = session_id_for(note_path)
+        await run_io(self.history_manager.register_session, session_id, note_path)
 
         # 验证必需参数
         for param in self.config.params:
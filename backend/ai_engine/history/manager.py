@@ -4,37 +4,60 @@
 """
 from importlib import import_module
 
-from ..memory.chat_history import FileChatMessageHistory
+from ..memory.chat_history import DEFAULT_HISTORY_TOKENS, SummaryChatMessageHistory
+from ..memory.history_store import HistoryBackend, JsonlHistoryBackend
 from ..memory.summarizer import Summarizer
 
 
 class HistoryManager:
     """对话历史管理器"""
 
-    def __init__(self, ai_engine):
+    def __init__(
+        self,
+        ai_engine,
+        backend: HistoryBackend | None = None,
+        max_history_tokens: int = DEFAULT_HISTORY_TOKENS
+    ):
         """初始化历史管理器
 
         Args:
             ai_engine: AI引擎实例，用于摘要生成
+            backend: 会话历史存储后端，为空时使用 JSONL 文件
+            max_history_tokens: 历史（摘要 + 消息）的 token 预算
         """
         self.ai_engine = ai_engine
+        self.backend = backend or JsonlHistoryBackend()
+        self.max_history_tokens = max_history_tokens
         self.summarizer = Summarizer()
+        # 摘要函数只依赖引擎实例，创建一次供所有会话复用
+        self._summarize = self.summarizer.to_callable(ai_engine)
 
-    def get_session_history(self, session_id: str) -> FileChatMessageHistory:
+    def get_session_history(self, session_id: str) -> SummaryChatMessageHistory:
         """获取指定会话的历史记录
 
+        历史对象本身很轻（不做磁盘操作），已解析的消息由进程内会话缓存复用
+
         Args:
             session_id: 会话ID
 
         Returns:
-            FileChatMessageHistory实例
+            会话历史实例（具体类型取决于存储后端）
         """
-        summarizer_callable = self.summarizer.to_callable(self.ai_engine)
-        return FileChatMessageHistory(
-            session_id=session_id,
-            summarizer=summarizer_callable
+        return self.backend.get_history(
+            session_id,
+            max_history_tokens=self.max_history_tokens,
+            summarizer=self._summarize
         )
 
+    def register_session(self, session_id: str, note_path: str) -> None:
+        """登记会话所属的笔记（写入存储后端的反向索引）
+
+        Args:
+            session_id: 会话ID
+            note_path: 规范化的知识库相对路径
+        """
+        self.backend.register_session(session_id, note_path)
+
     def create_chain_with_history(self, base_chain, history_input_key: str):
         """创建带历史记录的链
 
@@ -2,8 +2,30 @@
 AI 对话记忆子包
 为 AI 引擎提供会话历史存储和会话标识解析功能
 """
-from .chat_history import FileChatMessageHistory
-from .session_resolver import SessionResolver
+from .chat_history import FileChatMessageHistory, SummaryChatMessageHistory
+from .history_store import HistoryBackend, JsonlHistoryBackend, create_history_backend
+from .rollup_queue import RollupQueue, rollup_queue
+from .session_cache import SessionCache, session_cache
+from .session_lock import SessionLockManager, session_locks
+from .session_index import SessionIndex
+from .session_resolver import SessionResolver, normalize_note_path, session_id_for
 from .summarizer import Summarizer
 
-__all__ = ["FileChatMessageHistory", "SessionResolver", "Summarizer"]
+__all__ = [
+    "FileChatMessageHistory",
+    "SummaryChatMessageHistory",
+    "HistoryBackend",
+    "JsonlHistoryBackend",
+    "create_history_backend",
+    "RollupQueue",
+    "rollup_queue",
+    "SessionCache",
+    "session_cache",
+    "SessionLockManager",
+    "session_locks",
+    "SessionIndex",
+    "SessionResolver",
+    "normalize_note_path",
+    "session_id_for",
+    "Summarizer",
+]
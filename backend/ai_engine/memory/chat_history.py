@@ -1,152 +1,699 @@
 """
 文件会话历史存储（LangChain 版）
 负责 jsonl 持久化 + 摘要滚动
+
+会话文件是只追加的日志：
+- message 记录：每轮新增的消息，一次 write 追加到文件末尾
+- checkpoint 记录：摘要滚动后的完整状态（摘要 + 保留的消息），之前的记录全部失效
+- summary 记录：旧格式文件开头的摘要，仍可读取
+
+读取时只需解析最后一个 checkpoint 及其之后的记录，热会话直接使用进程内缓存；
+失效记录超过阈值时在后台重写文件，只保留最新状态；
+长期闲置的会话压缩后移入归档目录，下次读写时自动解压恢复（见 session_archive）
+
+新消息立即落盘，超出轮数上限时的摘要滚动交给后台队列（见 rollup_queue）；
+同一会话的写入由会话锁串行化（进程内 asyncio 锁 + 跨进程建议锁，见 session_lock）
 """
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Awaitable, Callable, Sequence
+from typing import Awaitable, BinaryIO, Callable, Iterator, Sequence
 
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import BaseMessage, SystemMessage, message_to_dict, messages_from_dict
 
+from ...core import ConflictException, get_logger
+from ...core.io_executor import run_io
+from ..token_estimator import estimate_message_tokens, estimate_tokens
+from .rollup_queue import RollupQueue, rollup_queue
+from .session_archive import ARCHIVE_SUFFIX, compress_session, decompress_session
+from .session_cache import SessionCache, session_cache
+from .session_lock import session_locks
+
+logger = get_logger(__name__)
+
 SUMMARY_PREFIX = "历史摘要：\n"
 
+# 默认的历史 token 预算（摘要 + 保留的消息）
+DEFAULT_HISTORY_TOKENS = 4000
+
+# 滚动后保留的最近消息占预算的比例，留出余量避免每轮都触发滚动
+_ROLLUP_KEEP_RATIO = 0.5
+
+# 默认会话存储目录
+DEFAULT_SESSIONS_DIR = Path(__file__).resolve().parents[1] / "data" / "ai_sessions"
+
+# 从文件末尾向前查找 checkpoint 时的读取块大小
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+# checkpoint 记录的行前缀（记录以 type 字段开头，无需解析 JSON 即可识别）
+_CHECKPOINT_PREFIX = b'{"type": "checkpoint"'
+
+# 后台压缩等待会话锁的最长时间（秒），会话正忙时直接跳过
+_COMPACT_LOCK_TIMEOUT = 5.0
+
+# 同一会话文件的追加与压缩互斥
+_file_locks: dict[Path, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+# 正在执行的后台压缩任务（持有引用，避免任务被回收）
+_compaction_tasks: set[asyncio.Task] = set()
+
+
+def _fingerprint(file_stat: os.stat_result) -> tuple[int, int]:
+    """会话文件版本 (mtime_ns, size)"""
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def _file_lock(path: Path) -> threading.Lock:
+    """获取会话文件对应的锁"""
+    with _file_locks_guard:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = _file_locks[path] = threading.Lock()
+        return lock
 
-class FileChatMessageHistory(BaseChatMessageHistory):
-    """基于 jsonl 的会话历史存储"""
+
+class SummaryChatMessageHistory(BaseChatMessageHistory):
+    """
+    带摘要滚动的会话历史基类
+
+    摘要与消息的估算 token 数超过预算时，把最早的若干轮合并进摘要；
+    提供给模型的窗口同样按预算选取，滚动尚未完成时提示词也不会超出预算。子类只需实现存储：
+    _load 读取 (摘要, 消息)，_append 追加消息或写入滚动后的完整状态，_clear 清空会话，
+    _lock_path 返回跨进程建议锁的锁文件
+    """
 
     def __init__(
         self,
         session_id: str,
-        base_dir: Path | None = None,
-        max_history_rounds: int = 20,
-        trim_rounds: int = 6,
-        summarizer: Callable[[str | None, list[BaseMessage]], Awaitable[str]] | None = None
+        max_history_tokens: int = DEFAULT_HISTORY_TOKENS,
+        summarizer: Callable[[str | None, list[BaseMessage]], Awaitable[str]] | None = None,
+        lock_timeout: float | None = None,
+        rollup_queue: RollupQueue | None = rollup_queue
     ):
+        """
+        Args:
+            session_id: 会话 ID
+            max_history_tokens: 历史（摘要 + 消息）的 token 预算，超出时滚动摘要
+            summarizer: 摘要生成函数
+            lock_timeout: 等待会话锁的最长时间（秒），为 None 时使用会话锁管理器的默认值
+            rollup_queue: 后台摘要滚动队列，为 None 时在写入后直接滚动
+        """
         self.session_id = session_id
-        backend_dir = Path(__file__).resolve().parents[1]
-        self.base_dir = base_dir or (backend_dir / "data" / "ai_sessions")
-        self.base_dir.mkdir(parents=True, exist_ok=True)
-        self.max_history_rounds = max_history_rounds
-        self.trim_rounds = trim_rounds
+        self.max_history_tokens = max_history_tokens
         self.summarizer = summarizer
+        self.lock_timeout = lock_timeout
+        self.rollup_queue = rollup_queue
 
     @property
     def messages(self) -> list[BaseMessage]:
         summary, history = self._load()
+        history = self._select_window(summary, history)
         if summary:
             return [SystemMessage(content=f"{SUMMARY_PREFIX}{summary}")] + history
         return history
 
-    def clear(self) -> None:
-        session_path = self._get_session_path()
-        session_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(session_path, "w", encoding="utf-8") as f:
-            f.write("")
+    async def aget_messages(self) -> list[BaseMessage]:
+        # 在 I/O 线程池中读取，避免阻塞流式输出
+        return await run_io(lambda: self.messages)
+
+    async def aclear(self) -> None:
+        async with self._hold():
+            await run_io(self._clear)
 
     async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
-        summary, history = self._load()
-        history.extend(messages)
+        # 新消息立即追加，摘要滚动不占用本次请求
+        async with self._hold():
+            await run_io(self._append, messages)
+            if not self.summarizer:
+                return
+            summary, history = await run_io(self._load)
 
-        if self.summarizer:
-            summary, history = await self._rollup_summary(summary, history)
+        if self._count_tokens(summary, history) <= self.max_history_tokens:
+            return
+        # 最近一轮本身就超出保留预算时没有可合并的轮次，不必每轮都提交滚动
+        if self._rollup_start(history) == 0:
+            return
+        if self.rollup_queue is None:
+            await self.rollup()
+        else:
+            self.rollup_queue.submit(self._lock_key(), self)
 
-        self._save(summary, history)
+    async def rollup(self) -> bool:
+        """
+        把超出 token 预算的最早若干轮合并进摘要（通常由后台滚动队列调用）
+
+        生成摘要期间不持有会话锁；写回时重新读取会话，被合并的消息仍在开头时
+        以 checkpoint 原子替换完整状态（期间新追加的消息一并保留），否则放弃本次结果
+
+        Returns:
+            是否写入了新的摘要
+        """
+        if not self.summarizer:
+            return False
+
+        summary, history = await run_io(self._load)
+        new_summary, kept = await self._rollup_summary(summary, history)
+        merged = len(history) - len(kept)
+        if merged == 0:
+            return False
+
+        async with self._hold():
+            current_summary, current = await run_io(self._load)
+            if current_summary != summary or current[:merged] != history[:merged]:
+                # 生成期间会话被清空或已由其他进程滚动
+                logger.info(f"会话在摘要生成期间已变化，放弃本次滚动: {self.session_id}")
+                return False
+
+            # 追加 checkpoint 后之前的记录全部失效
+            dead_records = await run_io(self._append, current[merged:], new_summary, True)
+            await self._after_checkpoint(dead_records)
+        return True
 
     def add_messages(self, messages: Sequence[BaseMessage]) -> None:
         # 兜底同步写入（不做摘要滚动）
-        summary, history = self._load()
-        history.extend(messages)
-        self._save(summary, history)
+        with self._hold_sync():
+            self._append(messages)
+
+    def clear(self) -> None:
+        with self._hold_sync():
+            self._clear()
+
+    def _lock_key(self) -> str:
+        """会话锁与滚动队列使用的会话键"""
+        lock_path = self._lock_path()
+        return str(lock_path) if lock_path is not None else f"{type(self).__name__}:{self.session_id}"
+
+    def _hold(self):
+        """持有会话锁（异步）"""
+        return session_locks.hold(self._lock_key(), self._lock_path(), self.lock_timeout)
+
+    @contextmanager
+    def _hold_sync(self) -> Iterator[None]:
+        """在工作线程中持有跨进程建议锁，超时抛出 ConflictException"""
+        lock_path = self._lock_path()
+        if lock_path is None:
+            yield
+            return
+        with session_locks.hold_sync(lock_path, self.lock_timeout) as acquired:
+            if not acquired:
+                raise ConflictException("会话正忙，请稍后重试", error_code="SESSION_BUSY")
+            yield
+
+    async def _after_checkpoint(self, dead_records: int) -> None:
+        """写入滚动后的完整状态之后调用，dead_records 为存储中失效的记录数"""
+
+    async def _rollup_summary(
+        self,
+        summary: str | None,
+        history: list[BaseMessage]
+    ) -> tuple[str | None, list[BaseMessage]]:
+        if self._count_tokens(summary, history) <= self.max_history_tokens:
+            return summary, history
+
+        # 保留不超过预算一半的最近几轮，其余按预算分段依次合并进摘要
+        keep_from = self._rollup_start(history)
+        old_part, history = history[:keep_from], history[keep_from:]
+        start = 0
+        while start < len(old_part):
+            end = self._chunk_end(old_part, start, self.max_history_tokens)
+            summary = await self.summarizer(summary, old_part[start:end])  # type: ignore[arg-type]
+            start = end
+
+        return summary, history
+
+    def _rollup_start(self, history: Sequence[BaseMessage]) -> int:
+        """滚动时保留部分的起始下标（不超过预算一半的最近几轮），为 0 表示没有可合并的轮次"""
+        return self._window_start(history, int(self.max_history_tokens * _ROLLUP_KEEP_RATIO))
+
+    def _select_window(self, summary: str | None, history: list[BaseMessage]) -> list[BaseMessage]:
+        """选取预算内最近的完整几轮消息（至少保留最后一轮）"""
+        budget = self.max_history_tokens - self._summary_tokens(summary)
+        return history[self._window_start(history, budget):]
+
+    @staticmethod
+    def _round_starts(history: Sequence[BaseMessage]) -> list[int]:
+        """每轮对话的起始下标（一轮以 AI 消息结束）"""
+        starts = [0]
+        for index, msg in enumerate(history[:-1]):
+            if msg.type == "ai":
+                starts.append(index + 1)
+        return starts
+
+    def _window_start(self, history: Sequence[BaseMessage], budget: int) -> int:
+        """从末尾向前累加整轮消息，返回不超过预算的最早起始下标"""
+        if not history:
+            return 0
+        starts = self._round_starts(history)
+        tokens = 0
+        end = len(history)
+        window_start = starts[-1]
+        for start in reversed(starts):
+            tokens += sum(estimate_message_tokens(msg) for msg in history[start:end])
+            if tokens > budget and end < len(history):
+                break
+            window_start = start
+            end = start
+        return window_start
+
+    def _chunk_end(self, history: Sequence[BaseMessage], start: int, budget: int) -> int:
+        """从 start 起向后累加整轮消息，返回不超过预算的分段结束下标（至少一轮）"""
+        tokens = 0
+        end = start
+        for index in range(start, len(history)):
+            tokens += estimate_message_tokens(history[index])
+            if history[index].type == "ai" or index == len(history) - 1:
+                if tokens > budget and end > start:
+                    break
+                end = index + 1
+        return end
+
+    @staticmethod
+    def _summary_tokens(summary: str | None) -> int:
+        return estimate_tokens(f"{SUMMARY_PREFIX}{summary}") if summary else 0
+
+    def _count_tokens(self, summary: str | None, history: Sequence[BaseMessage]) -> int:
+        return self._summary_tokens(summary) + sum(estimate_message_tokens(msg) for msg in history)
+
+    def _lock_path(self) -> Path | None:
+        """跨进程建议锁的锁文件，为 None 时只做进程内互斥"""
+        return None
+
+    def _load(self) -> tuple[str | None, list[BaseMessage]]:
+        """读取 (摘要, 摘要之后保留的消息)"""
+        raise NotImplementedError
+
+    def _append(self, messages: Sequence[BaseMessage], summary: str | None = None, checkpoint: bool = False) -> int:
+        """追加新消息；checkpoint 为 True 时以 (summary, messages) 替换会话的完整状态，返回失效记录数"""
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        """清空会话"""
+        raise NotImplementedError
+
+
+class FileChatMessageHistory(SummaryChatMessageHistory):
+    """基于只追加 jsonl 日志的会话历史存储"""
+
+    def __init__(
+        self,
+        session_id: str,
+        base_dir: Path | None = None,
+        max_history_tokens: int = DEFAULT_HISTORY_TOKENS,
+        summarizer: Callable[[str | None, list[BaseMessage]], Awaitable[str]] | None = None,
+        fsync: bool = True,
+        compact_threshold: int = 200,
+        cache: SessionCache | None = session_cache,
+        lock_timeout: float | None = None,
+        rollup_queue: RollupQueue | None = rollup_queue,
+        archive_dir: Path | None = None
+    ):
+        """
+        Args:
+            session_id: 会话 ID
+            base_dir: 会话文件目录（首次写入时创建）
+            max_history_tokens: 历史（摘要 + 消息）的 token 预算，超出时滚动摘要
+            summarizer: 摘要生成函数
+            fsync: 每次追加后是否 fsync（关闭后崩溃时可能丢失最近几轮，但不会损坏已有记录）
+            compact_threshold: 失效记录数超过该值时压缩会话文件
+            cache: 已解析会话的缓存，为 None 时每次都从磁盘解析
+            lock_timeout: 等待会话锁的最长时间（秒）
+            rollup_queue: 后台摘要滚动队列，为 None 时在写入后直接滚动
+            archive_dir: 归档目录，为 None 时不支持归档
+        """
+        super().__init__(session_id, max_history_tokens, summarizer, lock_timeout, rollup_queue)
+        self.base_dir = base_dir or DEFAULT_SESSIONS_DIR
+        self.fsync = fsync
+        self.compact_threshold = compact_threshold
+        self.cache = cache
+        self.archive_dir = archive_dir
+
+    def _clear(self) -> None:
+        session_path = self._get_session_path()
+        session_path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(session_path):
+            with open(session_path, "w", encoding="utf-8") as f:
+                f.write("")
+            if self.cache is not None:
+                self.cache.invalidate(str(session_path))
+        archive_path = self._archive_path()
+        if archive_path is not None:
+            archive_path.unlink(missing_ok=True)
+
+    def compact(self) -> bool:
+        """
+        压缩会话文件：只保留最新 checkpoint 及其后的记录（先写临时文件再原子替换）
+
+        替换文件期间持有跨进程建议锁，其他进程不会写到被替换掉的旧文件；
+        会话正忙时跳过，等下次写入 checkpoint 后再压缩
+
+        Returns:
+            是否进行了重写
+        """
+        with session_locks.hold_sync(self._lock_path(), _COMPACT_LOCK_TIMEOUT) as acquired:
+            if not acquired:
+                logger.info(f"会话正忙，跳过压缩: {self.session_id}")
+                return False
+            return self._compact()
+
+    def _compact(self) -> bool:
+        session_path = self._get_session_path()
+        with _file_lock(session_path):
+            try:
+                with open(session_path, "rb") as f:
+                    before = _fingerprint(os.fstat(f.fileno()))
+                    lines, offset = self._read_tail(f)
+            except FileNotFoundError:
+                return False
+            if offset == 0:
+                return False
+
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{session_path.name}.", suffix=".tmp", dir=session_path.parent)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(b"".join(line + b"\n" for line in lines if line.strip()))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    after = _fingerprint(os.fstat(f.fileno()))
+                os.replace(tmp_name, session_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+
+            # 重写前后内容等价，缓存的解析结果仍然有效
+            if self.cache is not None:
+                self.cache.refresh(str(session_path), before, after)
+
+        logger.info(f"会话文件已压缩: {self.session_id}（移除 {offset} 字节失效记录）")
+        return True
+
+    def archive(self, max_idle: float) -> tuple[int, int] | None:
+        """
+        把闲置的会话压缩后移入归档目录（只保留最新 checkpoint 及其后的记录）
+
+        先写入归档再删除会话文件，任一时刻至少有一份完整数据；会话正忙时跳过
+
+        Args:
+            max_idle: 会话文件超过该时长（秒）未修改才归档
+
+        Returns:
+            (原文件字节数, 归档字节数)，未归档时返回 None
+        """
+        archive_path = self._archive_path()
+        if archive_path is None:
+            return None
+
+        with session_locks.hold_sync(self._lock_path(), _COMPACT_LOCK_TIMEOUT) as acquired:
+            if not acquired:
+                return None
+            session_path = self._get_session_path()
+            with _file_lock(session_path):
+                try:
+                    with open(session_path, "rb") as f:
+                        file_stat = os.fstat(f.fileno())
+                        # 加锁后再确认一次，期间可能有新的写入
+                        if file_stat.st_mtime > time.time() - max_idle:
+                            return None
+                        lines, _ = self._read_tail(f)
+                except FileNotFoundError:
+                    return None
+
+                data = compress_session(b"".join(line + b"\n" for line in lines if line.strip()))
+                self._write_atomic(archive_path, data)
+                try:
+                    session_path.unlink()
+                except OSError:
+                    # 会话文件无法删除（如 Windows 下被占用），放弃本次归档
+                    archive_path.unlink(missing_ok=True)
+                    return None
+                if self.cache is not None:
+                    self.cache.invalidate(str(session_path))
+
+        return file_stat.st_size, len(data)
+
+    def _promote(self) -> bool:
+        """
+        把归档的会话解压恢复到会话目录
+
+        Returns:
+            是否存在归档（已被其他线程或进程恢复时同样返回 True）
+        """
+        archive_path = self._archive_path()
+        if archive_path is None:
+            return False
+        try:
+            data = decompress_session(archive_path.read_bytes())
+        except FileNotFoundError:
+            return False
+
+        session_path = self._get_session_path()
+        session_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{session_path.name}.", suffix=".tmp", dir=session_path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                # 硬链接不会覆盖已存在的文件，并发恢复时只有一方生效
+                os.link(tmp_name, session_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                # 文件系统不支持硬链接
+                if not session_path.exists():
+                    os.replace(tmp_name, session_path)
+        finally:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+        archive_path.unlink(missing_ok=True)
+        logger.info(f"已从归档恢复会话: {self.session_id}")
+        return True
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """先写临时文件再原子替换"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    async def _after_checkpoint(self, dead_records: int) -> None:
+        if dead_records > self.compact_threshold:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self) -> None:
+        """在后台 I/O 线程中压缩会话文件，不阻塞本轮对话"""
+        async def run() -> None:
+            try:
+                await run_io(self.compact)
+            except Exception as e:
+                logger.warning(f"会话文件压缩失败: {self.session_id} | {e}")
+
+        task = asyncio.get_running_loop().create_task(run())
+        _compaction_tasks.add(task)
+        task.add_done_callback(_compaction_tasks.discard)
 
     def _get_session_path(self) -> Path:
         return self.base_dir / f"{self.session_id}.jsonl"
 
+    def _archive_path(self) -> Path | None:
+        if self.archive_dir is None:
+            return None
+        return self.archive_dir / f"{self.session_id}{ARCHIVE_SUFFIX}"
+
+    def _lock_path(self) -> Path:
+        # 锁文件独立存放：会话文件压缩时会被替换，不能直接加锁
+        return self.base_dir / ".locks" / f"{self.session_id}.lock"
+
     def _load(self) -> tuple[str | None, list[BaseMessage]]:
         session_path = self._get_session_path()
-        if not session_path.exists():
+        cache_key = str(session_path)
+        try:
+            with open(session_path, "rb") as f:
+                mtime_ns, size = _fingerprint(os.fstat(f.fileno()))
+                if self.cache is not None:
+                    cached = self.cache.get(cache_key, mtime_ns, size)
+                    if cached is not None:
+                        return cached
+                lines, _ = self._read_tail(f)
+        except FileNotFoundError:
+            if self.cache is not None:
+                self.cache.invalidate(cache_key)
+            # 已归档的会话解压恢复后再读取
+            if self._promote():
+                return self._load()
             return None, []
 
+        summary, history = self._parse_records(lines)
+        if self.cache is not None:
+            self.cache.put(cache_key, mtime_ns, size, summary, history)
+        return summary, history
+
+    @staticmethod
+    def _parse_records(lines: list[bytes]) -> tuple[str | None, list[BaseMessage]]:
+        """
+        解析会话记录
+
+        Args:
+            lines: 会话文件的行（最后一个 checkpoint 及其之后，或全部行）
+
+        Returns:
+            (摘要, 消息列表)
+        """
         summary: str | None = None
         history: list[BaseMessage] = []
 
-        with open(session_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    record = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                record_type = record.get("type")
-                if record_type == "summary":
-                    summary = record.get("content")
-                elif record_type == "message":
-                    msg_dict = record.get("message")
-                    if msg_dict:
-                        history.extend(messages_from_dict([msg_dict]))
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # 崩溃时写了一半的记录
+                continue
 
+            record_type = record.get("type")
+            if record_type == "checkpoint":
+                summary = record.get("summary")
+                history = messages_from_dict(record.get("messages") or [])
+            elif record_type == "summary":
+                summary = record.get("content")
+            elif record_type == "message":
+                msg_dict = record.get("message")
+                if msg_dict:
+                    history.extend(messages_from_dict([msg_dict]))
         return summary, history
 
-    def _save(self, summary: str | None, history: list[BaseMessage]) -> None:
-        session_path = self._get_session_path()
-        session_path.parent.mkdir(parents=True, exist_ok=True)
+    @staticmethod
+    def _read_tail(f: BinaryIO) -> tuple[list[bytes], int]:
+        """
+        从文件末尾向前读取，直到最后一个 checkpoint 记录
 
-        with open(session_path, "w", encoding="utf-8") as f:
-            if summary:
-                f.write(json.dumps(self._build_summary_record(summary), ensure_ascii=False) + "\n")
+        Returns:
+            (checkpoint 及其后的行；没有 checkpoint 时为全部行, checkpoint 所在的字节偏移)
+        """
+        position = f.seek(0, os.SEEK_END)
+        lines: list[bytes] = []
+        pending = b""
+        while position > 0:
+            size = min(_TAIL_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            parts = (f.read(size) + pending).split(b"\n")
+            # 第一段可能是被块边界截断的行，留到下一轮拼接
+            pending = parts[0]
+            for index in range(len(parts) - 1, 0, -1):
+                lines.append(parts[index])
+                if parts[index].startswith(_CHECKPOINT_PREFIX):
+                    lines.reverse()
+                    offset = position + sum(len(part) + 1 for part in parts[:index])
+                    return lines, offset
 
-            for msg in history:
-                record = self._build_message_record(msg)
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        lines.append(pending)
+        lines.reverse()
+        return lines, 0
 
-    async def _rollup_summary(
-        self,
-        summary: str | None,
-        history: list[BaseMessage]
-    ) -> tuple[str | None, list[BaseMessage]]:
-        rounds = self._count_rounds(history)
-        if rounds <= self.max_history_rounds:
-            return summary, history
+    def _append(self, messages: Sequence[BaseMessage], summary: str | None = None, checkpoint: bool = False) -> int:
+        """
+        以一次 write 追加记录，并同步更新会话缓存
 
-        while rounds > self.max_history_rounds:
-            old_part, history = self._trim_by_rounds(history)
-            if not old_part:
-                break
-            summary = await self.summarizer(summary, old_part)  # type: ignore[arg-type]
-            rounds = self._count_rounds(history)
+        Args:
+            messages: 新消息；checkpoint 为 True 时为滚动后保留的全部消息
+            summary: 滚动后的摘要（仅 checkpoint）
+            checkpoint: 是否追加 checkpoint 记录
 
-        return summary, history
+        Returns:
+            文件中失效记录的行数（仅追加 checkpoint 时统计，否则为 0）
+        """
+        if checkpoint:
+            records = [self._build_checkpoint_record(summary, list(messages))]
+        else:
+            records = [self._build_message_record(msg) for msg in messages]
+        if not records:
+            return 0
 
-    def _trim_by_rounds(self, history: list[BaseMessage]) -> tuple[list[BaseMessage], list[BaseMessage]]:
-        rounds = 0
-        cutoff_index = 0
-        for index, msg in enumerate(history):
-            if msg.type == "ai":
-                rounds += 1
-                if rounds >= self.trim_rounds:
-                    cutoff_index = index + 1
-                    break
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        session_path = self._get_session_path()
+        session_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_key = str(session_path)
+        # 已归档的会话先恢复，新记录追加在原有记录之后
+        if self.archive_dir is not None and not session_path.exists():
+            self._promote()
 
-        if cutoff_index == 0:
-            return [], history
+        with _file_lock(session_path):
+            with open(session_path, "a+b") as f:
+                before = _fingerprint(os.fstat(f.fileno()))
+                end = f.seek(0, os.SEEK_END)
+                if end > 0:
+                    # 上次写入中途崩溃留下的半行单独成行，避免与新记录粘连
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                after = _fingerprint(os.fstat(f.fileno()))
 
-        return history[:cutoff_index], history[cutoff_index:]
+            # 原地更新缓存，下一轮无需重新解析
+            if self.cache is not None:
+                if checkpoint:
+                    self.cache.put(cache_key, *after, summary, messages)
+                else:
+                    self.cache.append(cache_key, before, after, messages)
+
+            if not checkpoint or end == 0:
+                return 0
+            return self._count_lines(session_path, end)
 
     @staticmethod
-    def _count_rounds(history: list[BaseMessage]) -> int:
-        return sum(1 for msg in history if msg.type == "ai")
+    def _count_lines(session_path: Path, end: int) -> int:
+        """统计文件前 end 个字节中的行数"""
+        count = 0
+        with open(session_path, "rb") as f:
+            remaining = end
+            while remaining > 0:
+                block = f.read(min(_TAIL_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                count += block.count(b"\n")
+                remaining -= len(block)
+        return count
 
     @staticmethod
-    def _build_summary_record(summary: str) -> dict:
+    def _build_checkpoint_record(summary: str | None, history: list[BaseMessage]) -> dict:
+        # type 必须是第一个字段，读取时按行前缀识别 checkpoint
         return {
-            "type": "summary",
-            "content": summary,
+            "type": "checkpoint",
+            "summary": summary,
+            "messages": [message_to_dict(msg) for msg in history],
             "timestamp": datetime.now().isoformat()
         }
 
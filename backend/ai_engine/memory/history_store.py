@@ -0,0 +1,358 @@
+"""
+会话历史存储后端
+定义可插拔的存储接口，按配置选择每会话一个 JSONL 文件或单个 SQLite 数据库；
+会话 ID 是笔记路径的哈希，反向索引记录每个会话所属的笔记；
+长期闲置的会话可压缩归档，下次访问时自动恢复
+"""
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from ...core import get_logger
+from .chat_history import DEFAULT_SESSIONS_DIR, FileChatMessageHistory, SummaryChatMessageHistory
+from .session_archive import ARCHIVE_SUFFIX
+from .session_cache import session_cache
+from .session_index import SessionIndex
+from .session_resolver import normalize_note_path, session_id_for
+
+logger = get_logger(__name__)
+
+# 可选的存储后端
+HISTORY_BACKENDS = ("jsonl", "sqlite")
+
+# 定期压缩时跳过最近仍在写入的会话（秒）
+_COMPACT_MIN_IDLE = 60.0
+
+# 小于该大小的会话文件不值得压缩（字节）
+_COMPACT_MIN_SIZE = 16 * 1024
+
+
+class HistoryBackend:
+    """会话历史存储后端接口"""
+
+    # 后端名称（与配置项 history_backend 对应）
+    name = ""
+
+    # 会话 ID 与笔记路径的反向索引（由子类创建）
+    index: SessionIndex
+
+    def get_history(self, session_id: str, **kwargs) -> SummaryChatMessageHistory:
+        """
+        获取会话历史对象
+
+        Args:
+            session_id: 会话 ID
+            **kwargs: 传给历史对象的参数（summarizer、max_history_tokens 等）
+
+        Returns:
+            会话历史对象
+        """
+        raise NotImplementedError
+
+    def list_sessions(self) -> list[str]:
+        """列出全部会话 ID"""
+        raise NotImplementedError
+
+    def delete_session(self, session_id: str) -> None:
+        """删除会话（不存在时忽略）"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放后端持有的资源"""
+
+    def compact_sessions(self, checkpoint: Callable[[], bool] | None = None) -> dict[str, int]:
+        """
+        整理会话存储，回收失效记录占用的空间（定期维护任务调用）
+
+        Args:
+            checkpoint: 每处理一个单位调用一次，返回 False 时提前结束
+
+        Returns:
+            包含检查数（scanned）、整理数（compacted）与回收字节数（reclaimed_bytes）的字典
+        """
+        return {"scanned": 0, "compacted": 0, "reclaimed_bytes": 0}
+
+    def disk_usage(self) -> dict[str, int]:
+        """
+        统计会话存储占用的磁盘空间
+
+        Returns:
+            包含活跃会话数与字节数（active_sessions / active_bytes）、
+            归档会话数与字节数（archived_sessions / archived_bytes）的字典
+        """
+        return {"active_sessions": 0, "active_bytes": 0, "archived_sessions": 0, "archived_bytes": 0}
+
+    def archive_idle_sessions(self, max_idle: float, checkpoint: Callable[[], bool] | None = None) -> dict:
+        """
+        把闲置超过指定时长的会话压缩归档（定期维护任务调用），归档的会话在下次访问时自动恢复
+
+        Args:
+            max_idle: 闲置时长（秒）
+            checkpoint: 每处理一个会话调用一次，返回 False 时提前结束
+
+        Returns:
+            归档报告：archived（归档会话数）、bytes_before / bytes_after（归档会话压缩前后的字节数）、
+            usage_before / usage_after（归档前后的磁盘占用，见 disk_usage）
+        """
+        usage = self.disk_usage()
+        return {"archived": 0, "bytes_before": 0, "bytes_after": 0, "usage_before": usage, "usage_after": usage}
+
+    def migrate_legacy_sessions(self, note_paths: Iterable[str]) -> int:
+        """
+        把旧版以文件名为 ID 的会话迁移到按笔记路径哈希的 ID
+
+        同名笔记原本共用一个会话，迁移时复制给每一篇；找不到对应笔记的旧会话保持原样，由孤儿清理删除
+
+        Args:
+            note_paths: 知识库中全部文件的相对路径
+
+        Returns:
+            迁移生成的会话数
+        """
+        raise NotImplementedError
+
+    def register_session(self, session_id: str, note_path: str) -> None:
+        """
+        登记会话所属的笔记
+
+        Args:
+            session_id: 会话 ID
+            note_path: 规范化的知识库相对路径
+        """
+        self.index.register(session_id, note_path)
+
+    def find_session(self, note_path: str) -> str | None:
+        """
+        按笔记路径查找已登记的会话 ID
+
+        Args:
+            note_path: 知识库相对路径
+
+        Returns:
+            会话 ID，未登记时返回 None
+        """
+        return self.index.find(normalize_note_path(note_path))
+
+    def session_note_paths(self) -> dict[str, str | None]:
+        """
+        列出全部会话及其所属笔记
+
+        Returns:
+            {会话 ID: 笔记路径}，未登记（如无法迁移的旧会话）时为 None
+        """
+        paths = self.index.items()
+        return {session_id: paths.get(session_id) for session_id in self.list_sessions()}
+
+
+def group_notes_by_name(note_paths: Iterable[str]) -> dict[str, list[str]]:
+    """按文件名分组笔记路径（旧版会话 ID 即文件名）"""
+    groups: dict[str, list[str]] = {}
+    for note_path in note_paths:
+        note_path = normalize_note_path(note_path)
+        groups.setdefault(note_path.rpartition("/")[2], []).append(note_path)
+    return groups
+
+
+class JsonlHistoryBackend(HistoryBackend):
+    """每个会话一个只追加 JSONL 文件，按会话 ID 前两位分片存放"""
+
+    name = "jsonl"
+
+    def __init__(self, base_dir: Path | None = None):
+        """
+        初始化 JSONL 后端
+
+        Args:
+            base_dir: 会话文件目录（反向索引保存在其中的 index.db）
+        """
+        self.base_dir = base_dir or DEFAULT_SESSIONS_DIR
+        self.index = SessionIndex(self.base_dir / "index.db")
+
+    def get_history(self, session_id: str, **kwargs) -> FileChatMessageHistory:
+        return FileChatMessageHistory(
+            session_id,
+            base_dir=self._shard_dir(session_id),
+            archive_dir=self._archive_shard_dir(session_id),
+            **kwargs
+        )
+
+    def list_sessions(self) -> list[str]:
+        return list(self._session_files().keys() | self._archived_files().keys())
+
+    def delete_session(self, session_id: str) -> None:
+        for session_path in (self._shard_dir(session_id) / f"{session_id}.jsonl", self.base_dir / f"{session_id}.jsonl"):
+            session_path.unlink(missing_ok=True)
+            session_cache.invalidate(str(session_path))
+        (self._archive_shard_dir(session_id) / f"{session_id}{ARCHIVE_SUFFIX}").unlink(missing_ok=True)
+        self.index.remove(session_id)
+
+    def close(self) -> None:
+        self.index.close()
+
+    def compact_sessions(self, checkpoint: Callable[[], bool] | None = None) -> dict[str, int]:
+        report = {"scanned": 0, "compacted": 0, "reclaimed_bytes": 0}
+        cutoff = time.time() - _COMPACT_MIN_IDLE
+        for session_id, session_path in self._session_files().items():
+            if checkpoint is not None and not checkpoint():
+                break
+            # 旧版平铺文件等待迁移，不在这里重写
+            if session_path.parent == self.base_dir:
+                continue
+            try:
+                file_stat = session_path.stat()
+            except FileNotFoundError:
+                continue
+            report["scanned"] += 1
+            if file_stat.st_size < _COMPACT_MIN_SIZE or file_stat.st_mtime > cutoff:
+                continue
+
+            history = FileChatMessageHistory(session_id, base_dir=session_path.parent)
+            if history.compact():
+                report["compacted"] += 1
+                try:
+                    report["reclaimed_bytes"] += file_stat.st_size - session_path.stat().st_size
+                except FileNotFoundError:
+                    pass
+        return report
+
+    def disk_usage(self) -> dict[str, int]:
+        usage = {"active_sessions": 0, "active_bytes": 0, "archived_sessions": 0, "archived_bytes": 0}
+        for prefix, files in (("active", self._session_files()), ("archived", self._archived_files())):
+            for session_path in files.values():
+                try:
+                    usage[f"{prefix}_bytes"] += session_path.stat().st_size
+                except FileNotFoundError:
+                    continue
+                usage[f"{prefix}_sessions"] += 1
+        return usage
+
+    def archive_idle_sessions(self, max_idle: float, checkpoint: Callable[[], bool] | None = None) -> dict:
+        usage_before = self.disk_usage()
+        report = {"archived": 0, "bytes_before": 0, "bytes_after": 0, "usage_before": usage_before}
+        cutoff = time.time() - max_idle
+        for session_id, session_path in self._session_files().items():
+            if checkpoint is not None and not checkpoint():
+                break
+            # 旧版平铺文件等待迁移，不归档
+            if session_path.parent == self.base_dir:
+                continue
+            try:
+                if session_path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            history = FileChatMessageHistory(
+                session_id, base_dir=session_path.parent, archive_dir=self._archive_shard_dir(session_id)
+            )
+            sizes = history.archive(max_idle)
+            if sizes is not None:
+                report["archived"] += 1
+                report["bytes_before"] += sizes[0]
+                report["bytes_after"] += sizes[1]
+
+        usage_after = self.disk_usage() if report["archived"] else usage_before
+        report["usage_after"] = usage_after
+        if report["archived"]:
+            before = usage_before["active_bytes"] + usage_before["archived_bytes"]
+            after = usage_after["active_bytes"] + usage_after["archived_bytes"]
+            logger.info(
+                f"已归档 {report['archived']} 个闲置会话（{report['bytes_before']} → {report['bytes_after']} 字节），"
+                f"会话存储共 {before} → {after} 字节"
+            )
+        return report
+
+    def migrate_legacy_sessions(self, note_paths: Iterable[str]) -> int:
+        legacy_files = sorted(self.base_dir.glob("*.jsonl")) if self.base_dir.is_dir() else []
+        if not legacy_files:
+            return 0
+
+        by_name = group_notes_by_name(note_paths)
+        migrated: dict[str, str] = {}
+        for legacy_file in legacy_files:
+            targets = by_name.get(legacy_file.stem)
+            if not targets:
+                continue
+            for note_path in targets:
+                session_id = session_id_for(note_path)
+                target = self._shard_dir(session_id) / f"{session_id}.jsonl"
+                if target.exists():
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(legacy_file, target)
+                migrated[session_id] = note_path
+            # 保留旧文件作为备份
+            legacy_file.rename(legacy_file.with_name(f"{legacy_file.name}.migrated"))
+            session_cache.invalidate(str(legacy_file))
+
+        self.index.register_many(migrated)
+        if migrated:
+            logger.info(f"已将 {len(migrated)} 个旧版会话迁移到分片目录")
+        return len(migrated)
+
+    def _shard_dir(self, session_id: str) -> Path:
+        return self.base_dir / session_id[:2]
+
+    def _archive_shard_dir(self, session_id: str) -> Path:
+        return self.base_dir / "archive" / session_id[:2]
+
+    def _archived_files(self) -> dict[str, Path]:
+        """扫描归档目录 {会话 ID: 归档文件路径}"""
+        files: dict[str, Path] = {}
+        try:
+            shards = list(os.scandir(self.base_dir / "archive"))
+        except FileNotFoundError:
+            return files
+
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            with os.scandir(shard.path) as entries:
+                for item in entries:
+                    if item.name.endswith(ARCHIVE_SUFFIX) and item.is_file():
+                        files[item.name[:-len(ARCHIVE_SUFFIX)]] = Path(item.path)
+        return files
+
+    def _session_files(self) -> dict[str, Path]:
+        """扫描分片目录与旧版平铺的会话文件 {会话 ID: 文件路径}"""
+        files: dict[str, Path] = {}
+        try:
+            entries = list(os.scandir(self.base_dir))
+        except FileNotFoundError:
+            return files
+
+        for entry in entries:
+            if entry.name.endswith(".jsonl") and entry.is_file():
+                # 尚未迁移的旧版会话
+                files[entry.name[:-len(".jsonl")]] = Path(entry.path)
+            elif len(entry.name) == 2 and entry.is_dir():
+                with os.scandir(entry.path) as shard:
+                    for item in shard:
+                        if item.name.endswith(".jsonl") and item.is_file():
+                            files[item.name[:-len(".jsonl")]] = Path(item.path)
+        return files
+
+
+def create_history_backend(name: str, sessions_dir: Path | None = None) -> HistoryBackend:
+    """
+    按名称创建会话历史存储后端
+
+    Args:
+        name: 后端名称（jsonl / sqlite）
+        sessions_dir: JSONL 会话目录；SQLite 数据库位于其旁边，首次打开时从该目录迁移
+
+    Returns:
+        存储后端实例
+
+    Raises:
+        ValueError: 未知的后端名称
+    """
+    sessions_dir = sessions_dir or DEFAULT_SESSIONS_DIR
+    if name == "jsonl":
+        return JsonlHistoryBackend(sessions_dir)
+    if name == "sqlite":
+        from .sqlite_history import SQLiteHistoryBackend
+        return SQLiteHistoryBackend(sessions_dir.with_name(f"{sessions_dir.name}.db"), migrate_from=sessions_dir)
+    raise ValueError(f"未知的会话存储后端: {name}")
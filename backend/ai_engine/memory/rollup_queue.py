@@ -0,0 +1,169 @@
+"""
+摘要滚动队列
+会话超出轮数上限时，摘要生成（一次或多次模型调用）放到后台任务中执行，不占用用户请求：
+- 每个会话同时最多一个滚动任务，执行期间的再次提交合并为任务结束后重跑一次
+- 全局并发数有上限，避免同时发起过多摘要请求
+- 记录排队中、执行中与最近失败的滚动，供运维查看
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from ...core import get_logger
+
+if TYPE_CHECKING:
+    from .chat_history import SummaryChatMessageHistory
+
+logger = get_logger(__name__)
+
+
+class _RollupJob:
+    """单个会话的滚动任务"""
+    __slots__ = ('key', 'history', 'state', 'queued_at', 'started_at', 'rerun')
+
+    def __init__(self, key: str, history: SummaryChatMessageHistory):
+        self.key = key
+        self.history = history
+        self.state = "pending"
+        self.queued_at = time.time()
+        self.started_at: float | None = None
+        self.rerun = False
+
+
+class RollupQueue:
+    """后台摘要滚动队列"""
+
+    def __init__(self, max_concurrency: int = 2, max_failures: int = 100):
+        """
+        初始化滚动队列
+
+        Args:
+            max_concurrency: 同时执行的滚动任务数上限
+            max_failures: 保留的失败记录数
+        """
+        self.max_concurrency = max_concurrency
+        self.max_failures = max_failures
+
+        # 只在事件循环线程中访问
+        self._jobs: dict[str, _RollupJob] = {}
+        self._failures: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.discarded = 0
+        self.failed = 0
+
+    def submit(self, key: str, history: SummaryChatMessageHistory) -> None:
+        """
+        提交会话滚动；该会话已有任务时合并，不重复排队
+
+        Args:
+            key: 会话键（同一会话的不同历史对象使用相同的键）
+            history: 会话历史对象
+        """
+        job = self._jobs.get(key)
+        if job is not None:
+            # 执行中的任务结束后再跑一次，覆盖期间新追加的消息
+            job.history = history
+            if job.state == "running":
+                job.rerun = True
+            self.coalesced += 1
+            return
+
+        job = self._jobs[key] = _RollupJob(key, history)
+        self.submitted += 1
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def status(self) -> dict:
+        """
+        获取队列状态
+
+        Returns:
+            包含排队/执行中的任务、最近失败记录与计数的字典
+        """
+        return {
+            "jobs": [
+                {
+                    "session_id": job.history.session_id,
+                    "state": job.state,
+                    "queued_at": job.queued_at,
+                    "started_at": job.started_at,
+                }
+                for job in self._jobs.values()
+            ],
+            "failures": list(reversed(self._failures.values())),
+            "max_concurrency": self.max_concurrency,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "discarded": self.discarded,
+            "failed": self.failed,
+        }
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        等待进行中的滚动完成，超时后取消剩余任务
+
+        未完成的滚动不会丢失消息：消息已经落盘，下次写入时会重新提交
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.info(f"已取消 {len(pending)} 个未完成的摘要滚动")
+
+    async def _run(self, job: _RollupJob) -> None:
+        try:
+            async with self._semaphore:
+                while True:
+                    job.state = "running"
+                    job.started_at = time.time()
+                    job.rerun = False
+                    try:
+                        applied = await job.history.rollup()
+                    except Exception as e:
+                        self._record_failure(job, e)
+                        # 失败后不立即重跑，等下次写入时再提交
+                        break
+
+                    self._failures.pop(job.key, None)
+                    if applied:
+                        self.applied += 1
+                    else:
+                        self.discarded += 1
+                    if not job.rerun:
+                        break
+        finally:
+            self._jobs.pop(job.key, None)
+
+    def _record_failure(self, job: _RollupJob, error: Exception) -> None:
+        self.failed += 1
+        previous = self._failures.pop(job.key, None)
+        self._failures[job.key] = {
+            "session_id": job.history.session_id,
+            "error": f"{type(error).__name__}: {error}",
+            "failed_at": time.time(),
+            "attempts": (previous["attempts"] if previous else 0) + 1,
+        }
+        while len(self._failures) > self.max_failures:
+            self._failures.popitem(last=False)
+        logger.warning(f"摘要滚动失败: {job.history.session_id} | {error}")
+
+
+# 全局摘要滚动队列
+rollup_queue = RollupQueue()
@@ -0,0 +1,62 @@
+"""
+会话归档编码
+长期闲置的会话只保留有效记录（最后一个 checkpoint 及其之后），用 zlib 压缩后移入归档目录；
+消息是冗长的 message_to_dict JSON，字段名在每条记录中重复，使用预置字典（zdict）后
+即使是只有几轮的小会话也能获得较高的压缩率
+
+归档文件以版本头开头，字典内容与版本一一对应，修改字典时必须新增版本
+"""
+import zlib
+
+# 归档文件后缀
+ARCHIVE_SUFFIX = ".jsonl.z"
+
+# 归档文件头（格式版本 1：zlib + _ZDICT_V1）
+_MAGIC_V1 = b"OSZ1"
+
+# 预置字典：会话记录中反复出现的 JSON 片段，越常见的片段放得越靠后
+_ZDICT_V1 = (
+    b'"tool_calls": [], "invalid_tool_calls": [], "usage_metadata": null'
+    b'{"type": "summary", "content": "'
+    b'{"type": "checkpoint", "summary": null, "messages": [{"type": "human", "data": {"content": "'
+    b'"}}], "timestamp": "20'
+    b'{"type": "message", "message": {"type": "ai", "data": {"content": "'
+    b'", "additional_kwargs": {}, "response_metadata": {}, "type": "ai", "name": null, "id": null, '
+    b'"tool_calls": [], "invalid_tool_calls": [], "usage_metadata": null}}, "timestamp": "20'
+    b'{"type": "message", "message": {"type": "human", "data": {"content": "'
+    b'", "additional_kwargs": {}, "response_metadata": {}, "type": "human", "name": null, "id": null}}, '
+    b'"timestamp": "20'
+)
+
+
+def compress_session(data: bytes) -> bytes:
+    """
+    压缩会话记录
+
+    Args:
+        data: JSONL 格式的会话记录
+
+    Returns:
+        带版本头的压缩数据
+    """
+    compressor = zlib.compressobj(level=9, zdict=_ZDICT_V1)
+    return _MAGIC_V1 + compressor.compress(data) + compressor.flush()
+
+
+def decompress_session(data: bytes) -> bytes:
+    """
+    解压会话记录
+
+    Args:
+        data: compress_session 生成的数据
+
+    Returns:
+        JSONL 格式的会话记录
+
+    Raises:
+        ValueError: 未知的归档格式
+    """
+    if not data.startswith(_MAGIC_V1):
+        raise ValueError("未知的会话归档格式")
+    decompressor = zlib.decompressobj(zdict=_ZDICT_V1)
+    return decompressor.decompress(data[len(_MAGIC_V1):]) + decompressor.flush()
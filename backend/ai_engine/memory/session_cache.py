@@ -0,0 +1,206 @@
+"""
+会话历史缓存模块
+按会话文件缓存已解析的摘要与消息列表，以 (mtime_ns, size) 校验有效性，
+本进程追加记录时原地更新，热会话无需反复从磁盘解析
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Sequence
+
+from langchain_core.messages import BaseMessage
+
+
+class _SessionEntry:
+    """缓存条目"""
+    __slots__ = ('mtime_ns', 'size', 'summary', 'messages', 'accessed')
+
+    def __init__(self, mtime_ns: int, size: int, summary: str | None, messages: list[BaseMessage]):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.summary = summary
+        self.messages = messages
+        self.accessed = time.monotonic()
+
+
+class SessionCache:
+    """按会话数限制容量的 LRU 会话历史缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 64):
+        """
+        初始化会话缓存
+
+        Args:
+            max_entries: 最大缓存会话数
+        """
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, _SessionEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.updates = 0
+        self.evictions = 0
+
+    def get(self, key: str, mtime_ns: int, size: int) -> tuple[str | None, list[BaseMessage]] | None:
+        """
+        获取已解析的会话历史，文件版本不一致（如被外部修改）时视为未命中并移除旧条目
+
+        Args:
+            key: 缓存键（会话文件路径）
+            mtime_ns: 文件当前修改时间（纳秒）
+            size: 文件当前大小
+
+        Returns:
+            (摘要, 消息列表副本)，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.mtime_ns != mtime_ns or entry.size != size:
+                del self._entries[key]
+                self.misses += 1
+                self.stale += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry.accessed = time.monotonic()
+            self.hits += 1
+            return entry.summary, list(entry.messages)
+
+    def put(self, key: str, mtime_ns: int, size: int, summary: str | None, messages: Sequence[BaseMessage]) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键（会话文件路径）
+            mtime_ns: 文件修改时间（纳秒）
+            size: 文件大小
+            summary: 历史摘要
+            messages: 消息列表
+        """
+        with self._lock:
+            self._entries[key] = _SessionEntry(mtime_ns, size, summary, list(messages))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def append(
+        self,
+        key: str,
+        before: tuple[int, int],
+        after: tuple[int, int],
+        messages: Sequence[BaseMessage]
+    ) -> None:
+        """
+        本进程追加消息后原地更新条目
+
+        只有条目与追加前的文件版本一致时才更新，否则说明期间文件被外部修改，直接移除；
+        追加前文件为空时直接建立条目
+
+        Args:
+            key: 缓存键（会话文件路径）
+            before: 追加前的 (mtime_ns, size)
+            after: 追加后的 (mtime_ns, size)
+            messages: 追加的消息
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if before[1] != 0:
+                    return
+                entry = self._entries[key] = _SessionEntry(*after, None, [])
+            elif (entry.mtime_ns, entry.size) != before:
+                del self._entries[key]
+                return
+
+            entry.messages.extend(messages)
+            entry.mtime_ns, entry.size = after
+            entry.accessed = time.monotonic()
+            self._entries.move_to_end(key)
+            self.updates += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def refresh(self, key: str, before: tuple[int, int], after: tuple[int, int]) -> None:
+        """
+        文件内容等价重写（如压缩）后更新条目的文件版本
+
+        Args:
+            key: 缓存键（会话文件路径）
+            before: 重写前的 (mtime_ns, size)
+            after: 重写后的 (mtime_ns, size)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.mtime_ns, entry.size) == before:
+                entry.mtime_ns, entry.size = after
+
+    def invalidate(self, key: str) -> None:
+        """
+        移除指定缓存条目
+
+        Args:
+            key: 缓存键（会话文件路径）
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def trim(self, max_idle: float) -> int:
+        """
+        移除超过指定时长未访问的条目
+
+        Args:
+            max_idle: 最长空闲时间（秒）
+
+        Returns:
+            移除的条目数
+        """
+        cutoff = time.monotonic() - max_idle
+        removed = 0
+        with self._lock:
+            # 条目按访问顺序排列，遇到第一个未过期的条目即可停止
+            while self._entries:
+                key, entry = next(iter(self._entries.items()))
+                if entry.accessed >= cutoff:
+                    break
+                del self._entries[key]
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含命中、未命中、过期、原地更新、淘汰次数与命中率的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# 全局会话缓存实例
+session_cache = SessionCache()
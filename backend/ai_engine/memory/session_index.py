@@ -0,0 +1,155 @@
+"""
+会话反向索引
+会话 ID 是笔记路径的哈希，原始路径作为元数据保存在这里：
+按笔记路径查会话，或按会话查所属笔记（清理孤儿会话时使用）
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_index (
+    session_id TEXT PRIMARY KEY,
+    note_path TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_session_index_note_path ON session_index (note_path);
+"""
+
+
+class SessionIndex:
+    """会话 ID 与笔记路径的映射（SQLite 存储，线程安全）"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        connect: Callable[[], ContextManager[sqlite3.Connection]] | None = None
+    ):
+        """
+        初始化反向索引（数据库在首次使用时打开）
+
+        Args:
+            db_path: 数据库文件路径（可与会话数据库共用）
+            connect: 借出自动提交模式连接的函数（如会话数据库的连接池），为空时使用独占连接
+        """
+        self.db_path = db_path
+        self._connect = connect
+        self._conn: sqlite3.Connection | None = None
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        # 本进程已登记的映射，重复登记时无需写库
+        self._known: dict[str, str] = {}
+
+    def register(self, session_id: str, note_path: str) -> None:
+        """
+        登记会话所属的笔记
+
+        Args:
+            session_id: 会话 ID
+            note_path: 规范化的知识库相对路径
+        """
+        if self._known.get(session_id) == note_path:
+            return
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO session_index (session_id, note_path, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET note_path = excluded.note_path",
+                (session_id, note_path, time.time())
+            )
+        self._known[session_id] = note_path
+
+    def register_many(self, items: dict[str, str]) -> None:
+        """
+        批量登记（迁移时使用，单个事务）
+
+        Args:
+            items: {会话 ID: 笔记路径}
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO session_index (session_id, note_path, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET note_path = excluded.note_path",
+                ((session_id, note_path, now) for session_id, note_path in items.items())
+            )
+            conn.execute("COMMIT")
+        self._known.update(items)
+
+    def find(self, note_path: str) -> str | None:
+        """
+        按笔记路径查找会话 ID
+
+        Args:
+            note_path: 规范化的知识库相对路径
+
+        Returns:
+            会话 ID，未登记时返回 None
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT session_id FROM session_index WHERE note_path = ? LIMIT 1", (note_path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def items(self) -> dict[str, str]:
+        """
+        获取全部映射
+
+        Returns:
+            {会话 ID: 笔记路径}
+        """
+        with self._connection() as conn:
+            rows = conn.execute("SELECT session_id, note_path FROM session_index").fetchall()
+        return dict(rows)
+
+    def remove(self, session_id: str) -> None:
+        """
+        移除会话的映射
+
+        Args:
+            session_id: 会话 ID
+        """
+        self._known.pop(session_id, None)
+        if not self.db_path.exists():
+            return
+        with self._connection() as conn:
+            conn.execute("DELETE FROM session_index WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        """关闭独占连接（共用连接池时由连接池负责关闭）"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """借出自动提交模式的连接，首次使用时建表；异常时回滚未提交的事务"""
+        if self._connect is not None:
+            with self._connect() as conn:
+                if not self._schema_ready:
+                    with self._lock:
+                        conn.executescript(_SCHEMA)
+                        self._schema_ready = True
+                yield conn
+            return
+
+        with self._lock:
+            if self._conn is None:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._conn = conn
+            try:
+                yield self._conn
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                raise
@@ -0,0 +1,271 @@
+"""
+会话锁模块
+同一会话的“读取 - 滚动摘要 - 写回”必须串行执行，否则并发请求会互相覆盖、静默丢失消息：
+- 进程内：按会话划分的 asyncio 锁，不同会话互不阻塞
+- 跨进程：锁文件上的建议锁（POSIX 用 fcntl.flock，Windows 用 msvcrt.locking）
+
+等待时间有上限，超时抛出 ConflictException；同时统计锁竞争情况
+"""
+import asyncio
+import errno
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ...core import ConflictException, get_logger
+from ...core.io_executor import run_io
+
+logger = get_logger(__name__)
+
+# 建议锁被占用时的错误码
+_BUSY_ERRNOS = {errno.EACCES, errno.EAGAIN, errno.EWOULDBLOCK, getattr(errno, "EDEADLOCK", errno.EDEADLK)}
+
+# 轮询建议锁的初始与最大间隔（秒）
+_POLL_INITIAL = 0.005
+_POLL_MAX = 0.1
+
+# 等待超过该时长（秒）时记录日志
+_SLOW_WAIT = 1.0
+
+
+def _open_lock_file(lock_path: Path) -> int:
+    """打开（必要时创建）锁文件"""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _try_lock_file(fd: int) -> bool:
+    """非阻塞地获取锁文件上的排他建议锁，被占用时返回 False"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError as e:
+        if e.errno in _BUSY_ERRNOS:
+            return False
+        raise
+
+
+def _unlock_file(fd: int) -> None:
+    """释放建议锁并关闭锁文件"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+class _SessionEntry:
+    """会话锁条目（users 为持有或等待该锁的协程数，归零时移除）"""
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionLockManager:
+    """按会话划分的锁管理器"""
+
+    def __init__(self, timeout: float = 30.0):
+        """
+        初始化会话锁管理器
+
+        Args:
+            timeout: 获取锁的最长等待时间（秒），需覆盖一次摘要生成的耗时
+        """
+        self.timeout = timeout
+
+        # 只在事件循环线程中访问
+        self._entries: dict[str, _SessionEntry] = {}
+        self._stats_lock = threading.Lock()
+
+        self.acquired = 0
+        self.contended = 0
+        self.file_contended = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @asynccontextmanager
+    async def hold(self, key: str, lock_path: Path | None = None, timeout: float | None = None) -> AsyncIterator[None]:
+        """
+        独占持有会话锁
+
+        Args:
+            key: 会话锁键
+            lock_path: 跨进程建议锁的锁文件，为 None 时只做进程内互斥
+            timeout: 最长等待时间（秒），为 None 时使用默认值
+
+        Raises:
+            ConflictException: 等待超时
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _SessionEntry()
+        entry.users += 1
+        try:
+            contended = entry.lock.locked()
+            if not contended:
+                # 无竞争时直接获取，不经过 wait_for 创建任务
+                await entry.lock.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(entry.lock.acquire(), timeout)
+                except asyncio.TimeoutError:
+                    self._record_timeout(key, contended, started)
+                    raise ConflictException("会话正忙，请稍后重试", error_code="SESSION_BUSY") from None
+
+            fd: int | None = None
+            try:
+                if lock_path is not None:
+                    fd = await self._acquire_file(key, lock_path, started + timeout, started)
+                self._record_acquired(key, contended, started)
+                yield
+            finally:
+                if fd is not None:
+                    _unlock_file(fd)
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                self._entries.pop(key, None)
+
+    @contextmanager
+    def hold_sync(self, lock_path: Path, timeout: float | None = None) -> Iterator[bool]:
+        """
+        在工作线程中持有跨进程建议锁（用于同步写入与后台压缩）
+
+        同一进程内持有该会话锁的协程也持有建议锁，因此这里同样会与之互斥
+
+        Args:
+            lock_path: 锁文件路径
+            timeout: 最长等待时间（秒），为 None 时使用默认值
+
+        Yields:
+            是否成功获取；超时返回 False，由调用方决定跳过还是报错
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        fd = self._acquire_file_sync(lock_path, started + timeout, started)
+        if fd is None:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock_file(fd)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        获取锁竞争统计信息
+
+        Returns:
+            包含获取次数、发生等待次数、跨进程等待次数、超时次数与等待耗时的字典
+        """
+        with self._stats_lock:
+            return {
+                "active": len(self._entries),
+                "acquired": self.acquired,
+                "contended": self.contended,
+                "file_contended": self.file_contended,
+                "timeouts": self.timeouts,
+                "wait_total": round(self.wait_total, 4),
+                "wait_max": round(self.wait_max, 4),
+                "wait_avg": round(self.wait_total / self.acquired, 4) if self.acquired else 0.0,
+            }
+
+    async def _acquire_file(
+        self,
+        key: str,
+        lock_path: Path,
+        deadline: float,
+        started: float
+    ) -> int:
+        """在截止时间前轮询获取建议锁（不阻塞事件循环）"""
+        fd = await run_io(_open_lock_file, lock_path)
+        delay = _POLL_INITIAL
+        file_contended = False
+        try:
+            while not _try_lock_file(fd):
+                if not file_contended:
+                    file_contended = True
+                    with self._stats_lock:
+                        self.file_contended += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._record_timeout(key, True, started)
+                    raise ConflictException("会话正忙，请稍后重试", error_code="SESSION_BUSY")
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, _POLL_MAX)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def _acquire_file_sync(self, lock_path: Path, deadline: float, started: float) -> int | None:
+        """在截止时间前轮询获取建议锁（阻塞当前线程），超时返回 None"""
+        fd = _open_lock_file(lock_path)
+        delay = _POLL_INITIAL
+        contended = False
+        try:
+            while not _try_lock_file(fd):
+                if not contended:
+                    contended = True
+                    with self._stats_lock:
+                        self.file_contended += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._record_timeout(str(lock_path), True, started)
+                    os.close(fd)
+                    return None
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, _POLL_MAX)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._record_acquired(str(lock_path), contended, started)
+        return fd
+
+    def _record_acquired(self, key: str, contended: bool, started: float) -> None:
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self.acquired += 1
+            if contended:
+                self.contended += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        if waited > _SLOW_WAIT:
+            logger.info(f"等待会话锁 {waited:.2f}s: {key}")
+
+    def _record_timeout(self, key: str, contended: bool, started: float) -> None:
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self.timeouts += 1
+            if contended:
+                self.contended += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        logger.warning(f"等待会话锁超时（{waited:.2f}s）: {key}")
+
+
+# 全局会话锁管理器
+session_locks = SessionLockManager()
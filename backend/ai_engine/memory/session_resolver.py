@@ -1,5 +1,35 @@
 """会话标识解析器（业务层不可见）"""
-from pathlib import Path
+import hashlib
+import posixpath
+
+
+def normalize_note_path(path: str) -> str:
+    """
+    规范化笔记的知识库相对路径（统一为 / 分隔，去掉多余的 ./ 与首尾分隔符）
+
+    Args:
+        path: 知识库相对路径
+
+    Returns:
+        规范化后的相对路径
+    """
+    normalized = posixpath.normpath(path.replace("\\", "/").strip()).lstrip("/")
+    return "" if normalized == "." else normalized
+
+
+def session_id_for(note_path: str) -> str:
+    """
+    由笔记的知识库相对路径计算稳定的会话 ID
+
+    不同目录下的同名笔记得到不同的 ID；ID 前两位用作存储分片目录
+
+    Args:
+        note_path: 知识库相对路径
+
+    Returns:
+        会话 ID（40 位十六进制）
+    """
+    return hashlib.sha1(normalize_note_path(note_path).encode("utf-8")).hexdigest()
 
 
 class SessionResolver:
@@ -21,10 +51,27 @@ class SessionResolver:
         Raises:
             ValueError: 无法确定会话标识
         """
-        # advise 和 edit 任务使用 filename 作为会话标识
+        return session_id_for(self.resolve_note_path(task_type, **kwargs))
+
+    def resolve_note_path(self, task_type: str, **kwargs) -> str:
+        """解析会话对应的笔记路径
+
+        Args:
+            task_type: 任务类型 ('advise', 'edit')
+            **kwargs: 业务参数
+
+        Returns:
+            规范化后的知识库相对路径
+
+        Raises:
+            ValueError: 无法确定会话标识
+        """
+        # advise 和 edit 任务以笔记的知识库相对路径区分会话
         if task_type in {"advise", "edit"}:
             filename = kwargs.get("filename")
             if filename:
-                return Path(filename).name
+                note_path = normalize_note_path(filename)
+                if note_path:
+                    return note_path
 
         raise ValueError(f"无法为任务类型 {task_type} 确定会话标识")
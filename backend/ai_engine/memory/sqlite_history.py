@@ -0,0 +1,429 @@
+"""
+SQLite 会话历史存储
+所有会话保存在单个 WAL 模式数据库中：消息按 (session_id, seq) 聚簇存储，摘要单独成表；
+首次打开时一次性迁移已有的 JSONL 会话文件
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Iterator, Sequence
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from ...core import ConflictException, get_logger
+from .chat_history import DEFAULT_HISTORY_TOKENS, FileChatMessageHistory, SummaryChatMessageHistory
+from .history_store import HistoryBackend, group_notes_by_name
+from .rollup_queue import RollupQueue, rollup_queue
+from .session_archive import ARCHIVE_SUFFIX, decompress_session
+from .session_index import SessionIndex
+from .session_resolver import session_id_for
+
+logger = get_logger(__name__)
+
+# 存储结构版本
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# 迁移时单个事务写入的会话数
+_MIGRATE_BATCH = 200
+
+
+class _ConnectionPool:
+    """SQLite 连接池（按需创建，最多 size 个连接，线程间复用）"""
+
+    def __init__(self, db_path: Path, size: int):
+        self.db_path = db_path
+        self.size = size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """借出一个连接，用完归还；异常时回滚未提交的事务"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """关闭全部空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if not create:
+            # 连接已全部借出，等待归还
+            try:
+                return self._idle.get(timeout=30)
+            except queue.Empty:
+                raise ConflictException("会话存储繁忙，请稍后重试", error_code="SESSION_BUSY") from None
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            return conn
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """单个 SQLite 数据库保存全部会话"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path, pool_size: int = 4, migrate_from: Path | None = None):
+        """
+        初始化 SQLite 后端（数据库在首次使用时打开）
+
+        Args:
+            db_path: 数据库文件路径
+            pool_size: 连接池大小
+            migrate_from: 首次打开时从该目录迁移 JSONL 会话文件
+        """
+        self.db_path = db_path
+        self.migrate_from = migrate_from
+        # 跨进程会话锁的锁文件目录
+        self.lock_dir = db_path.with_name(f"{db_path.name}.locks")
+        self._pool = _ConnectionPool(db_path, pool_size)
+        # 反向索引与会话数据共用一个数据库和连接池
+        self.index = SessionIndex(db_path, self._pool.connection)
+        self._ready = False
+        self._init_lock = threading.Lock()
+
+    def get_history(self, session_id: str, **kwargs) -> "SQLiteChatMessageHistory":
+        return SQLiteChatMessageHistory(session_id, backend=self, **kwargs)
+
+    def list_sessions(self) -> list[str]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT session_id FROM messages UNION SELECT session_id FROM summaries"
+            ).fetchall()
+        return [session_id for (session_id,) in rows]
+
+    def delete_session(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            conn.execute("COMMIT")
+        self.index.remove(session_id)
+
+    def close(self) -> None:
+        self.index.close()
+        self._pool.close()
+
+    def compact_sessions(self, checkpoint: Callable[[], bool] | None = None) -> dict[str, int]:
+        # 会话重写已在事务中删除旧行，这里只需把 WAL 合并回主库并截断
+        report = {"scanned": 0, "compacted": 0, "reclaimed_bytes": 0}
+        if not self._ready or (checkpoint is not None and not checkpoint()):
+            return report
+
+        wal_path = self.db_path.with_name(f"{self.db_path.name}-wal")
+        wal_size = wal_path.stat().st_size if wal_path.exists() else 0
+        with self._connection() as conn:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            conn.execute("PRAGMA optimize")
+        report["scanned"] = 1
+        if not busy:
+            report["compacted"] = 1
+            report["reclaimed_bytes"] = wal_size - (wal_path.stat().st_size if wal_path.exists() else 0)
+        return report
+
+    def disk_usage(self) -> dict[str, int]:
+        # 删除的行只会变成空闲页，不缩小数据库文件，因此 SQLite 后端不做归档
+        usage = {"active_sessions": 0, "active_bytes": 0, "archived_sessions": 0, "archived_bytes": 0}
+        if not self.db_path.exists():
+            return usage
+        usage["active_sessions"] = len(self.list_sessions())
+        for suffix in ("", "-wal", "-shm"):
+            path = self.db_path.with_name(f"{self.db_path.name}{suffix}")
+            if path.exists():
+                usage["active_bytes"] += path.stat().st_size
+        return usage
+
+    def migrate_legacy_sessions(self, note_paths: Iterable[str]) -> int:
+        registered = self.index.items()
+        legacy_ids = [session_id for session_id in self.list_sessions() if session_id not in registered]
+        if not legacy_ids:
+            return 0
+
+        by_name = group_notes_by_name(note_paths)
+        migrated: dict[str, str] = {}
+        with self._connection() as conn:
+            for legacy_id in legacy_ids:
+                targets = by_name.get(legacy_id)
+                if not targets:
+                    continue
+                # 每个旧会话在一个事务中复制给同名的每篇笔记，然后删除
+                conn.execute("BEGIN IMMEDIATE")
+                for note_path in targets:
+                    session_id = session_id_for(note_path)
+                    if conn.execute("SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)).fetchone():
+                        continue
+                    conn.execute(
+                        "INSERT INTO messages (session_id, seq, message, created_at) "
+                        "SELECT ?, seq, message, created_at FROM messages WHERE session_id = ?",
+                        (session_id, legacy_id)
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries (session_id, summary, updated_at) "
+                        "SELECT ?, summary, updated_at FROM summaries WHERE session_id = ?",
+                        (session_id, legacy_id)
+                    )
+                    migrated[session_id] = note_path
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (legacy_id,))
+                conn.execute("DELETE FROM summaries WHERE session_id = ?", (legacy_id,))
+                conn.execute("COMMIT")
+
+        self.index.register_many(migrated)
+        if migrated:
+            logger.info(f"已将 {len(migrated)} 个旧版会话迁移为按笔记路径哈希的 ID")
+        return len(migrated)
+
+    # ==================== 会话读写 ====================
+
+    def load(self, session_id: str) -> tuple[str | None, list[BaseMessage]]:
+        """
+        读取会话的摘要与消息
+
+        Args:
+            session_id: 会话 ID
+
+        Returns:
+            (摘要, 按顺序排列的消息)
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE session_id = ?", (session_id,)).fetchone()
+            rows = conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return (row[0] if row else None), messages_from_dict([json.loads(message) for (message,) in rows])
+
+    def append(
+        self,
+        session_id: str,
+        messages: Sequence[BaseMessage],
+        summary: str | None = None,
+        checkpoint: bool = False
+    ) -> None:
+        """
+        追加消息；checkpoint 为 True 时以 (summary, messages) 替换会话的全部内容
+
+        Args:
+            session_id: 会话 ID
+            messages: 消息列表
+            summary: 滚动后的摘要（仅 checkpoint）
+            checkpoint: 是否替换会话的完整状态
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # seq 单调递增，替换状态时也不复用旧序号
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            if checkpoint:
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                if summary:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries (session_id, summary, updated_at) VALUES (?, ?, ?)",
+                        (session_id, summary, now)
+                    )
+                else:
+                    conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                (
+                    (session_id, next_seq + index, json.dumps(message_to_dict(msg), ensure_ascii=False), now)
+                    for index, msg in enumerate(messages)
+                )
+            )
+            conn.execute("COMMIT")
+
+    # ==================== 初始化与迁移 ====================
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """借出连接，首次使用时建表并迁移"""
+        if not self._ready:
+            self._initialize()
+        with self._pool.connection() as conn:
+            yield conn
+
+    def _initialize(self) -> None:
+        with self._init_lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._pool.connection() as conn:
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                if self.migrate_from is not None:
+                    self._migrate_jsonl(conn, self.migrate_from)
+            self._ready = True
+
+    def _migrate_jsonl(self, conn: sqlite3.Connection, sessions_dir: Path) -> None:
+        """
+        一次性导入 JSONL 会话文件
+
+        包括分片目录、归档目录与旧版平铺的会话文件，JSONL 的反向索引一并导入；
+        已导入的文件重命名为 .jsonl.migrated 作为备份；数据库中已存在的会话不覆盖
+        """
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'jsonl_migrated'").fetchone():
+            return
+
+        files = sorted([
+            *sessions_dir.glob("*.jsonl"),
+            *sessions_dir.glob("??/*.jsonl"),
+            *sessions_dir.glob(f"archive/??/*{ARCHIVE_SUFFIX}"),
+        ]) if sessions_dir.is_dir() else []
+        started = time.perf_counter()
+        migrated = 0
+
+        for start in range(0, len(files), _MIGRATE_BATCH):
+            batch = files[start:start + _MIGRATE_BATCH]
+            conn.execute("BEGIN IMMEDIATE")
+            for session_file in batch:
+                if session_file.name.endswith(ARCHIVE_SUFFIX):
+                    session_id = session_file.name[:-len(ARCHIVE_SUFFIX)]
+                else:
+                    session_id = session_file.stem
+                if conn.execute("SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)).fetchone():
+                    continue
+                try:
+                    summary, messages = self._read_jsonl_session(session_id, session_file)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"迁移会话失败: {session_id} | {e}")
+                    continue
+
+                now = session_file.stat().st_mtime
+                if summary:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries (session_id, summary, updated_at) VALUES (?, ?, ?)",
+                        (session_id, summary, now)
+                    )
+                conn.executemany(
+                    "INSERT INTO messages (session_id, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                    (
+                        (session_id, seq, json.dumps(message_to_dict(msg), ensure_ascii=False), now)
+                        for seq, msg in enumerate(messages)
+                    )
+                )
+                migrated += 1
+            conn.execute("COMMIT")
+
+            # 提交后再重命名，崩溃时最多重复导入（已存在的会话会被跳过）
+            for session_file in batch:
+                try:
+                    session_file.rename(session_file.with_name(f"{session_file.name}.migrated"))
+                except OSError:
+                    pass
+
+        jsonl_index = sessions_dir / "index.db"
+        if jsonl_index.exists():
+            index = SessionIndex(jsonl_index)
+            try:
+                self.index.register_many(index.items())
+            finally:
+                index.close()
+
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('jsonl_migrated', ?)", (str(time.time()),))
+        if files:
+            elapsed = time.perf_counter() - started
+            logger.info(f"已将 {migrated} 个 JSONL 会话迁移到 SQLite，耗时 {elapsed:.2f}s")
+
+
+    @staticmethod
+    def _read_jsonl_session(session_id: str, session_file: Path) -> tuple[str | None, list[BaseMessage]]:
+        """读取 JSONL 会话文件或归档（归档直接解压，不恢复到会话目录）"""
+        if session_file.name.endswith(ARCHIVE_SUFFIX):
+            lines = decompress_session(session_file.read_bytes()).split(b"\n")
+            return FileChatMessageHistory._parse_records(lines)
+        return FileChatMessageHistory(session_id, base_dir=session_file.parent, cache=None)._load()
+
+
+class SQLiteChatMessageHistory(SummaryChatMessageHistory):
+    """基于 SQLite 后端的会话历史"""
+
+    def __init__(
+        self,
+        session_id: str,
+        backend: SQLiteHistoryBackend,
+        max_history_tokens: int = DEFAULT_HISTORY_TOKENS,
+        summarizer: Callable[[str | None, list[BaseMessage]], Awaitable[str]] | None = None,
+        lock_timeout: float | None = None,
+        rollup_queue: RollupQueue | None = rollup_queue
+    ):
+        """
+        Args:
+            session_id: 会话 ID
+            backend: SQLite 存储后端
+            max_history_tokens: 历史（摘要 + 消息）的 token 预算，超出时滚动摘要
+            summarizer: 摘要生成函数
+            lock_timeout: 等待会话锁的最长时间（秒）
+            rollup_queue: 后台摘要滚动队列，为 None 时在写入后直接滚动
+        """
+        super().__init__(session_id, max_history_tokens, summarizer, lock_timeout, rollup_queue)
+        self.backend = backend
+
+    def _clear(self) -> None:
+        self.backend.delete_session(self.session_id)
+
+    def _lock_path(self) -> Path:
+        # 摘要生成耗时较长，不能用数据库事务跨越整个读改写，改用按会话的锁文件
+        return self.backend.lock_dir / f"{self.session_id}.lock"
+
+    def _load(self) -> tuple[str | None, list[BaseMessage]]:
+        return self.backend.load(self.session_id)
+
+    def _append(self, messages: Sequence[BaseMessage], summary: str | None = None, checkpoint: bool = False) -> int:
+        # 替换状态时直接删除旧消息，不留失效记录
+        self.backend.append(self.session_id, messages, summary, checkpoint)
+        return 0
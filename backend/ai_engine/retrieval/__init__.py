@@ -0,0 +1,6 @@
+"""检索增强模块（笔记分块、本地向量化与上下文选择）"""
+from .chunker import Chunk, MarkdownChunker
+from .vector_store import HashingVectorizer, VectorStore
+from .retriever import ContextRetriever
+
+__all__ = ['Chunk', 'MarkdownChunker', 'HashingVectorizer', 'VectorStore', 'ContextRetriever']
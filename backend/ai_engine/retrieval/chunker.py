@@ -0,0 +1,144 @@
+"""
+Markdown 分块器
+按标题与段落切分笔记，保证代码块完整，并提取文档大纲
+"""
+import re
+
+from ..token_estimator import estimate_tokens
+
+_HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+# 超长段落按句子切分
+_SENTENCE_PATTERN = re.compile(r'(?<=[。！？；.!?;])\s*')
+
+
+class Chunk:
+    """笔记片段"""
+    __slots__ = ('index', 'heading', 'text', 'line', 'tokens')
+
+    def __init__(self, index: int, heading: str, text: str, line: int, tokens: int):
+        self.index = index
+        self.heading = heading  # 所属标题路径，如 "第一章 > 背景"
+        self.text = text
+        self.line = line  # 起始行号（从 1 开始）
+        self.tokens = tokens
+
+
+class MarkdownChunker:
+    """按标题与段落切分 Markdown 笔记"""
+
+    def __init__(self, max_tokens: int = 256):
+        """
+        初始化分块器
+
+        Args:
+            max_tokens: 单个片段的 token 上限（单个代码块除外）
+        """
+        self.max_tokens = max_tokens
+
+    def split(self, content: str) -> tuple[list[Chunk], list[tuple[int, str]]]:
+        """
+        切分笔记
+
+        片段不跨越标题；同一标题下的相邻段落在不超过上限时合并为一个片段
+
+        Args:
+            content: 笔记内容
+
+        Returns:
+            (片段列表, 大纲)，大纲为 (标题级别, 标题文本) 列表
+        """
+        chunks: list[Chunk] = []
+        outline: list[tuple[int, str]] = []
+        headings: list[tuple[int, str]] = []
+
+        buffer: list[str] = []
+        buffer_tokens = 0
+        buffer_line = 0
+
+        def flush() -> None:
+            nonlocal buffer, buffer_tokens
+            if buffer:
+                heading = " > ".join(title for _, title in headings)
+                chunks.append(Chunk(len(chunks), heading, "\n\n".join(buffer), buffer_line + 1, buffer_tokens))
+            buffer = []
+            buffer_tokens = 0
+
+        def add_block(text: str, line: int, splittable: bool) -> None:
+            nonlocal buffer_tokens, buffer_line
+            tokens = estimate_tokens(text)
+            if buffer and buffer_tokens + tokens > self.max_tokens:
+                flush()
+            if tokens > self.max_tokens and splittable:
+                for piece in self._split_long(text):
+                    add_block(piece, line, False)
+                return
+            if not buffer:
+                buffer_line = line
+            buffer.append(text)
+            buffer_tokens += tokens
+
+        block: list[str] = []
+        block_line = 0
+        fence: str | None = None
+
+        def end_block(splittable: bool = True) -> None:
+            if block:
+                add_block("\n".join(block), block_line, splittable)
+                block.clear()
+
+        for lineno, line in enumerate(content.split('\n')):
+            if fence is not None:
+                block.append(line)
+                if line.strip().startswith(fence):
+                    # 代码块保持完整
+                    end_block(splittable=False)
+                    fence = None
+                continue
+
+            fence_match = _FENCE_PATTERN.match(line)
+            if fence_match:
+                end_block()
+                block_line = lineno
+                block.append(line)
+                fence = fence_match.group(1)
+                continue
+
+            heading_match = _HEADING_PATTERN.match(line)
+            if heading_match:
+                end_block()
+                flush()
+                level = len(heading_match.group(1))
+                title = heading_match.group(2)
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, title))
+                outline.append((level, title))
+                continue
+
+            if not line.strip():
+                end_block()
+                continue
+
+            if not block:
+                block_line = lineno
+            block.append(line)
+
+        end_block(splittable=fence is None)
+        flush()
+        return chunks, outline
+
+    def _split_long(self, text: str) -> list[str]:
+        """将超长段落按句子切分，单句仍超长时按字符硬切"""
+        pieces: list[str] = []
+        for sentence in _SENTENCE_PATTERN.split(text):
+            if not sentence:
+                continue
+            if estimate_tokens(sentence) <= self.max_tokens:
+                pieces.append(sentence)
+            else:
+                # 按中文每字 1 token 的保守估算切分
+                size = self.max_tokens
+                pieces.extend(sentence[i:i + size] for i in range(0, len(sentence), size))
+        return pieces
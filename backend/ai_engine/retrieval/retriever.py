@@ -0,0 +1,127 @@
+"""
+上下文检索器
+长笔记只把文档大纲与和问题最相关的片段放入提示词，短笔记保持全文
+"""
+import hashlib
+from pathlib import Path
+
+from ..token_estimator import estimate_tokens
+from .chunker import Chunk, MarkdownChunker
+from .vector_store import HashingVectorizer, VectorStore, np
+
+# 向量格式版本，分块或向量化方式变化时递增，使旧向量失效
+_VECTOR_VERSION = 1
+
+
+class ContextRetriever:
+    """基于本地向量的笔记上下文选择器"""
+
+    def __init__(
+        self,
+        store_dir: Path,
+        budget_tokens: int = 3000,
+        full_note_tokens: int = 2000,
+        top_k: int = 8,
+        chunk_tokens: int = 256
+    ):
+        """
+        初始化检索器
+
+        Args:
+            store_dir: 向量存储目录
+            budget_tokens: 放入提示词的笔记内容 token 预算（含大纲）
+            full_note_tokens: 笔记不超过该长度时直接使用全文
+            top_k: 最多选取的片段数
+            chunk_tokens: 单个片段的 token 上限
+        """
+        self.budget_tokens = budget_tokens
+        self.full_note_tokens = full_note_tokens
+        self.top_k = top_k
+        self.chunker = MarkdownChunker(max_tokens=chunk_tokens)
+        self.vectorizer = HashingVectorizer()
+        self.store = VectorStore(store_dir)
+
+    @staticmethod
+    def available() -> bool:
+        """numpy 可用时才能启用检索"""
+        return np is not None
+
+    def select(self, content: str, question: str) -> str:
+        """
+        选择放入提示词的笔记内容
+
+        Args:
+            content: 笔记全文
+            question: 用户问题
+
+        Returns:
+            短笔记返回全文；长笔记返回大纲加最相关片段（按原文顺序排列）
+        """
+        if not self.available() or estimate_tokens(content) <= max(self.full_note_tokens, self.budget_tokens):
+            return content
+
+        chunks, outline = self.chunker.split(content)
+        if len(chunks) <= 1:
+            return content
+
+        outline_text = self._render_outline(outline, self.budget_tokens // 4)
+        remaining = self.budget_tokens - estimate_tokens(outline_text)
+
+        scores = self._score(content, chunks, question)
+        selected: list[Chunk] = []
+        for index in np.argsort(-scores, kind='stable'):
+            if len(selected) >= self.top_k:
+                break
+            chunk = chunks[int(index)]
+            if chunk.tokens <= remaining:
+                selected.append(chunk)
+                remaining -= chunk.tokens
+
+        if not selected:
+            return content
+
+        selected.sort(key=lambda chunk: chunk.index)
+        return self._render(outline_text, selected, len(chunks))
+
+    def _score(self, content: str, chunks: list[Chunk], question: str) -> 'np.ndarray':
+        """计算各片段与问题的相关度（片段内 TF-IDF 加权的余弦相似度）"""
+        fingerprint = hashlib.sha1(
+            f"{_VECTOR_VERSION}:{self.vectorizer.dim}:{self.chunker.max_tokens}\n{content}".encode('utf-8')
+        ).hexdigest()
+
+        matrix = self.store.get(fingerprint)
+        if matrix is None or matrix.shape != (len(chunks), self.vectorizer.dim):
+            # 标题路径一并向量化，使“背景”“结论”等章节名参与匹配
+            matrix = self.vectorizer.transform([f"{chunk.heading}\n{chunk.text}" for chunk in chunks])
+            self.store.put(fingerprint, matrix)
+
+        query = self.vectorizer.transform([question])[0]
+
+        # 在本笔记的片段集合内计算 IDF，压低各片段都出现的词
+        df = np.count_nonzero(matrix, axis=0)
+        idf = np.log((1.0 + len(chunks)) / (1.0 + df)) + 1.0
+        weighted = np.asarray(matrix) * idf
+        weighted_query = query * idf
+
+        norms = np.linalg.norm(weighted, axis=1) * (np.linalg.norm(weighted_query) or 1.0)
+        return np.divide(weighted @ weighted_query, norms, out=np.zeros(len(chunks), dtype=np.float32), where=norms > 0)
+
+    def _render_outline(self, outline: list[tuple[int, str]], budget: int) -> str:
+        """渲染文档大纲，超出预算时只保留较高级别的标题"""
+        for max_level in (6, 3, 2, 1):
+            lines = [f"{'  ' * (level - 1)}- {title}" for level, title in outline if level <= max_level]
+            text = "\n".join(lines)
+            if estimate_tokens(text) <= budget:
+                return text
+        return ""
+
+    def _render(self, outline_text: str, chunks: list[Chunk], total: int) -> str:
+        """拼接大纲与选中的片段"""
+        parts = []
+        if outline_text:
+            parts.append(f"【文档大纲】\n{outline_text}")
+        parts.append(f"【相关片段】（共 {total} 段，选取与问题最相关的 {len(chunks)} 段，其余内容已省略）")
+        for chunk in chunks:
+            location = f"{chunk.heading}（第 {chunk.line} 行）" if chunk.heading else f"第 {chunk.line} 行"
+            parts.append(f"--- {location} ---\n{chunk.text}")
+        return "\n\n".join(parts)
@@ -0,0 +1,152 @@
+"""
+本地向量化与向量存储
+使用带符号的特征哈希把文本映射为定长向量（离线、无需模型），按内容指纹持久化为可内存映射的 .npy 文件
+"""
+import os
+import tempfile
+import zlib
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时检索增强不可用
+    np = None
+
+from ...core import get_logger
+from ...utils.text_utils import tokenize
+
+
+logger = get_logger(__name__)
+
+
+class HashingVectorizer:
+    """特征哈希向量化器（中文二元组 + 英文单词，次线性词频，L2 归一化）"""
+
+    def __init__(self, dim: int = 2048):
+        """
+        初始化向量化器
+
+        Args:
+            dim: 向量维度
+        """
+        self.dim = dim
+
+    def transform(self, texts: list[str]) -> 'np.ndarray':
+        """
+        将文本批量转换为向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            形状为 (len(texts), dim) 的 float32 矩阵
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            if not counts:
+                continue
+            # crc32 跨进程稳定，保证持久化的向量在重启后仍可比较
+            hashes = np.fromiter(
+                (zlib.crc32(term.encode('utf-8')) for term in counts), dtype=np.uint32, count=len(counts)
+            )
+            weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            # 用最高位决定符号，抵消哈希冲突带来的偏差
+            weights[(hashes & 0x80000000) != 0] *= -1.0
+            np.add.at(matrix[row], hashes % self.dim, weights)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class VectorStore:
+    """按内容指纹存储片段向量矩阵（.npy 文件，读取时内存映射）"""
+
+    def __init__(self, store_dir: Path, max_files: int = 2000):
+        """
+        初始化向量存储
+
+        Args:
+            store_dir: 存储目录
+            max_files: 最多保留的向量文件数，超出时删除最久未使用的文件
+        """
+        self.store_dir = store_dir
+        self.max_files = max_files
+        self._writes = 0
+
+    def get(self, fingerprint: str) -> 'np.ndarray | None':
+        """
+        读取向量矩阵（内存映射，只读）
+
+        Args:
+            fingerprint: 内容指纹
+
+        Returns:
+            向量矩阵，不存在或损坏时返回 None
+        """
+        path = self._path(fingerprint)
+        try:
+            matrix = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"向量文件损坏，将重新生成: {path.name} | {e}")
+            return None
+
+        # 更新访问时间，供清理时判断最近使用
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return matrix
+
+    def put(self, fingerprint: str, matrix: 'np.ndarray') -> None:
+        """
+        写入向量矩阵（先写临时文件再替换，避免读到半个文件）
+
+        Args:
+            fingerprint: 内容指纹
+            matrix: 向量矩阵
+        """
+        path = self._path(fingerprint)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, matrix)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"写入向量文件失败: {path.name} | {e}")
+            return
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune()
+
+    def _path(self, fingerprint: str) -> Path:
+        """向量文件路径（按指纹前两位分目录）"""
+        return self.store_dir / fingerprint[:2] / f"{fingerprint}.npy"
+
+    def _prune(self) -> None:
+        """删除最久未使用的向量文件，使文件数不超过上限"""
+        files = []
+        for path in self.store_dir.glob("*/*.npy"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+
+        excess = len(files) - self.max_files
+        if excess <= 0:
+            return
+
+        files.sort()
+        for _, path in files[:excess]:
+            try:
+                path.unlink()
+            except OSError:
+                # Windows 下仍被内存映射的文件无法删除，下次再清理
+                continue
+        logger.info(f"已清理 {excess} 个过期向量文件")
@@ -0,0 +1,84 @@
+"""
+Token 估算
+不依赖模型分词器，按字符类别快速估算文本的 token 数，用于上下文预算控制
+"""
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import BaseMessage
+
+from ..utils.text_utils import count_cjk
+
+# 非中日韩字符（英文、数字、标点、空白）平均每个 token 对应的字符数
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+
+    中日韩字符按每字 1 个 token 计算，其余字符按每 4 个字符 1 个 token 计算，
+    估算值略偏保守，适合做预算上限
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = count_cjk(text)
+    return cjk + (len(text) - cjk + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# 每条消息的角色与分隔符开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# 记忆化的条目上限与最短文本长度（短文本直接计算比查表更划算）
+_MEMO_MAX_ENTRIES = 4096
+_MEMO_MIN_CHARS = 256
+
+# (长度, 字符串哈希) -> token 数；只保存定长的键，不持有消息正文，
+# 会话被逐出缓存后整篇笔记内容不会因此常驻内存
+_memo: OrderedDict[tuple[int, int], int] = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _estimate_content_tokens(text: str) -> int:
+    if len(text) < _MEMO_MIN_CHARS:
+        return estimate_tokens(text)
+
+    # str 的哈希值缓存在字符串对象上，同一条消息重复计数时无需再次扫描
+    key = (len(text), hash(text))
+    with _memo_lock:
+        tokens = _memo.get(key)
+        if tokens is not None:
+            _memo.move_to_end(key)
+            return tokens
+
+    tokens = estimate_tokens(text)
+    with _memo_lock:
+        _memo[key] = tokens
+        if len(_memo) > _MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return tokens
+
+
+def estimate_message_tokens(message: BaseMessage) -> int:
+    """
+    估算单条消息的 token 数（含角色开销）
+
+    按消息内容记忆化，会话历史在每轮窗口选择与滚动判断中反复计数时不重复扫描
+
+    Args:
+        message: LangChain 消息
+
+    Returns:
+        估算的 token 数
+    """
+    content = message.content
+    if not isinstance(content, str):
+        content = str(content)
+    return MESSAGE_OVERHEAD_TOKENS + _estimate_content_tokens(content)
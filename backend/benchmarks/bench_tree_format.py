@@ -0,0 +1,122 @@
+"""
+文件树格式基准测试
+对比嵌套格式（FileTreeNode + DataResponse 序列化）与紧凑格式（平行数组）的响应体大小与 CPU 耗时
+
+用法（在项目根目录执行）:
+    python -m backend.benchmarks.bench_tree_format              # 生成合成知识库
+    python -m backend.benchmarks.bench_tree_format <知识库路径>  # 使用已有知识库
+"""
+import argparse
+import gzip
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from ..routes.knowledge_routes import _compact_tree_response
+from ..schemas.responses import DataResponse, FileTreeData
+from ..services import VaultIndexService
+
+
+def build_synthetic_vault(root: Path, dirs: int, files_per_dir: int, depth: int) -> int:
+    """
+    生成合成知识库：每层 dirs 个子目录、每个目录 files_per_dir 篇笔记
+
+    Returns:
+        生成的文件数
+    """
+    count = 0
+    level = [root]
+    for d in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(files_per_dir):
+                (parent / f"笔记-{d}-{i:03d} meeting notes.md").write_text("# note\n", encoding='utf-8')
+                count += 1
+            for i in range(dirs):
+                child = parent / f"项目 {d}-{i:02d}"
+                child.mkdir()
+                next_level.append(child)
+        level = next_level
+    for parent in level:
+        for i in range(files_per_dir):
+            (parent / f"叶子笔记-{i:03d}.md").write_text("# leaf\n", encoding='utf-8')
+            count += 1
+    return count
+
+
+def measure(func, rounds: int) -> float:
+    """执行 rounds 次并返回单次平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def run(vault_path: Path, rounds: int) -> None:
+    """对指定知识库执行基准测试并打印结果"""
+    index = VaultIndexService()
+    index.start(vault_path)
+    index.get_tree(vault_path)
+
+    def nested_cold() -> bytes:
+        # 清空节点缓存，模拟文件树变化后的首次请求
+        index._node_cache.clear()
+        tree = index.get_tree(vault_path)
+        return DataResponse[FileTreeData](data=FileTreeData(tree=tree), message="文件树获取成功").model_dump_json().encode('utf-8')
+
+    def nested_warm() -> bytes:
+        tree = index.get_tree(vault_path)
+        return DataResponse[FileTreeData](data=FileTreeData(tree=tree), message="文件树获取成功").model_dump_json().encode('utf-8')
+
+    def compact_cold() -> bytes:
+        index._compact_cache = None
+        return _compact_tree_response(index.get_compact_tree(vault_path), {}).body
+
+    def compact_warm() -> bytes:
+        return _compact_tree_response(index.get_compact_tree(vault_path), {}).body
+
+    nested_body = nested_cold()
+    compact_body = compact_cold()
+    nodes = len(json.loads(compact_body)["data"]["names"])
+
+    rows = [
+        ("nested", len(nested_body), len(gzip.compress(nested_body)), measure(nested_cold, rounds), measure(nested_warm, rounds)),
+        ("compact", len(compact_body), len(gzip.compress(compact_body)), measure(compact_cold, rounds), measure(compact_warm, rounds)),
+    ]
+    index.stop()
+
+    print(f"知识库: {vault_path}  节点数: {nodes}  轮数: {rounds}")
+    print(f"{'格式':<10}{'响应体(B)':>14}{'gzip(B)':>12}{'冷构建(ms)':>14}{'缓存命中(ms)':>16}")
+    for name, size, gz_size, cold, warm in rows:
+        print(f"{name:<10}{size:>14,}{gz_size:>12,}{cold:>14.2f}{warm:>16.3f}")
+
+    nested, compact = rows
+    print(
+        f"紧凑格式: 响应体 {compact[1] / nested[1]:.1%}，gzip 后 {compact[2] / nested[2]:.1%}，"
+        f"冷构建耗时 {compact[3] / nested[3]:.1%}，缓存命中耗时 {compact[4] / nested[4]:.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文件树格式基准测试")
+    parser.add_argument("vault", nargs="?", type=Path, help="知识库路径，缺省时生成合成知识库")
+    parser.add_argument("--rounds", type=int, default=20, help="每项测试的执行轮数")
+    parser.add_argument("--dirs", type=int, default=6, help="合成知识库每层子目录数")
+    parser.add_argument("--files", type=int, default=20, help="合成知识库每个目录的笔记数")
+    parser.add_argument("--depth", type=int, default=4, help="合成知识库目录层数")
+    args = parser.parse_args()
+
+    if args.vault is not None:
+        run(args.vault.resolve(), args.rounds)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        count = build_synthetic_vault(root, args.dirs, args.files, args.depth)
+        print(f"已生成合成知识库: {count} 个文件")
+        run(root, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ from .exceptions import (
     BaseBusinessException,
     NotFoundException,
     ValidationException,
+    PreconditionFailedException,
+    ConflictException,
+    ServiceUnavailableException,
     ExternalServiceException,
     ConfigError
 )
@@ -15,14 +18,18 @@ from .exception_handlers import (
     business_exception_handler,
     generic_exception_handler
 )
-from .logger import setup_logging, get_logger
+from .logger import setup_logging, get_logger, rotate_logs
 from .config_context import ConfigContext
+from .io_executor import IOExecutor, io_executor, run_io
 
 __all__ = [
     # 异常类
     "BaseBusinessException",
     "NotFoundException",
     "ValidationException",
+    "PreconditionFailedException",
+    "ConflictException",
+    "ServiceUnavailableException",
     "ExternalServiceException",
     "ConfigError",
     # 异常处理器
@@ -34,6 +41,11 @@ __all__ = [
     # 日志
     "setup_logging",
     "get_logger",
+    "rotate_logs",
     # 配置上下文
     "ConfigContext",
+    # I/O 执行器
+    "IOExecutor",
+    "io_executor",
+    "run_io",
 ]
@@ -34,6 +34,24 @@ class ValidationException(BaseBusinessException):
         super().__init__(message=message, error_code=error_code, status_code=422)
 
 
+class PreconditionFailedException(BaseBusinessException):
+    """前置条件不满足异常（如 If-Match 版本不一致）"""
+    def __init__(self, message: str, error_code: Optional[str] = None):
+        super().__init__(message=message, error_code=error_code, status_code=412)
+
+
+class ConflictException(BaseBusinessException):
+    """资源冲突异常（如基准版本已过期）"""
+    def __init__(self, message: str, error_code: Optional[str] = None):
+        super().__init__(message=message, error_code=error_code, status_code=409)
+
+
+class ServiceUnavailableException(BaseBusinessException):
+    """服务暂不可用异常（如索引尚未就绪）"""
+    def __init__(self, message: str, error_code: Optional[str] = None):
+        super().__init__(message=message, error_code=error_code, status_code=503)
+
+
 class ExternalServiceException(BaseBusinessException):
     """外部服务异常"""
     def __init__(self, message: str, error_code: Optional[str] = None):
@@ -0,0 +1,169 @@
+"""
+阻塞 I/O 执行器
+将知识库、配置与会话历史的同步磁盘操作放到专用线程池执行，避免阻塞事件循环
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar('T')
+
+
+class IOExecutor:
+    """带排队与耗时统计的 I/O 线程池"""
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "vault-io"):
+        """
+        初始化 I/O 执行器
+
+        Args:
+            max_workers: 最大工作线程数
+            thread_name_prefix: 线程名前缀
+        """
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+
+        # 统计指标
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+        self._max_run = 0.0
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在 I/O 线程池中执行同步函数
+
+        Args:
+            func: 同步函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值（异常会原样抛出）
+        """
+        call = functools.partial(func, *args, **kwargs)
+        submitted_at = time.perf_counter()
+
+        with self._lock:
+            self._queued += 1
+
+        def task() -> T:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+
+            failed = False
+            try:
+                return call()
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._record(started_at - submitted_at, time.perf_counter() - started_at, failed)
+
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            # 线程池已关闭等情况下提交失败
+            with self._lock:
+                self._queued -= 1
+            raise
+        # 开始执行前被取消（调用方取消、客户端断开或关闭线程池）的任务不会进入 task，在此扣减排队数
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def resize(self, max_workers: int) -> None:
+        """
+        调整线程池大小（已提交的任务在旧线程池中继续执行）
+
+        Args:
+            max_workers: 新的最大工作线程数
+        """
+        if max_workers < 1 or max_workers == self.max_workers:
+            return
+
+        old_pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.thread_name_prefix)
+        self.max_workers = max_workers
+        old_pool.shutdown(wait=False)
+        logger.info(f"I/O 线程池大小已调整为 {max_workers}")
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        获取执行器统计信息
+
+        Returns:
+            包含排队深度、运行中任务数与耗时（毫秒）的字典
+        """
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "avg_wait_ms": self._total_wait / finished * 1000 if finished else 0.0,
+                "avg_run_ms": self._total_run / finished * 1000 if finished else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "max_run_ms": self._max_run * 1000,
+            }
+
+    def _on_done(self, future: Future) -> None:
+        """任务结束回调：统计开始执行前被取消的任务"""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._cancelled += 1
+
+    def _record(self, wait: float, run: float, failed: bool) -> None:
+        """记录一次任务的排队与执行耗时"""
+        with self._lock:
+            self._running -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            self._total_wait += wait
+            self._total_run += run
+            self._max_wait = max(self._max_wait, wait)
+            self._max_run = max(self._max_run, run)
+
+
+# 全局 I/O 执行器实例
+io_executor = IOExecutor()
+
+
+async def run_io(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    在全局 I/O 线程池中执行同步函数
+
+    Args:
+        func: 同步函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        函数返回值
+    """
+    return await io_executor.run(func, *args, **kwargs)
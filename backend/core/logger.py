@@ -3,6 +3,7 @@
 """
 import logging
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -11,6 +12,9 @@ from datetime import datetime
 LOG_DIR = Path(__file__).parent.parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# 日志文件保留天数
+LOG_RETENTION_DAYS = 30
+
 
 def setup_logging():
     """
@@ -70,6 +74,52 @@ def setup_logging():
     return root_logger
 
 
+def rotate_logs(retention_days: int = LOG_RETENTION_DAYS) -> dict[str, int]:
+    """
+    滚动日志文件并删除过期日志
+
+    进程跨天运行时把文件处理器切换到当天的日志文件，再删除修改时间早于保留天数的日志
+
+    Args:
+        retention_days: 日志文件保留天数
+
+    Returns:
+        包含是否切换了日志文件（rotated）与删除文件数（removed）的字典
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    root_logger = logging.getLogger()
+    rotated = 0
+    for handler in list(root_logger.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            continue
+        current = Path(handler.baseFilename)
+        prefix, _, date = current.stem.rpartition("_")
+        if not prefix or date == today:
+            continue
+
+        new_handler = logging.FileHandler(current.with_name(f"{prefix}_{today}.log"), encoding="utf-8")
+        new_handler.setLevel(handler.level)
+        new_handler.setFormatter(handler.formatter)
+        root_logger.addHandler(new_handler)
+        root_logger.removeHandler(handler)
+        handler.close()
+        rotated = 1
+
+    active = {Path(h.baseFilename) for h in root_logger.handlers if isinstance(h, logging.FileHandler)}
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    for log_file in LOG_DIR.glob("*.log"):
+        if log_file in active:
+            continue
+        try:
+            if log_file.stat().st_mtime < cutoff:
+                log_file.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return {"rotated": rotated, "removed": removed}
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     获取指定名称的日志器
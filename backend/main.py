@@ -1,23 +1,35 @@
 """
 FastAPI 主应用 - 应用初始化和路由注册
 """
+import asyncio
 from fastapi import FastAPI
 from pathlib import Path
 
 # 导入路由模块
-from .routes import ai_router, config_router, knowledge_router
+from .routes import ai_router, config_router, knowledge_router, admin_router
 
 # 导入全局异常处理器
-from .core import register_exception_handlers, get_logger, ConfigContext
+from .core import register_exception_handlers, get_logger, ConfigContext, io_executor, run_io, rotate_logs
 
 # 导入配置管理器
 from .utils.config_manager import config_manager
 
 # 导入 AI 引擎
 from .ai_engine import AIEngine
+from .ai_engine.memory import create_history_backend, rollup_queue, session_cache
+from .ai_engine.retrieval import ContextRetriever
 
-# 导入清理服务
+# 导入清理服务与后台维护调度器
 from .services.cleanup_service import SessionCleanupService
+from .services.maintenance_service import MaintenanceScheduler, MaintenanceBudget
+
+# 导入知识库索引服务
+from .services.vault_index_service import VaultIndexService
+from .services.search_index_service import SearchIndexService
+from .services.link_graph_service import LinkGraphService
+from .services.metadata_index_service import MetadataIndexService
+from .utils.knowledge_utils import register_write_listener
+from .utils.content_cache import content_cache
 
 logger = get_logger(__name__)
 
@@ -35,26 +47,44 @@ async def startup_event():
     """应用启动时执行"""
     logger.info("应用启动中...")
 
-    # 初始化清理服务单例
-    app.state.cleanup_service = SessionCleanupService()
+    # 初始化知识库索引服务单例
+    app.state.vault_index = VaultIndexService()
+    register_write_listener(app.state.vault_index.notify_path_changed)
+
+    # 初始化清理服务单例（复用知识库索引的文件列表）
+    app.state.cleanup_service = SessionCleanupService(vault_index=app.state.vault_index)
+
+    # 会话历史存储后端（按配置创建）
+    app.state.history_backend = None
+
+    # 初始化后台维护调度器单例
+    app.state.maintenance = MaintenanceScheduler()
+    _register_maintenance_jobs()
+
+    # 初始化全文搜索索引服务单例（订阅知识库索引的文件变更）
+    app.state.search_index = SearchIndexService(app.state.vault_index)
+
+    # 初始化链接图谱服务单例（订阅知识库索引的文件变更）
+    app.state.link_graph = LinkGraphService(app.state.vault_index)
+
+    # 初始化笔记元数据索引服务单例（订阅知识库索引的文件变更）
+    app.state.metadata_index = MetadataIndexService(app.state.vault_index)
 
     # 注册配置变更监听器
     _register_config_listeners()
 
     # 尝试从配置文件加载配置
     try:
-        config = config_manager.read_config()
+        config = await config_manager.aread_config()
         if config:
             logger.info(f"已加载配置: Obsidian Vault={config.obsidian_vault_path}, 模型={config.model_name}")
 
             # 更新配置上下文（自动触发所有监听器，创建 AIEngine 和 AIService）
             app.state.config_context.update(config)
 
-            # 启动时自动清理孤儿会话
+            # 启动时在后台线程中清理孤儿会话，不等待完成
             if config.obsidian_vault_path:
-                cleaned_count = await app.state.cleanup_service.cleanup_orphaned_sessions()
-                if cleaned_count > 0:
-                    logger.info(f"启动时清理了 {cleaned_count} 个孤儿会话")
+                app.state.cleanup_service.start_background_cleanup()
         else:
             logger.warning("未找到配置文件，请在界面中配置")
             app.state.ai_engine = None
@@ -62,6 +92,9 @@ async def startup_event():
     except Exception as e:
         logger.error(f"加载配置失败: {e}")
 
+    # 启动后台维护（首次执行在一个间隔之后）
+    app.state.maintenance.start()
+
     logger.info("应用初始化完成")
 
 
@@ -70,6 +103,25 @@ async def shutdown_event():
     """应用关闭时执行"""
     logger.info("应用关闭中...")
 
+    # 停止后台维护，执行中的任务在下一个检查点结束
+    app.state.maintenance.stop()
+
+    # 停止知识库索引监听与后台索引（在 I/O 线程池中等待工作线程提交并退出，不阻塞事件循环）
+    await asyncio.gather(
+        run_io(app.state.search_index.stop, 5.0),
+        run_io(app.state.link_graph.stop, 5.0),
+        run_io(app.state.metadata_index.stop, 5.0)
+    )
+    app.state.vault_index.stop()
+
+    # 等待进行中的摘要滚动，再关闭会话历史存储
+    await rollup_queue.close()
+    if app.state.history_backend is not None:
+        app.state.history_backend.close()
+
+    # 关闭 I/O 线程池
+    io_executor.shutdown()
+
 
 def _register_config_listeners():
     """注册配置变更监听器"""
@@ -85,8 +137,32 @@ def _register_config_listeners():
             model_name=config.model_name or "qwen3-max"
         )
 
+        # 检索增强（需要 numpy），向量按内容指纹缓存在配置目录下
+        retriever = None
+        if config.advise_retrieval and ContextRetriever.available():
+            retriever = ContextRetriever(
+                store_dir=config_manager.config_dir / "vectors",
+                budget_tokens=config.advise_context_tokens,
+                full_note_tokens=config.advise_full_note_tokens,
+                top_k=config.advise_top_k
+            )
+
+        # 会话历史存储后端只在配置的后端类型变化时重建
+        history_backend = app.state.history_backend
+        if history_backend is None or history_backend.name != config.history_backend:
+            if history_backend is not None:
+                history_backend.close()
+            history_backend = create_history_backend(config.history_backend)
+            app.state.history_backend = history_backend
+            app.state.cleanup_service.history_backend = history_backend
+
         # 重建 AIService（使用新的 AIEngine）
-        app.state.ai_service = AIService(app.state.ai_engine)
+        app.state.ai_service = AIService(
+            app.state.ai_engine,
+            retriever,
+            history_backend,
+            config.history_token_budgets
+        )
 
     app.state.config_context.register_listener(update_ai_components)
 
@@ -98,7 +174,24 @@ def _register_config_listeners():
 
     app.state.config_context.register_listener(update_cleanup_notes_root)
 
-    # 监听器 3：更新提示词配置
+    # 监听器 3：重建知识库索引
+    def update_vault_index(config):
+        """知识库路径变化时重建文件树索引、全文索引、链接图谱与元数据索引"""
+        vault_path = Path(config.obsidian_vault_path) if config.obsidian_vault_path else None
+        # 全文索引、链接图谱与元数据索引注册了启动监听，随文件树索引一同启动
+        if vault_path and vault_path.is_dir() and not app.state.vault_index.is_serving(vault_path):
+            app.state.vault_index.start(vault_path)
+
+    app.state.config_context.register_listener(update_vault_index)
+
+    # 监听器 4：调整 I/O 线程池大小
+    def update_io_executor(config):
+        """按配置调整 I/O 线程池大小"""
+        io_executor.resize(config.io_max_workers)
+
+    app.state.config_context.register_listener(update_io_executor)
+
+    # 监听器 5：更新提示词配置
     def update_prompts(config):
         """更新提示词配置"""
         from .ai_engine.config.prompt_config import PromptConfigFactory
@@ -108,10 +201,62 @@ def _register_config_listeners():
     app.state.config_context.register_listener(update_prompts)
 
 
+def _register_maintenance_jobs():
+    """注册后台维护任务"""
+    scheduler = app.state.maintenance
+
+    # 任务 1：清理孤儿会话（启动时已执行一次）
+    def cleanup_sessions(budget: MaintenanceBudget):
+        """清理笔记已删除的会话"""
+        report = app.state.cleanup_service.run_cleanup(checkpoint=budget.checkpoint)
+        return {**report, "orphans": len(report["orphans"])}
+
+    scheduler.add_job("session_cleanup", cleanup_sessions, interval=6 * 3600, budget=60.0)
+
+    # 任务 2：压缩会话存储
+    def compact_history(budget: MaintenanceBudget):
+        """回收会话存储中失效记录占用的空间"""
+        history_backend = app.state.history_backend
+        if history_backend is None:
+            return None
+        return history_backend.compact_sessions(budget.checkpoint)
+
+    scheduler.add_job("history_compaction", compact_history, interval=3600, budget=30.0)
+
+    # 任务 3：压缩归档长期闲置的会话
+    def archive_history(budget: MaintenanceBudget):
+        """把闲置超过配置天数的会话移入压缩归档"""
+        history_backend = app.state.history_backend
+        archive_days = app.state.config_context.config.history_archive_days if history_backend else 0
+        if archive_days <= 0:
+            return None
+        return history_backend.archive_idle_sessions(archive_days * 86400, budget.checkpoint)
+
+    scheduler.add_job("history_archive", archive_history, interval=6 * 3600, budget=60.0, initial_delay=600.0)
+
+    # 任务 4：清理长时间未访问的缓存条目
+    def trim_caches(budget: MaintenanceBudget):
+        """释放长时间未访问的会话缓存与笔记内容缓存"""
+        return {
+            "session_cache": session_cache.trim(1800),
+            "content_cache": content_cache.trim(1800),
+        }
+
+    scheduler.add_job("cache_trim", trim_caches, interval=600, budget=5.0)
+
+    # 任务 5：跨天切换日志文件并删除过期日志
+    def rotate_log_files(budget: MaintenanceBudget):
+        """滚动日志文件"""
+        return rotate_logs()
+
+    scheduler.add_job("log_rotation", rotate_log_files, interval=3600, budget=5.0, initial_delay=60.0)
+
+
 # 注册路由
 app.include_router(ai_router, tags=["AI"])
 app.include_router(config_router, tags=["config"])
 app.include_router(knowledge_router, tags=["knowledge"])
+app.include_router(admin_router, tags=["admin"])
 
 
 
@@ -5,5 +5,6 @@
 from .ai_routes import router as ai_router
 from .config_routes import router as config_router
 from .knowledge_routes import router as knowledge_router
+from .admin_routes import router as admin_router
 
-__all__ = ['ai_router', 'config_router', 'knowledge_router']
\ No newline at end of file
+__all__ = ['ai_router', 'config_router', 'knowledge_router', 'admin_router']
\ No newline at end of file
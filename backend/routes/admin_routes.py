@@ -0,0 +1,50 @@
+"""
+运维相关路由
+查看后台维护任务的运行状态与运行时统计
+"""
+from fastapi import APIRouter, Depends
+
+from ..ai_engine.memory import session_cache, session_locks
+from ..core import io_executor
+from ..services import MaintenanceScheduler
+from ..services.dependencies import get_maintenance_scheduler
+from ..utils.content_cache import content_cache, encoding_cache
+from ..schemas import DataResponse, MaintenanceStatusData, RuntimeStatsData
+
+
+# 创建路由器
+router = APIRouter(prefix="/admin", tags=["运维"])
+
+
+@router.get("/jobs", response_model=DataResponse[MaintenanceStatusData])
+async def get_maintenance_jobs(scheduler: MaintenanceScheduler = Depends(get_maintenance_scheduler)):
+    """
+    查看后台维护任务（执行间隔、预算、最近一次执行结果与下次执行时间）
+
+    Returns:
+        DataResponse[MaintenanceStatusData]: 调度器状态
+    """
+    return DataResponse[MaintenanceStatusData](
+        data=MaintenanceStatusData(**scheduler.status()),
+        message="维护任务状态获取成功"
+    )
+
+
+@router.get("/stats", response_model=DataResponse[RuntimeStatsData])
+async def get_runtime_stats():
+    """
+    查看运行时统计（I/O 线程池排队深度与耗时、文件内容、编码与会话历史缓存的命中与淘汰、会话锁竞争）
+
+    Returns:
+        DataResponse[RuntimeStatsData]: 运行时统计
+    """
+    return DataResponse[RuntimeStatsData](
+        data=RuntimeStatsData(
+            io=io_executor.stats(),
+            content_cache=content_cache.stats(),
+            encoding_cache=encoding_cache.stats(),
+            session_cache=session_cache.stats(),
+            session_locks=session_locks.stats()
+        ),
+        message="运行时统计获取成功"
+    )
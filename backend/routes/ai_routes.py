@@ -5,9 +5,10 @@ AI相关路由
 from fastapi import APIRouter, Depends
 from starlette.responses import StreamingResponse
 
+from ..ai_engine.memory import rollup_queue
 from ..services import AIService
 from ..services.dependencies import get_ai_service
-from ..schemas import ChatRequest, OptimizeRequest, EditRequest
+from ..schemas import ChatRequest, OptimizeRequest, EditRequest, DataResponse, RollupStatusData
 from ..utils import create_json_stream
 from ..core.exceptions import ValidationException
 
@@ -125,3 +126,19 @@ async def edit_document(
         media_type="text/plain; charset=utf-8",
         headers=STREAM_HEADERS
     )
+
+
+@router.get("/history/rollups", response_model=DataResponse[RollupStatusData])
+async def get_rollup_status():
+    """
+    查看后台摘要滚动队列（排队、执行中与最近失败的滚动）
+
+    队列是进程级单例，AI 服务尚未配置时也可以查看
+
+    Returns:
+        DataResponse[RollupStatusData]: 队列状态
+    """
+    return DataResponse[RollupStatusData](
+        data=RollupStatusData(**rollup_queue.status()),
+        message="摘要滚动状态获取成功"
+    )
@@ -7,7 +7,7 @@ from fastapi import APIRouter, Request
 from ..utils.config_manager import config_manager
 from ..schemas.requests import UpdateConfigRequest
 from ..schemas.responses import DataResponse, BaseResponse, ConfigData
-from ..core import get_logger
+from ..core import get_logger, run_io
 
 
 logger = get_logger(__name__)
@@ -24,7 +24,7 @@ async def get_config():
     Returns:
         DataResponse[ConfigData]: 包含配置数据的响应
     """
-    config = config_manager.read_config()
+    config = await config_manager.aread_config()
     if config is None:
         from ..core.exceptions import NotFoundException
         raise NotFoundException("配置文件不存在，请先创建配置")
@@ -52,7 +52,8 @@ async def update_config(request: UpdateConfigRequest, http_request: Request):
         DataResponse[ConfigData]: 包含更新后配置数据的响应
     """
     # 写入配置文件
-    config = config_manager.write_config(
+    config = await run_io(
+        config_manager.write_config,
         obsidian_vault_path=request.obsidian_vault_path,
         api_key=request.api_key,
         model_name=request.model_name,
@@ -82,7 +83,7 @@ async def delete_config():
     Returns:
         BaseResponse: 操作结果响应
     """
-    success = config_manager.delete_config()
+    success = await run_io(config_manager.delete_config)
     if not success:
         from ..core.exceptions import NotFoundException
         raise NotFoundException("配置文件不存在，无需删除")
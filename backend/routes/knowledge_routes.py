@@ -2,42 +2,140 @@
 知识库相关路由
 处理知识库文件树扫描、文件读取等操作
 """
-from pathlib import Path
+import json
+import mimetypes
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Literal
 
-from fastapi import APIRouter
-from ..utils.config_manager import config_manager
-from ..utils import read_knowledge_file
-from ..utils.knowledge_utils import write_file, build_file_tree
-from ..schemas.responses import DataResponse, FileTreeData, FileReadResult, FileWriteResult
-from ..schemas.requests import FileUpdateRequest
-from ..core.exceptions import NotFoundException, ValidationException
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from ..utils import aread_knowledge_file, awrite_file, apatch_file
+from ..utils.knowledge_utils import aget_file_stat, aget_vault_path, aread_files, file_fingerprint, open_raw_file
+from ..utils.http_cache import (
+    make_etag, format_http_date, if_none_match, if_range, parse_range
+)
+from ..services import VaultIndexService, SearchIndexService, LinkGraphService, MetadataIndexService
+from ..services.dependencies import get_vault_index, get_search_index, get_link_graph, get_metadata_index
+from ..schemas.responses import (
+    DataResponse, FileTreeData, FileTreePage, FileReadResult, FileWriteResult, SearchResultData, LinkData,
+    BatchFileResult, BatchReadData, TagListData, NoteListData, NoteMetaData, MetaStatsData
+)
+from ..schemas.requests import FileUpdateRequest, FilePatchRequest, BatchReadRequest
+from ..core.exceptions import BaseBusinessException, NotFoundException
+from ..core.io_executor import run_io
 
 # 创建路由器
 router = APIRouter(prefix="/knowledge", tags=["知识库"])
 
+# 原始文件流式传输的分块大小
+RAW_CHUNK_SIZE = 64 * 1024
 
-@router.get("/tree", response_model=DataResponse[FileTreeData])
-async def get_file_tree():
+# 紧凑文件树格式的媒体类型（也可通过 format=compact 查询参数选择）
+TREE_COMPACT_MEDIA_TYPE = "application/vnd.knowledge.tree-compact+json"
+
+# 等待文件树索引初始扫描的最长时间（秒），超时返回 503，避免长期占用 I/O 线程
+TREE_WAIT_TIMEOUT = 30.0
+
+
+def _wants_compact_tree(request: Request, tree_format: str | None) -> bool:
+    """判断客户端是否请求紧凑格式的文件树（查询参数优先于 Accept 头）"""
+    if tree_format is not None:
+        return tree_format == "compact"
+    return TREE_COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _compact_tree_response(payload: bytes, headers: dict[str, str]) -> Response:
+    """
+    直接拼接紧凑文件树的响应体
+
+    外层结构与 DataResponse 一致，data 部分使用索引缓存的序列化结果，不经过 Pydantic 校验
+    """
+    envelope = '{"success":true,"message":"文件树获取成功","timestamp":%s,"data":' % json.dumps(
+        datetime.now().isoformat()
+    )
+    return Response(
+        content=envelope.encode('utf-8') + payload + b'}',
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def _validator_headers(etag: str, last_modified: float | None = None) -> dict[str, str]:
+    """构建缓存校验响应头（要求客户端每次使用前重新验证）"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+@router.get("/tree", response_model=DataResponse[FileTreeData] | DataResponse[FileTreePage])
+async def get_file_tree(
+    request: Request,
+    response: Response,
+    path: str | None = Query(None, description="分层加载的目录路径，空字符串表示根目录"),
+    depth: int | None = Query(None, ge=1, le=8, description="展开层数"),
+    cursor: str | None = Query(None, description="分页游标"),
+    limit: int | None = Query(None, ge=1, le=1000, description="每页最大节点数"),
+    tree_format: Literal["nested", "compact"] | None = Query(None, alias="format", description="完整文件树的返回格式"),
+    vault_index: VaultIndexService = Depends(get_vault_index)
+):
     """
-    获取知识库文件树
+    获取知识库文件树（由常驻内存的知识库索引提供）
+
+    传入 path/depth/cursor/limit 任一参数时进入分层加载模式，
+    只返回指定目录的一页子节点，目录节点带 has_children 标记。
+
+    完整文件树可通过 format=compact 或 Accept: application/vnd.knowledge.tree-compact+json
+    选择紧凑格式：data 为 {format, names, parents, flags} 平行数组，
+    parents 为父节点下标（根目录下为 -1），flags 为 1 表示目录。
+
+    支持 If-None-Match 条件请求，文件树未变化时返回 304
 
     Returns:
-        DataResponse[FileTreeData]: 包含文件树数据的响应
+        DataResponse[FileTreeData]: 包含完整文件树的响应
+        DataResponse[FileTreePage]: 分层加载模式下包含单页子节点的响应
     """
-    # 读取配置
-    config = config_manager.read_config()
-    if not config:
-        raise NotFoundException("请先配置 Obsidian Vault 路径")
+    # 读取配置并校验知识库路径
+    vault_path = await aget_vault_path()
+
+    paged = path is not None or depth is not None or cursor is not None or limit is not None
+    compact = not paged and _wants_compact_tree(request, tree_format)
 
-    vault_path = Path(config.obsidian_vault_path)
-    if not vault_path.exists():
-        raise NotFoundException(f"知识库路径不存在: {config.obsidian_vault_path}")
+    # 先取版本标识再取文件树，保证返回的文件树不旧于 ETag
+    # 索引首次扫描可能耗时较长，统一放到 I/O 线程池中等待
+    # 两种格式的响应体不同，ETag 需要区分
+    tree_etag = await run_io(vault_index.tree_etag, vault_path, TREE_WAIT_TIMEOUT)
+    etag = make_etag(f"{tree_etag}-compact" if compact else tree_etag)
+    headers = _validator_headers(etag)
+    headers["Vary"] = "Accept"
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
 
-    if not vault_path.is_dir():
-        raise ValidationException(f"知识库路径不是目录: {config.obsidian_vault_path}")
+    response.headers.update(headers)
 
-    # 构建文件树
-    tree = build_file_tree(vault_path)
+    # 分层加载模式
+    if paged:
+        nodes, next_cursor = await run_io(
+            vault_index.list_dir,
+            vault_path,
+            path=path or '',
+            depth=depth or 1,
+            cursor=cursor,
+            limit=limit or 200,
+            timeout=TREE_WAIT_TIMEOUT
+        )
+        return DataResponse[FileTreePage](
+            data=FileTreePage(path=(path or '').strip('/'), tree=nodes, next_cursor=next_cursor),
+            message="目录获取成功"
+        )
+
+    # 紧凑格式：索引直接产出序列化好的平行数组
+    if compact:
+        payload = await run_io(vault_index.get_compact_tree, vault_path, TREE_WAIT_TIMEOUT)
+        return _compact_tree_response(payload, headers)
+
+    # 从索引获取文件树
+    tree = await run_io(vault_index.get_tree, vault_path, TREE_WAIT_TIMEOUT)
 
     return DataResponse[FileTreeData](
         data=FileTreeData(tree=tree),
@@ -45,41 +143,381 @@ async def get_file_tree():
     )
 
 
+@router.get("/search", response_model=DataResponse[SearchResultData])
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=200, description="搜索关键词"),
+    limit: int = Query(20, ge=1, le=100, description="返回结果数量"),
+    search_index: SearchIndexService = Depends(get_search_index)
+):
+    """
+    全文搜索笔记内容（BM25 排序，支持中文）
+
+    Args:
+        q: 搜索关键词
+        limit: 返回结果数量上限
+
+    Returns:
+        DataResponse[SearchResultData]: 包含搜索结果的响应
+    """
+    hits, total = await run_io(search_index.search, q, limit)
+
+    return DataResponse[SearchResultData](
+        data=SearchResultData(query=q, total=total, hits=hits, indexing=not search_index.ready),
+        message="搜索完成"
+    )
+
+
+@router.get("/links/{relative_path:path}", response_model=DataResponse[LinkData])
+async def get_file_links(
+    relative_path: str,
+    link_graph: LinkGraphService = Depends(get_link_graph)
+):
+    """
+    查询文件的出链、反链与未解析链接（由常驻内存的链接图谱提供）
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+
+    Returns:
+        DataResponse[LinkData]: 包含链接关系的响应
+    """
+    # 校验路径并确认文件存在
+    await aget_file_stat(relative_path)
+
+    path = relative_path.replace('\\', '/').strip('/')
+    links = link_graph.get_links(path)
+
+    return DataResponse[LinkData](
+        data=LinkData(path=path, indexing=not link_graph.ready, **links),
+        message="链接获取成功"
+    )
+
+
+@router.get("/meta/tags", response_model=DataResponse[TagListData])
+async def list_tags(
+    prefix: str | None = Query(None, max_length=200, description="只列出该标签及其子标签"),
+    metadata_index: MetadataIndexService = Depends(get_metadata_index)
+):
+    """
+    列出知识库中的标签及其笔记数（由元数据索引提供，不读取笔记文件）
+
+    Args:
+        prefix: 只列出该标签及其子标签
+
+    Returns:
+        DataResponse[TagListData]: 包含标签列表的响应
+    """
+    tags = await run_io(metadata_index.list_tags, prefix)
+
+    return DataResponse[TagListData](
+        data=TagListData(tags=tags, indexing=not metadata_index.ready),
+        message="标签获取成功"
+    )
+
+
+@router.get("/meta/notes", response_model=DataResponse[NoteListData])
+async def list_notes_meta(
+    tag: str | None = Query(None, max_length=200, description="按标签筛选（含子标签）"),
+    limit: int = Query(50, ge=1, le=500, description="返回数量"),
+    offset: int = Query(0, ge=0, description="跳过的数量"),
+    metadata_index: MetadataIndexService = Depends(get_metadata_index)
+):
+    """
+    按标签筛选笔记，返回标题、字数与标签
+
+    Args:
+        tag: 标签，为空时列出全部笔记
+        limit: 返回数量上限
+        offset: 跳过的数量
+
+    Returns:
+        DataResponse[NoteListData]: 包含笔记摘要列表的响应
+    """
+    items, total = await run_io(metadata_index.find_notes, tag, limit, offset)
+
+    return DataResponse[NoteListData](
+        data=NoteListData(tag=tag, total=total, items=items, indexing=not metadata_index.ready),
+        message="笔记列表获取成功"
+    )
+
+
+@router.get("/meta/stats", response_model=DataResponse[MetaStatsData])
+async def get_meta_stats(metadata_index: MetadataIndexService = Depends(get_metadata_index)):
+    """
+    获取知识库整体统计（笔记数、总字数、标签数）
+
+    Returns:
+        DataResponse[MetaStatsData]: 包含统计信息的响应
+    """
+    summary = await run_io(metadata_index.summary)
+
+    return DataResponse[MetaStatsData](
+        data=MetaStatsData(**summary, indexing=not metadata_index.ready),
+        message="统计获取成功"
+    )
+
+
+@router.get("/meta/note/{relative_path:path}", response_model=DataResponse[NoteMetaData])
+async def get_note_meta(
+    relative_path: str,
+    metadata_index: MetadataIndexService = Depends(get_metadata_index)
+):
+    """
+    获取单篇笔记的元数据：frontmatter、标签、标题大纲（含字节偏移）、字数与内容哈希
+
+    Args:
+        relative_path: 相对于知识库根目录的笔记路径
+
+    Returns:
+        DataResponse[NoteMetaData]: 包含笔记元数据的响应
+    """
+    path = relative_path.replace('\\', '/').strip('/')
+    meta = await run_io(metadata_index.get_note, path)
+    if meta is None:
+        raise NotFoundException(f"笔记元数据不存在: {path}")
+
+    return DataResponse[NoteMetaData](
+        data=NoteMetaData(**meta, indexing=not metadata_index.ready),
+        message="元数据获取成功"
+    )
+
+
 @router.get("/file/{relative_path:path}", response_model=DataResponse[FileReadResult])
-async def get_file_content(relative_path: str):
+async def get_file_content(relative_path: str, request: Request, response: Response):
     """
     读取文件内容
 
+    支持 If-None-Match 条件请求，文件未变化时仅 stat 即返回 304
+
     Args:
         relative_path: 相对于知识库根目录的文件路径
 
     Returns:
         DataResponse[FileReadResult]: 包含文件内容的响应
     """
+    file_stat = await aget_file_stat(relative_path)
+    headers = _validator_headers(make_etag(file_fingerprint(file_stat)), file_stat.st_mtime)
+    if if_none_match(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
     # 使用工具层读取文件，复用已有逻辑
-    file_info = read_knowledge_file(relative_path)
-    
+    file_info = await aread_knowledge_file(relative_path)
+    response.headers.update(headers)
+
     return DataResponse[FileReadResult](
         data=file_info,
         message="文件读取成功"
     )
 
 
+# Python 编码名到 IANA 注册字符集名的映射（带 BOM 的 UTF-8 在 HTTP 中仍声明为 UTF-8）
+_IANA_CHARSETS = {
+    "utf-8": "UTF-8",
+    "utf-8-sig": "UTF-8",
+    "utf-16": "UTF-16",
+    "gb18030": "GB18030",
+}
+
+
+def _raw_media_type(filename: str, encoding: str | None) -> str:
+    """根据文件名与探测到的编码确定 Content-Type"""
+    media_type = mimetypes.guess_type(filename)[0]
+    if encoding is None:
+        return media_type or "application/octet-stream"
+
+    if media_type is None or not media_type.startswith("text/"):
+        media_type = "text/markdown" if filename.lower().endswith(('.md', '.markdown')) else "text/plain"
+    charset = _IANA_CHARSETS.get(encoding.lower(), encoding)
+    return f"{media_type}; charset={charset}"
+
+
+async def _iter_file(file: BinaryIO, start: int, length: int) -> AsyncIterator[bytes]:
+    """分块读取文件指定区间，读取在 I/O 线程池中执行，结束或客户端断开时关闭文件"""
+    try:
+        await run_io(file.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await run_io(file.read, min(RAW_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _batch_result(path: str, result: FileReadResult | BaseBusinessException) -> BatchFileResult:
+    """将单个文件的读取结果或异常转换为批量结果项"""
+    if isinstance(result, BaseBusinessException):
+        return BatchFileResult(
+            path=path,
+            success=False,
+            message=result.message,
+            error_code=result.error_code,
+            status_code=result.status_code
+        )
+    return BatchFileResult(path=path, success=True, data=result)
+
+
+@router.post("/files:batch", response_model=DataResponse[BatchReadData])
+async def read_files_batch(request: BatchReadRequest, http_request: Request):
+    """
+    批量读取文件内容
+
+    知识库路径只解析一次，文件在 I/O 线程池中并发读取，单个文件失败不影响其他文件。
+    请求体 stream 为 True 或 Accept 为 application/x-ndjson 时，以 NDJSON 按完成顺序
+    逐行返回 BatchFileResult；否则返回按请求顺序排列的完整结果
+
+    Args:
+        request: 包含文件路径列表的请求体
+
+    Returns:
+        DataResponse[BatchReadData] 或 NDJSON 流
+    """
+    # 去重并保持顺序
+    paths = list(dict.fromkeys(request.paths))
+
+    if request.stream or "application/x-ndjson" in http_request.headers.get("accept", ""):
+        # 知识库未配置等错误在开始流式传输前抛出，由全局异常处理器返回
+        results = aread_files(paths)
+        first = await anext(results, None)
+
+        async def generate():
+            if first is not None:
+                yield _batch_result(paths[first[0]], first[1]).model_dump_json() + "\n"
+            async for index, result in results:
+                yield _batch_result(paths[index], result).model_dump_json() + "\n"
+
+        return StreamingResponse(
+            generate(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    ordered: list[BatchFileResult | None] = [None] * len(paths)
+    async for index, result in aread_files(paths):
+        ordered[index] = _batch_result(paths[index], result)
+
+    succeeded = sum(1 for item in ordered if item.success)
+    return DataResponse[BatchReadData](
+        data=BatchReadData(results=ordered, succeeded=succeeded, failed=len(ordered) - succeeded),
+        message="批量读取完成"
+    )
+
+
+@router.get("/raw/{relative_path:path}")
+async def get_file_raw(relative_path: str, request: Request):
+    """
+    流式读取文件原始字节
+
+    不解码、不包装 JSON，按块传输文件内容，适合大笔记与附件：
+    - 支持单段 Range 请求（206 / 416）与 If-Range
+    - 支持 If-None-Match 条件请求（304）
+    - 通过 X-File-Encoding 响应头返回探测到的文本编码，二进制文件为 binary
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+
+    Returns:
+        StreamingResponse: 文件字节流
+    """
+    file, file_stat, encoding = await run_io(open_raw_file, relative_path)
+
+    try:
+        size = file_stat.st_size
+        headers = _validator_headers(make_etag(file_fingerprint(file_stat)), file_stat.st_mtime)
+        headers["Accept-Ranges"] = "bytes"
+        headers["X-File-Encoding"] = encoding or "binary"
+
+        if if_none_match(request.headers.get("if-none-match"), headers["ETag"]):
+            file.close()
+            return Response(status_code=304, headers=headers)
+
+        start, end, status_code = 0, size - 1, 200
+        range_header = request.headers.get("range")
+        if range_header and if_range(request.headers.get("if-range"), headers["ETag"], headers["Last-Modified"]):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                file.close()
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    except BaseException:
+        file.close()
+        raise
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file(file, start, end - start + 1),
+        status_code=status_code,
+        headers=headers,
+        media_type=_raw_media_type(file.name, encoding)
+    )
+
+
 @router.put("/file/{relative_path:path}", response_model=DataResponse[FileWriteResult])
-async def update_file_content(relative_path: str, request: FileUpdateRequest):
+async def update_file_content(
+    relative_path: str,
+    request: FileUpdateRequest,
+    http_request: Request,
+    response: Response
+):
     """
     更新文件内容
 
+    携带 If-Match 时，仅当文件当前版本与之匹配才写入，否则返回 412
+
     Args:
         relative_path: 相对于知识库根目录的文件路径
         request: 包含更新内容的请求体
+        http_request: FastAPI 请求对象
 
     Returns:
         DataResponse[FileWriteResult]: 包含更新结果的响应
     """
-    # 使用工具层写入文件，复用已有逻辑
-    file_info = write_file(relative_path, request.content)
-    
+    # 版本校验在工具层的写锁内进行，与写入之间不会插入其他写入
+    file_info = await awrite_file(relative_path, request.content, http_request.headers.get("if-match"))
+
+    # 版本取自写锁内，之后插入的其他写入不会混入本次响应的 ETag
+    response.headers.update(_validator_headers(make_etag(file_info.version), file_info.mtime))
+
+    return DataResponse[FileWriteResult](
+        data=file_info,
+        message="文件更新成功"
+    )
+
+
+@router.patch("/file/{relative_path:path}", response_model=DataResponse[FileWriteResult])
+async def patch_file_content(relative_path: str, request: FilePatchRequest, response: Response):
+    """
+    局部更新文件内容
+
+    在服务端将编辑操作应用到 base_version 对应的内容并原子写回，
+    适合编辑器自动保存时只提交改动部分。基准版本与文件当前版本不一致时返回 409。
+    响应头携带新版本的 ETag，可作为下一次局部更新的 base_version。
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+        request: 包含基准版本与编辑操作的请求体
+
+    Returns:
+        DataResponse[FileWriteResult]: 包含更新结果的响应
+    """
+    file_info = await apatch_file(
+        relative_path,
+        request.base_version,
+        [(edit.start, edit.end, edit.text) for edit in request.edits],
+        by_line=request.mode == "line",
+        utf16=request.offset_unit == "utf16"
+    )
+
+    # 版本取自写锁内，之后插入的其他写入不会混入本次响应的 ETag
+    response.headers.update(_validator_headers(make_etag(file_info.version), file_info.mtime))
+
     return DataResponse[FileWriteResult](
         data=file_info,
         message="文件更新成功"
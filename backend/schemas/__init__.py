@@ -3,7 +3,10 @@ Pydantic 模型定义
 定义API请求和响应的数据模型
 """
 
-from .requests import ChatRequest, SaveRequest, OptimizeRequest, EditRequest, FileUpdateRequest
+from .requests import (
+    ChatRequest, SaveRequest, OptimizeRequest, EditRequest, FileUpdateRequest, TextEdit, FilePatchRequest,
+    BatchReadRequest
+)
 from .responses import (
     BaseResponse,
     DataResponse,
@@ -11,8 +14,32 @@ from .responses import (
     ConfigData,
     FileTreeNode,
     FileTreeData,
+    FileTreePage,
+    SearchHit,
+    SearchResultData,
+    LinkData,
+    TagCount,
+    TagListData,
+    NoteSummary,
+    NoteListData,
+    HeadingItem,
+    NoteMetaData,
+    MetaStatsData,
+    RollupJobItem,
+    RollupFailureItem,
+    RollupStatusData,
+    MaintenanceJobItem,
+    MaintenanceStatusData,
+    IOExecutorStats,
+    ContentCacheStats,
+    EncodingCacheStats,
+    SessionCacheStats,
+    SessionLockStats,
+    RuntimeStatsData,
     FileReadResult,
     FileWriteResult,
+    BatchFileResult,
+    BatchReadData,
  
 )
 from .stream_models import StreamChunk, StreamComplete, StreamError
@@ -23,6 +50,9 @@ __all__ = [
     'OptimizeRequest',
     'EditRequest',
     'FileUpdateRequest',
+    'TextEdit',
+    'FilePatchRequest',
+    'BatchReadRequest',
     # 新的统一响应模型
     'BaseResponse',
     'DataResponse',
@@ -31,8 +61,32 @@ __all__ = [
     'ConfigData',
     'FileTreeNode',
     'FileTreeData',
+    'FileTreePage',
+    'SearchHit',
+    'SearchResultData',
+    'LinkData',
+    'TagCount',
+    'TagListData',
+    'NoteSummary',
+    'NoteListData',
+    'HeadingItem',
+    'NoteMetaData',
+    'MetaStatsData',
+    'RollupJobItem',
+    'RollupFailureItem',
+    'RollupStatusData',
+    'MaintenanceJobItem',
+    'MaintenanceStatusData',
+    'IOExecutorStats',
+    'ContentCacheStats',
+    'EncodingCacheStats',
+    'SessionCacheStats',
+    'SessionLockStats',
+    'RuntimeStatsData',
     'FileReadResult',
     'FileWriteResult',
+    'BatchFileResult',
+    'BatchReadData',
     # 流式模型
     'StreamChunk',
     'StreamComplete',
@@ -2,7 +2,9 @@
 Pydantic 模型定义
 定义API请求和响应的数据模型
 """
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class OptimizeRequest(BaseModel):
@@ -38,4 +40,30 @@ class UpdateConfigRequest(BaseModel):
 
 class FileUpdateRequest(BaseModel):
     """文件更新请求模型"""
-    content: str
\ No newline at end of file
+    content: str
+
+
+class TextEdit(BaseModel):
+    """
+    单个文本编辑操作：将基准版本中 [start, end) 区间替换为 text
+
+    offset 模式下 start/end 为字符偏移（默认按 UTF-16 码元计算，与 JavaScript 字符串下标一致），
+    line 模式下为行号（从 0 开始，text 需自带换行符）；区间相对于换行符统一为 \n 的内容
+    """
+    start: int = Field(ge=0)
+    end: int = Field(ge=0)
+    text: str = ""
+
+
+class FilePatchRequest(BaseModel):
+    """文件局部更新请求模型"""
+    base_version: str  # 基准版本（读取文件时返回的 ETag）
+    mode: Literal["offset", "line"] = "offset"
+    offset_unit: Literal["utf16", "codepoint"] = "utf16"  # offset 模式下偏移的计算单位
+    edits: list[TextEdit] = Field(min_length=1, max_length=1000)
+
+
+class BatchReadRequest(BaseModel):
+    """批量读取文件请求模型"""
+    paths: list[str] = Field(min_length=1, max_length=200)
+    stream: bool = False  # 为 True 时以 NDJSON 按完成顺序逐条返回
@@ -66,6 +66,25 @@ class FileWriteResult(BaseModel):
     filename: str
     file_size: int
     file_path: str
+    version: str | None = None  # 写入后的版本指纹（在写锁内取得，与响应头 ETag 对应）
+    mtime: float | None = None  # 写入后的修改时间（秒）
+
+
+class BatchFileResult(BaseModel):
+    """批量读取中单个文件的结果"""
+    path: str
+    success: bool
+    data: FileReadResult | None = None
+    message: str | None = None  # 失败原因
+    error_code: str | None = None
+    status_code: int = 200  # 单独请求该文件时对应的 HTTP 状态码
+
+
+class BatchReadData(BaseModel):
+    """批量读取结果（按请求顺序排列）"""
+    results: list[BatchFileResult]
+    succeeded: int
+    failed: int
 
 
 class ConfigData(BaseModel):
@@ -82,9 +101,228 @@ class FileTreeNode(BaseModel):
     title: str
     is_leaf: bool
     children: list['FileTreeNode'] | None = None
+    has_children: bool | None = None  # 仅分层加载模式返回
 
 
 class FileTreeData(BaseModel):
     """文件树数据"""
     tree: list[FileTreeNode]
 
+
+class SearchHit(BaseModel):
+    """全文搜索结果项"""
+    path: str
+    title: str
+    score: float
+    snippet: str
+
+
+class SearchResultData(BaseModel):
+    """全文搜索结果"""
+    query: str
+    total: int
+    hits: list[SearchHit]
+    indexing: bool = False  # 索引仍在构建中，结果可能不完整
+
+
+class LinkData(BaseModel):
+    """文件链接关系"""
+    path: str
+    outgoing: list[str]  # 出链指向的文件
+    backlinks: list[str]  # 链接到该文件的笔记
+    unresolved: list[str]  # 未找到目标文件的链接
+    indexing: bool = False  # 图谱仍在构建中，结果可能不完整
+
+
+class TagCount(BaseModel):
+    """标签及其笔记数"""
+    tag: str
+    count: int
+
+
+class TagListData(BaseModel):
+    """标签列表"""
+    tags: list[TagCount]
+    indexing: bool = False  # 元数据索引仍在构建中，结果可能不完整
+
+
+class NoteSummary(BaseModel):
+    """笔记元数据摘要"""
+    path: str
+    title: str
+    words: int  # 字数（中日韩字符按字、英文按单词计）
+    chars: int  # 非空白字符数
+    tags: list[str]
+
+
+class NoteListData(BaseModel):
+    """按标签筛选的笔记列表"""
+    tag: str | None = None
+    total: int
+    items: list[NoteSummary]
+    indexing: bool = False
+
+
+class HeadingItem(BaseModel):
+    """大纲中的标题"""
+    level: int
+    title: str
+    line: int  # 行号（从 1 开始）
+    offset: int  # 标题行在文件中的字节偏移
+
+
+class NoteMetaData(BaseModel):
+    """单篇笔记的完整元数据"""
+    path: str
+    title: str
+    words: int
+    chars: int
+    cjk: int  # 中日韩字符数
+    hash: str  # 文件内容的 SHA-256
+    mtime: float
+    size: int
+    tags: list[str]
+    frontmatter: dict
+    headings: list[HeadingItem]
+    indexing: bool = False
+
+
+class MetaStatsData(BaseModel):
+    """知识库整体统计"""
+    notes: int
+    words: int
+    chars: int
+    cjk: int
+    tags: int
+    indexing: bool = False
+
+
+class RollupJobItem(BaseModel):
+    """排队或执行中的摘要滚动"""
+    session_id: str
+    state: str  # pending / running
+    queued_at: float
+    started_at: float | None = None
+
+
+class RollupFailureItem(BaseModel):
+    """最近一次失败的摘要滚动"""
+    session_id: str
+    error: str
+    failed_at: float
+    attempts: int  # 连续失败次数
+
+
+class RollupStatusData(BaseModel):
+    """后台摘要滚动队列状态"""
+    jobs: list[RollupJobItem]
+    failures: list[RollupFailureItem]
+    max_concurrency: int
+    submitted: int
+    coalesced: int  # 合并到已有任务的提交次数
+    applied: int
+    discarded: int  # 生成期间会话已变化而放弃的次数
+    failed: int
+
+
+class MaintenanceJobItem(BaseModel):
+    """后台维护任务状态"""
+    name: str
+    interval: float  # 执行间隔（秒）
+    jitter: float  # 间隔抖动比例
+    budget: float  # 单次执行的工作时长上限（秒）
+    duty_cycle: float  # 工作时间占比
+    state: str  # idle / running
+    next_run_at: float
+    runs: int
+    skipped: int  # 重叠或等待交互空闲超时而跳过的次数
+    failures: int
+    last_started_at: float | None = None
+    last_finished_at: float | None = None
+    last_duration: float | None = None  # 总耗时（含休眠与暂停）
+    last_busy: float | None = None  # 实际工作时长
+    last_paused: float | None = None  # 因流式响应进行中暂停的时长
+    last_exhausted: bool = False  # 是否因预算用尽提前结束
+    last_result: dict | None = None
+    last_error: str | None = None
+
+
+class MaintenanceStatusData(BaseModel):
+    """后台维护调度器状态"""
+    running: bool
+    active_streams: int  # 进行中的流式响应数
+    jobs: list[MaintenanceJobItem]
+
+
+class IOExecutorStats(BaseModel):
+    """I/O 线程池统计"""
+    max_workers: int
+    queued: int  # 排队等待执行的任务数
+    running: int
+    completed: int
+    failed: int
+    cancelled: int  # 开始执行前被取消的任务数
+    avg_wait_ms: float
+    avg_run_ms: float
+    max_wait_ms: float
+    max_run_ms: float
+
+
+class ContentCacheStats(BaseModel):
+    """文件内容缓存统计"""
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class EncodingCacheStats(BaseModel):
+    """文件编码缓存统计"""
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class SessionCacheStats(BaseModel):
+    """会话历史缓存统计"""
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    stale: int  # 因存储已被其他进程修改而失效的次数
+    updates: int  # 写入后原地更新的次数
+    evictions: int
+    hit_rate: float
+
+
+class SessionLockStats(BaseModel):
+    """会话锁竞争统计（等待耗时单位为秒）"""
+    active: int  # 当前持有或等待中的会话锁数
+    acquired: int
+    contended: int  # 需要等待的获取次数
+    file_contended: int  # 等待跨进程文件锁的次数
+    timeouts: int
+    wait_total: float
+    wait_max: float
+    wait_avg: float
+
+
+class RuntimeStatsData(BaseModel):
+    """运行时统计"""
+    io: IOExecutorStats
+    content_cache: ContentCacheStats
+    encoding_cache: EncodingCacheStats
+    session_cache: SessionCacheStats
+    session_locks: SessionLockStats
+
+
+class FileTreePage(BaseModel):
+    """文件树分层加载数据（单个目录的一页子节点）"""
+    path: str
+    tree: list[FileTreeNode]
+    next_cursor: str | None = None
+
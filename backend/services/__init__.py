@@ -1,8 +1,18 @@
 # Services 包
 from .ai_service import AIService
 from .cleanup_service import SessionCleanupService
+from .maintenance_service import MaintenanceScheduler
+from .vault_index_service import VaultIndexService
+from .search_index_service import SearchIndexService
+from .link_graph_service import LinkGraphService
+from .metadata_index_service import MetadataIndexService
 
 __all__ = [
     'AIService',
     'SessionCleanupService',
+    'MaintenanceScheduler',
+    'VaultIndexService',
+    'SearchIndexService',
+    'LinkGraphService',
+    'MetadataIndexService',
 ]
@@ -2,23 +2,42 @@
 AI服务层 - 编排排版优化、AI建议等业务逻辑
 """
 from ..ai_engine import AIProcessor, AIEngine
-from ..utils.knowledge_utils import read_file
+from ..ai_engine.memory.chat_history import DEFAULT_HISTORY_TOKENS
+from ..ai_engine.memory.history_store import HistoryBackend
+from ..ai_engine.retrieval import ContextRetriever
+from ..core.io_executor import run_io
+from ..utils.knowledge_utils import aread_file
 
 
 class AIService:
     """AI服务类，处理排版优化和AI对话的业务逻辑"""
 
-    def __init__(self, ai_engine: AIEngine):
+    def __init__(
+        self,
+        ai_engine: AIEngine,
+        retriever: ContextRetriever | None = None,
+        history_backend: HistoryBackend | None = None,
+        history_token_budgets: dict[str, int] | None = None
+    ):
         """
         初始化 AI 服务
 
         Args:
             ai_engine: AI 引擎实例
+            retriever: 上下文检索器（可选），为空时 AI 建议始终发送全文
+            history_backend: 会话历史存储后端（可选），为空时使用 JSONL 文件
+            history_token_budgets: 各任务的历史 token 预算 {task_type: tokens}，未配置的任务使用默认值
         """
         self.ai_engine = ai_engine
+        self.retriever = retriever
         self.optimizer: AIProcessor = AIProcessor('optimize', ai_engine)
-        self.advisor: AIProcessor = AIProcessor('advise', ai_engine)
-        self.editor: AIProcessor = AIProcessor('edit', ai_engine)
+        budgets = history_token_budgets or {}
+        self.advisor: AIProcessor = AIProcessor(
+            'advise', ai_engine, history_backend, budgets.get('advise', DEFAULT_HISTORY_TOKENS)
+        )
+        self.editor: AIProcessor = AIProcessor(
+            'edit', ai_engine, history_backend, budgets.get('edit', DEFAULT_HISTORY_TOKENS)
+        )
 
     async def optimize_markdown_layout_stream(self, filename: str):
         """
@@ -31,7 +50,7 @@ class AIService:
             优化结果的纯文本片段
         """
         # 读取文件内容（会抛出 NotFoundException）
-        file_info = read_file(filename)
+        file_info = await aread_file(filename)
         content = file_info.content
 
         # 调用优化器进行流式处理
@@ -50,9 +69,13 @@ class AIService:
             AI建议的纯文本片段
         """
         # 读取文件内容（会抛出 NotFoundException）
-        file_info = read_file(filename)
+        file_info = await aread_file(filename)
         content = file_info.content
 
+        # 长笔记只保留大纲与和问题相关的片段
+        if self.retriever is not None:
+            content = await run_io(self.retriever.select, content, question)
+
         # session_id 由 AIProcessor 内部解析，业务层无需传递
         async for chunk in self.advisor.process_stream_with_history(
             filename=filename,
@@ -73,7 +96,7 @@ class AIService:
             编辑后的文档片段
         """
         # 读取文件内容（会抛出 NotFoundException）
-        file_info = read_file(filename)
+        file_info = await aread_file(filename)
         content = file_info.content
 
         # session_id 由 AIProcessor 内部解析，业务层无需传递
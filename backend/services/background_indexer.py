@@ -0,0 +1,389 @@
+"""
+后台知识库索引器基类
+统一处理全量对账、增量更新队列与工作线程生命周期，子类只需实现文档的写入与删除
+"""
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from ..core import get_logger
+from ..utils.config_manager import config_manager
+from ..utils.knowledge_utils import read_text_file
+from .vault_index_service import VaultIndexService
+
+
+logger = get_logger(__name__)
+
+
+def get_index_dir(vault_path: Path) -> Path:
+    """
+    获取知识库对应的索引存储目录（~/.myapp/index/<知识库路径哈希>）
+
+    Args:
+        vault_path: 知识库根目录
+
+    Returns:
+        索引目录路径（已创建）
+    """
+    digest = hashlib.sha1(str(vault_path.resolve()).encode('utf-8')).hexdigest()[:12]
+    index_dir = config_manager.config_dir / "index" / digest
+    index_dir.mkdir(parents=True, exist_ok=True)
+    return index_dir
+
+
+class ReaderPool:
+    """SQLite 只读连接池（查询线程间复用，close 之后归还的连接直接关闭）"""
+
+    def __init__(self, max_idle: int = 4):
+        """
+        初始化连接池
+
+        Args:
+            max_idle: 最多保留的空闲连接数
+        """
+        self.max_idle = max_idle
+        self._idle: list[tuple[Path, sqlite3.Connection]] = []
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @contextmanager
+    def connection(self, db_path: Path | None) -> Iterator[sqlite3.Connection | None]:
+        """借出指定数据库的只读连接，用完归还；数据库尚未建立时为 None"""
+        if db_path is None or not db_path.exists():
+            yield None
+            return
+
+        conn = None
+        stale = []
+        with self._lock:
+            generation = self._generation
+            idle = []
+            for path, candidate in self._idle:
+                if path != db_path:
+                    # 知识库已切换，旧数据库的连接不再使用
+                    stale.append(candidate)
+                elif conn is None:
+                    conn = candidate
+                else:
+                    idle.append((path, candidate))
+            self._idle = idle
+        for candidate in stale:
+            candidate.close()
+
+        if conn is None:
+            conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                keep = generation == self._generation and len(self._idle) < self.max_idle
+                if keep:
+                    self._idle.append((db_path, conn))
+            if not keep:
+                conn.close()
+
+    def close(self) -> None:
+        """关闭全部空闲连接，借出中的连接在归还时关闭"""
+        with self._lock:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+        for _, conn in idle:
+            conn.close()
+
+
+class BackgroundIndexer:
+    """后台索引器基类"""
+
+    # 索引名称（用于日志）
+    name = "索引"
+    # 参与索引的文件后缀
+    suffixes = ('.md', '.markdown', '.txt')
+    # 单次提交的最大文档数
+    batch_size = 200
+
+    def __init__(self, vault_index: VaultIndexService, reconcile_interval: float = 300.0):
+        """
+        初始化索引器
+
+        Args:
+            vault_index: 知识库索引服务，提供文件列表与变更通知
+            reconcile_interval: 空闲时与磁盘全量对账的间隔（秒），用于兜底轮询模式下的内容修改
+        """
+        self.vault_index = vault_index
+        self.reconcile_interval = reconcile_interval
+        self.root: Path | None = None
+        self.ready = False
+
+        self._lock = threading.RLock()
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+        # 统计指标
+        self.indexed_count = 0
+        self.removed_count = 0
+        self.failed_count = 0
+        self.last_reconcile_at: float | None = None
+
+        # 知识库索引（重新）启动时随之重建，变更事件只入队
+        vault_index.add_start_listener(self.start)
+        vault_index.add_file_listener(self._on_files_changed)
+
+    # ==================== 生命周期 ====================
+
+    def start(self, vault_path: Path) -> None:
+        """
+        启动索引器：后台完成全量对账后持续处理增量更新
+
+        Args:
+            vault_path: 知识库根目录
+        """
+        with self._lock:
+            # 不在调用方等待旧线程退出（可能在事件循环中），由新线程在打开存储前等待
+            previous = self._signal_stop()
+            self.root = vault_path
+            self._queue = queue.Queue()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(vault_path, self._queue, self._stop_event, previous),
+                name=f"{type(self).__name__}-worker",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        停止工作线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒），None 表示只发出停止信号、不等待，
+                可以在事件循环中直接调用
+        """
+        with self._lock:
+            thread = self._signal_stop()
+            self.root = None
+        if timeout is not None and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _signal_stop(self) -> threading.Thread | None:
+        """通知当前工作线程退出并解除关联，返回该线程"""
+        with self._lock:
+            self._stop_event.set()
+            if self._queue is not None:
+                self._queue.put(None)
+            thread = self._thread
+            self._queue = None
+            self._thread = None
+            self.ready = False
+            return thread
+
+    def request_reconcile(self) -> None:
+        """请求一次与磁盘的全量对账"""
+        if self._queue is not None:
+            self._queue.put(('reconcile', ''))
+
+    def stats(self) -> dict[str, int | float | bool | None]:
+        """
+        获取索引器统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "ready": self.ready,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "indexed": self.indexed_count,
+            "removed": self.removed_count,
+            "failed": self.failed_count,
+            "last_reconcile_at": self.last_reconcile_at,
+        }
+
+    def _on_files_changed(self, changed: list[str], removed: list[str]) -> None:
+        """知识库文件变更回调：只入队，不在监听线程中做索引"""
+        task_queue = self._queue
+        if task_queue is None:
+            return
+        for rel in changed:
+            if self.accepts(rel):
+                task_queue.put(('upsert', rel))
+        for rel in removed:
+            if self.accepts(rel):
+                task_queue.put(('remove', rel))
+
+    def accepts(self, relative_path: str) -> bool:
+        """判断文件是否参与索引"""
+        return relative_path.lower().endswith(self.suffixes)
+
+    # ==================== 工作线程 ====================
+
+    def _run(
+        self,
+        vault_path: Path,
+        task_queue: queue.Queue,
+        stop_event: threading.Event,
+        previous: threading.Thread | None = None
+    ) -> None:
+        """工作线程主循环"""
+        # 存储连接由工作线程独占，必须等上一个线程关闭存储后再打开
+        if previous is not None:
+            previous.join()
+        if stop_event.is_set():
+            return
+
+        try:
+            self._open(vault_path)
+        except Exception as e:
+            logger.error(f"{self.name}打开失败: {e}", exc_info=True)
+            return
+
+        try:
+            # 等待文件树初始扫描完成，期间响应停止信号
+            while not self.vault_index.wait_ready(1.0):
+                if stop_event.is_set():
+                    return
+            self._reconcile(vault_path, stop_event)
+            self.ready = not stop_event.is_set()
+
+            while not stop_event.is_set():
+                try:
+                    task = task_queue.get(timeout=self.reconcile_interval)
+                except queue.Empty:
+                    self._reconcile(vault_path, stop_event)
+                    continue
+
+                batch, reconcile, stopping = self._drain(task, task_queue)
+                for rel, op in batch.items():
+                    if op == 'upsert':
+                        self._index_path(vault_path, rel)
+                    else:
+                        self._remove(rel)
+                self._commit()
+
+                if stopping:
+                    break
+                if reconcile:
+                    self._reconcile(vault_path, stop_event)
+        except Exception as e:
+            logger.error(f"{self.name}工作线程异常退出: {e}", exc_info=True)
+        finally:
+            self._close()
+
+    def _drain(self, task, task_queue: queue.Queue) -> tuple[dict[str, str], bool, bool]:
+        """
+        取出一批任务并按文件去重（后到的操作覆盖先到的）
+
+        Returns:
+            ({相对路径: 操作}, 是否需要对账, 是否收到停止信号)
+        """
+        batch: dict[str, str] = {}
+        reconcile = False
+        while True:
+            if task is None:
+                return batch, reconcile, True
+
+            op, rel = task
+            if op == 'reconcile':
+                reconcile = True
+            else:
+                batch[rel] = op
+
+            if len(batch) >= self.batch_size:
+                return batch, reconcile, False
+            try:
+                task = task_queue.get_nowait()
+            except queue.Empty:
+                return batch, reconcile, False
+
+    def _reconcile(self, vault_path: Path, stop_event: threading.Event) -> None:
+        """与磁盘全量对账：索引新增或变化的文件，删除已不存在的文件"""
+        started = time.perf_counter()
+        indexed = self._indexed_fingerprints()
+        files = [rel for rel in self.vault_index.list_files() if self.accepts(rel)]
+
+        updated = 0
+        for rel in files:
+            if stop_event.is_set():
+                return
+            try:
+                file_stat = (vault_path / rel).stat()
+            except OSError:
+                continue
+            if indexed.pop(rel, None) != (file_stat.st_mtime_ns, file_stat.st_size):
+                self._index_path(vault_path, rel)
+                updated += 1
+                if updated % self.batch_size == 0:
+                    self._commit()
+                    logger.info(f"{self.name}构建中: 已处理 {updated} 个文件")
+
+        # 剩余条目对应的文件已被删除
+        for rel in indexed:
+            self._remove(rel)
+
+        self._commit()
+        self.last_reconcile_at = time.time()
+
+        if updated or indexed:
+            elapsed = time.perf_counter() - started
+            logger.info(f"{self.name}对账完成: 更新 {updated} 个，删除 {len(indexed)} 个，耗时 {elapsed:.2f}s")
+
+    def _index_path(self, vault_path: Path, relative_path: str) -> None:
+        """读取并索引单个文件，文件已不存在时从索引中删除"""
+        file_path = vault_path / relative_path
+        try:
+            file_stat = file_path.stat()
+            content = read_text_file(file_path)
+        except FileNotFoundError:
+            self._remove(relative_path)
+            return
+        except OSError as e:
+            logger.warning(f"{self.name}读取文件失败: {relative_path} | {e}")
+            self.failed_count += 1
+            return
+
+        try:
+            self._index_document(relative_path, content, file_stat.st_mtime_ns, file_stat.st_size)
+            self.indexed_count += 1
+        except Exception as e:
+            logger.warning(f"{self.name}索引文件失败: {relative_path} | {e}")
+            self.failed_count += 1
+
+    def _remove(self, relative_path: str) -> None:
+        """从索引中删除单个文件"""
+        try:
+            self._remove_document(relative_path)
+            self.removed_count += 1
+        except Exception as e:
+            logger.warning(f"{self.name}删除文档失败: {relative_path} | {e}")
+            self.failed_count += 1
+
+    # ==================== 子类实现 ====================
+
+    def _open(self, vault_path: Path) -> None:
+        """打开索引存储（在工作线程中调用）"""
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        """关闭索引存储（在工作线程中调用）"""
+        raise NotImplementedError
+
+    def _indexed_fingerprints(self) -> dict[str, tuple[int, int]]:
+        """获取已索引文件的 {相对路径: (mtime_ns, size)}"""
+        raise NotImplementedError
+
+    def _index_document(self, relative_path: str, content: str, mtime_ns: int, size: int) -> None:
+        """写入或替换单个文档的索引"""
+        raise NotImplementedError
+
+    def _remove_document(self, relative_path: str) -> None:
+        """删除单个文档的索引（不存在时忽略）"""
+        raise NotImplementedError
+
+    def _commit(self) -> None:
+        """提交本批次的修改"""
+        raise NotImplementedError
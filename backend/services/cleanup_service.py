@@ -1,15 +1,30 @@
 """
 历史记录清理服务
-定期清理孤儿会话（笔记已删除但历史记录仍存在）
+定期清理孤儿会话（笔记已删除但历史记录仍存在），清理前先迁移旧版以文件名为 ID 的会话
+
+知识库只遍历一次（知识库索引就绪时直接使用其文件列表），与会话列表做差集；
+支持只报告不删除的 dry-run，启动时在后台线程中执行，不阻塞应用就绪
 """
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
-from ..core import get_logger
+from ..ai_engine.memory import HistoryBackend, JsonlHistoryBackend
+from ..core import get_logger, run_io
+from .vault_index_service import VaultIndexService
 
 
 logger = get_logger(__name__)
 
+# 进度日志的间隔（会话数 / 秒）
+_PROGRESS_EVERY = 1000
+_PROGRESS_INTERVAL = 5.0
+
+# 等待知识库索引初始扫描完成的最长时间（秒），超时后自行遍历知识库
+_INDEX_WAIT_TIMEOUT = 30.0
+
 
 class SessionCleanupService:
     """会话清理服务"""
@@ -17,46 +32,184 @@ class SessionCleanupService:
     def __init__(
         self,
         notes_root: Optional[Path] = None,
-        sessions_dir: Optional[Path] = None
+        history_backend: Optional[HistoryBackend] = None,
+        vault_index: Optional[VaultIndexService] = None
     ):
         """
         初始化清理服务
 
         Args:
             notes_root: 笔记根目录，默认使用配置中的 Obsidian Vault 路径
-            sessions_dir: 会话记录目录
+            history_backend: 会话历史存储后端，默认使用 JSONL 会话目录
+            vault_index: 知识库索引服务（可选），对应同一知识库且已就绪时复用其文件列表
         """
-        backend_dir = Path(__file__).resolve().parents[1]
-        self.sessions_dir = sessions_dir or (backend_dir / "ai_engine" / "data" / "ai_sessions")
+        self.history_backend = history_backend or JsonlHistoryBackend()
         self.notes_root = notes_root
+        self.vault_index = vault_index
 
-    async def cleanup_orphaned_sessions(self) -> int:
+        # 同一时间只执行一次清理
+        self._running = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.last_report: dict | None = None
+
+    async def cleanup_orphaned_sessions(self, dry_run: bool = False) -> dict:
         """
-        清理孤儿会话
+        清理孤儿会话（在 I/O 线程池中执行，不阻塞事件循环）
+
+        Args:
+            dry_run: 只报告孤儿会话，不迁移也不删除
 
         Returns:
-            清理的会话数量
+            清理报告，见 run_cleanup
+        """
+        return await run_io(self.run_cleanup, dry_run)
+
+    def start_background_cleanup(self, dry_run: bool = False) -> bool:
         """
-        if not self.sessions_dir.exists():
-            logger.info("会话目录不存在，无需清理")
-            return 0
+        在后台线程中执行清理
+
+        Args:
+            dry_run: 只报告孤儿会话，不迁移也不删除
+
+        Returns:
+            是否启动了新的清理（已有清理在执行时返回 False）
+        """
+        if self._running.locked():
+            return False
+        self._thread = threading.Thread(
+            target=self._run_in_background,
+            args=(dry_run,),
+            name="session-cleanup",
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def run_cleanup(self, dry_run: bool = False, checkpoint: Callable[[], bool] | None = None) -> dict:
+        """
+        同步执行孤儿会话清理
+
+        Args:
+            dry_run: 只报告孤儿会话，不迁移也不删除
+            checkpoint: 每处理一个会话调用一次，返回 False 时提前结束（定期维护任务用于让出资源）
 
+        Returns:
+            清理报告：dry_run、source（文件列表来源）、sessions（会话总数）、
+            orphans（孤儿会话 [{session_id, note_path}]）、migrated、deleted、elapsed、
+            skipped（未执行或中止的原因，如知识库目录不可访问）
+        """
+        report = {
+            "dry_run": dry_run,
+            "source": None,
+            "sessions": 0,
+            "orphans": [],
+            "migrated": 0,
+            "deleted": 0,
+            "elapsed": 0.0,
+            "skipped": None,
+        }
         if not self.notes_root:
             logger.warning("笔记根目录未配置，无法清理孤儿会话")
-            return 0
+            return report
+
+        if not self._running.acquire(blocking=False):
+            logger.info("孤儿会话清理正在进行，跳过本次")
+            return report
+        try:
+            self._cleanup(report, dry_run, checkpoint)
+        finally:
+            self._running.release()
+
+        self.last_report = report
+        return report
+
+    def _run_in_background(self, dry_run: bool) -> None:
+        try:
+            report = self.run_cleanup(dry_run)
+        except Exception as e:
+            logger.error(f"后台清理孤儿会话失败: {e}")
+            return
+        if report["deleted"] > 0:
+            logger.info(f"后台清理了 {report['deleted']} 个孤儿会话")
+
+    def _cleanup(self, report: dict, dry_run: bool, checkpoint: Callable[[], bool] | None) -> None:
+        started = time.perf_counter()
+        root = self.notes_root
+
+        # 知识库所在的外接盘或网络盘未挂载时，所有会话都会被误判为孤儿会话
+        if not root.is_dir():
+            report["skipped"] = "notes_root_unavailable"
+            logger.warning(f"笔记根目录不可访问，跳过孤儿会话清理: {root}")
+            return
+
+        # 一次性取得知识库全部文件的相对路径
+        note_paths, report["source"] = self._collect_note_paths(root)
+        logger.info(f"孤儿会话清理：知识库共 {len(note_paths)} 个文件（来源: {report['source']}）")
 
-        cleaned_count = 0
+        # 知识库为空但存在会话时，更可能是目录读取异常，不做任何删除
+        if not note_paths:
+            report["sessions"] = len(self.history_backend.session_note_paths())
+            if report["sessions"]:
+                report["skipped"] = "vault_empty"
+                logger.warning(f"知识库中没有任何文件，但存在 {report['sessions']} 个会话，跳过孤儿会话清理")
+                return
 
-        for session_file in self.sessions_dir.glob("*.jsonl"):
-            session_id = session_file.stem
+        # 旧版会话迁移后才有所属笔记；dry-run 时按文件名判断能否迁移
+        legacy_names: set[str] = set()
+        if not dry_run:
+            report["migrated"] = self.history_backend.migrate_legacy_sessions(note_paths)
+        else:
+            legacy_names = {path.rpartition("/")[2] for path in note_paths}
 
-            # 递归搜索对应的笔记文件
-            # 注意：session_id 可能包含 .md 扩展名，也可能不包含
-            note_files = list(self.notes_root.rglob(f"{session_id}"))
-            if not note_files:
-                logger.info(f"发现孤儿会话: {session_id}, 正在清理...")
-                session_file.unlink()
-                cleaned_count += 1
+        sessions = self.history_backend.session_note_paths()
+        report["sessions"] = len(sessions)
+        last_log = time.monotonic()
+
+        for count, (session_id, note_path) in enumerate(sessions.items(), 1):
+            if checkpoint is not None and not checkpoint():
+                logger.info(f"孤儿会话清理提前结束: {count - 1}/{len(sessions)}")
+                break
+            # 找不到所属笔记（包括无法迁移的旧版会话）即为孤儿会话；
+            # 索引可能略旧或排除了部分目录，删除前再确认一次文件确实不存在
+            if note_path is None:
+                orphaned = session_id not in legacy_names
+            else:
+                orphaned = note_path not in note_paths and not (root / note_path).is_file()
+            if orphaned and not root.is_dir():
+                # 清理过程中知识库变得不可访问
+                report["skipped"] = "notes_root_unavailable"
+                logger.warning(f"笔记根目录不可访问，孤儿会话清理中止: {count - 1}/{len(sessions)}")
+                break
+            if orphaned:
+                report["orphans"].append({"session_id": session_id, "note_path": note_path})
+                if not dry_run:
+                    self.history_backend.delete_session(session_id)
+                    report["deleted"] += 1
+
+            if count % _PROGRESS_EVERY == 0 or time.monotonic() - last_log >= _PROGRESS_INTERVAL:
+                last_log = time.monotonic()
+                logger.info(f"孤儿会话清理进度: {count}/{len(sessions)}，发现 {len(report['orphans'])} 个孤儿会话")
+
+        report["elapsed"] = round(time.perf_counter() - started, 3)
+        if dry_run:
+            logger.info(f"孤儿会话检查完成（dry-run），共 {len(report['orphans'])} 个孤儿会话，耗时 {report['elapsed']}s")
+        else:
+            logger.info(f"清理完成，共清理 {report['deleted']} 个孤儿会话，耗时 {report['elapsed']}s")
+
+    def _collect_note_paths(self, root: Path) -> tuple[set[str], str]:
+        """
+        获取知识库全部文件的相对路径集合
+
+        Returns:
+            (相对路径集合, 来源：vault_index / walk)
+        """
+        vault_index = self.vault_index
+        if vault_index is not None and vault_index.is_serving(root) and vault_index.wait_ready(_INDEX_WAIT_TIMEOUT):
+            return set(vault_index.list_files()), "vault_index"
 
-        logger.info(f"清理完成，共清理 {cleaned_count} 个孤儿会话")
-        return cleaned_count
+        note_paths: set[str] = set()
+        for dirpath, _, filenames in os.walk(root):
+            rel_dir = Path(dirpath).relative_to(root).as_posix()
+            prefix = "" if rel_dir == "." else f"{rel_dir}/"
+            note_paths.update(f"{prefix}{name}" for name in filenames)
+        return note_paths, "walk"
@@ -4,7 +4,7 @@
 from fastapi import Request
 
 from ..ai_engine import AIEngine
-from ..services import AIService, SessionCleanupService
+from ..services import AIService, SessionCleanupService, MaintenanceScheduler, VaultIndexService, SearchIndexService, LinkGraphService, MetadataIndexService
 from ..utils.config_manager import config_manager
 
 
@@ -47,6 +47,71 @@ def get_cleanup_service(request: Request) -> SessionCleanupService:
     return request.app.state.cleanup_service
 
 
+def get_maintenance_scheduler(request: Request) -> MaintenanceScheduler:
+    """
+    获取后台维护调度器实例（单例）
+
+    Args:
+        request: FastAPI 请求对象
+
+    Returns:
+        MaintenanceScheduler 实例
+    """
+    return request.app.state.maintenance
+
+
+def get_vault_index(request: Request) -> VaultIndexService:
+    """
+    获取知识库索引服务实例（单例）
+
+    Args:
+        request: FastAPI 请求对象
+
+    Returns:
+        VaultIndexService 实例
+    """
+    return request.app.state.vault_index
+
+
+def get_search_index(request: Request) -> SearchIndexService:
+    """
+    获取全文搜索索引服务实例（单例）
+
+    Args:
+        request: FastAPI 请求对象
+
+    Returns:
+        SearchIndexService 实例
+    """
+    return request.app.state.search_index
+
+
+def get_link_graph(request: Request) -> LinkGraphService:
+    """
+    获取链接图谱服务实例（单例）
+
+    Args:
+        request: FastAPI 请求对象
+
+    Returns:
+        LinkGraphService 实例
+    """
+    return request.app.state.link_graph
+
+
+def get_metadata_index(request: Request) -> MetadataIndexService:
+    """
+    获取笔记元数据索引服务实例（单例）
+
+    Args:
+        request: FastAPI 请求对象
+
+    Returns:
+        MetadataIndexService 实例
+    """
+    return request.app.state.metadata_index
+
+
 def get_config(request: Request):
     """
     获取当前配置
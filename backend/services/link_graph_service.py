@@ -0,0 +1,309 @@
+"""
+知识库链接图谱服务
+解析笔记中的 [[双链]]、![[嵌入]] 与本地 Markdown 链接，在内存中维护出链 / 反链邻接表
+"""
+import posixpath
+import re
+import threading
+from array import array
+from pathlib import Path
+from urllib.parse import unquote
+
+from ..core import get_logger
+from .background_indexer import BackgroundIndexer
+
+
+logger = get_logger(__name__)
+
+# [[目标#标题|别名]] 与 ![[嵌入]]，只取目标部分
+_WIKILINK_PATTERN = re.compile(r'!?\[\[([^\[\]|#^\n]*)[^\[\]\n]*\]\]')
+
+# [文本](目标 "标题") 与 ![图片](目标)
+_MARKDOWN_LINK_PATTERN = re.compile(r'!?\[[^\]\n]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"\n]*")?\s*\)')
+
+# 代码块与行内代码中的内容不算链接
+_CODE_PATTERN = re.compile(r'```.*?(?:```|\Z)|~~~.*?(?:~~~|\Z)|`[^`\n]*`', re.DOTALL)
+
+# 笔记文件后缀（链接中可省略）
+_NOTE_SUFFIXES = ('.md', '.markdown')
+
+
+def _link_key(target: str) -> str:
+    """将链接目标规范化为匹配键：小写、/ 分隔、去掉笔记后缀"""
+    key = target.strip().replace('\\', '/').strip('/').lower()
+    for suffix in _NOTE_SUFFIXES:
+        if key.endswith(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def extract_links(relative_path: str, content: str) -> list[str]:
+    """
+    提取笔记中的链接并规范化为匹配键
+
+    双链按 Obsidian 规则以路径后缀匹配；Markdown 链接相对于当前笔记解析，
+    以 / 开头的键表示必须精确匹配的知识库路径
+
+    Args:
+        relative_path: 笔记相对路径（/ 分隔）
+        content: 笔记内容
+
+    Returns:
+        去重后的链接键列表（保持首次出现顺序）
+    """
+    content = _CODE_PATTERN.sub('', content)
+    keys: dict[str, None] = {}
+
+    for match in _WIKILINK_PATTERN.finditer(content):
+        key = _link_key(match.group(1))
+        if key:
+            keys[key] = None
+
+    base_dir = posixpath.dirname(relative_path)
+    for match in _MARKDOWN_LINK_PATTERN.finditer(content):
+        target = match.group(1)
+        if '://' in target or target.startswith(('#', 'mailto:')):
+            continue
+        target = unquote(target.split('#', 1)[0])
+        if not target:
+            continue
+        if target.startswith('/'):
+            path = posixpath.normpath(target.lstrip('/'))
+        else:
+            path = posixpath.normpath(posixpath.join(base_dir, target))
+        if path.startswith('..'):
+            continue
+        keys['/' + _link_key(path)] = None
+
+    return list(keys)
+
+
+class LinkGraphService(BackgroundIndexer):
+    """链接图谱服务（单例，由应用持有）"""
+
+    name = "链接图谱"
+
+    def __init__(self, vault_index, reconcile_interval: float = 300.0):
+        """
+        初始化链接图谱服务
+
+        Args:
+            vault_index: 知识库索引服务
+            reconcile_interval: 空闲时与磁盘全量对账的间隔（秒）
+        """
+        super().__init__(vault_index, reconcile_interval)
+        self._graph_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空图谱"""
+        with self._graph_lock:
+            # 文件节点：id -> 路径 / 路径匹配键，已删除的节点置为 None
+            self._paths: list[str | None] = []
+            self._path_keys: list[str | None] = []
+            self._ids: dict[str, int] = {}
+            self._fingerprints: dict[str, tuple[int, int]] = {}
+            # 文件名匹配键 -> 同名文件 id 列表
+            self._names: dict[str, list[int]] = {}
+
+            # 链接键驻留为整数 id
+            self._keys: list[str] = []
+            self._key_ids: dict[str, int] = {}
+
+            # 邻接表：笔记 id -> 出链键 id；链接键 id -> 引用它的笔记 id
+            self._out: dict[int, array] = {}
+            self._refs: dict[int, array] = {}
+
+    # ==================== 查询 ====================
+
+    def get_links(self, relative_path: str) -> dict[str, list[str]]:
+        """
+        查询文件的出链、反链与未解析链接
+
+        Args:
+            relative_path: 相对于知识库根目录的文件路径
+
+        Returns:
+            包含 outgoing、backlinks、unresolved 路径列表的字典
+        """
+        path = relative_path.replace('\\', '/').strip('/')
+        with self._graph_lock:
+            file_id = self._ids.get(path)
+            if file_id is None:
+                return {"outgoing": [], "backlinks": [], "unresolved": []}
+
+            outgoing: dict[str, None] = {}
+            unresolved: list[str] = []
+            for key_id in self._out.get(file_id, ()):
+                key = self._keys[key_id]
+                target = self._resolve(path, key)
+                if target is None:
+                    unresolved.append(key.lstrip('/'))
+                else:
+                    outgoing[self._paths[target]] = None
+
+            return {
+                "outgoing": list(outgoing),
+                "backlinks": self._backlinks(file_id),
+                "unresolved": unresolved,
+            }
+
+    def _backlinks(self, file_id: int) -> list[str]:
+        """查询引用指定文件的笔记（调用方需持有图谱锁）"""
+        path_key = self._path_keys[file_id]
+        parts = path_key.split('/')
+        # 能匹配到该文件的链接键：精确路径与各级路径后缀
+        candidates = ['/' + path_key] + ['/'.join(parts[i:]) for i in range(len(parts))]
+
+        sources: dict[str, None] = {}
+        for key in candidates:
+            key_id = self._key_ids.get(key)
+            if key_id is None:
+                continue
+            for source_id in self._refs.get(key_id, ()):
+                source = self._paths[source_id]
+                if source is not None and self._resolve(source, key) == file_id:
+                    sources[source] = None
+        return sorted(sources)
+
+    def _resolve(self, source: str, key: str) -> int | None:
+        """
+        将链接键解析为文件 id（调用方需持有图谱锁）
+
+        多个文件同名时优先选择与来源笔记同目录的文件，其次选择路径最短的文件
+        """
+        exact = key.startswith('/')
+        if exact:
+            key = key[1:]
+
+        candidates = self._names.get(key.rpartition('/')[2])
+        if not candidates:
+            return None
+
+        if exact:
+            matched = [c for c in candidates if self._path_keys[c] == key]
+        elif '/' in key:
+            suffix = '/' + key
+            matched = [c for c in candidates if self._path_keys[c] == key or self._path_keys[c].endswith(suffix)]
+        else:
+            matched = candidates
+
+        if len(matched) <= 1:
+            return matched[0] if matched else None
+
+        source_dir = posixpath.dirname(source)
+        for candidate in matched:
+            if posixpath.dirname(self._paths[candidate]) == source_dir:
+                return candidate
+        return min(matched, key=lambda c: (len(self._paths[c]), self._paths[c]))
+
+    def stats(self) -> dict[str, int | float | bool | None]:
+        """获取索引器统计信息（附带节点数与链接数）"""
+        result = super().stats()
+        with self._graph_lock:
+            result["files"] = len(self._ids)
+            result["links"] = sum(len(keys) for keys in self._out.values())
+        return result
+
+    # ==================== 索引写入（工作线程） ====================
+
+    def accepts(self, relative_path: str) -> bool:
+        # 附件也是链接目标，所有文件都登记为节点
+        return True
+
+    def _index_path(self, vault_path: Path, relative_path: str) -> None:
+        if relative_path.lower().endswith(self.suffixes):
+            super()._index_path(vault_path, relative_path)
+            return
+
+        # 附件只登记节点，不读取内容
+        try:
+            file_stat = (vault_path / relative_path).stat()
+        except FileNotFoundError:
+            self._remove(relative_path)
+            return
+        except OSError:
+            return
+        self._index_document(relative_path, "", file_stat.st_mtime_ns, file_stat.st_size)
+        self.indexed_count += 1
+
+    def _open(self, vault_path: Path) -> None:
+        self._reset()
+
+    def _close(self) -> None:
+        pass
+
+    def _indexed_fingerprints(self) -> dict[str, tuple[int, int]]:
+        with self._graph_lock:
+            return dict(self._fingerprints)
+
+    def _index_document(self, relative_path: str, content: str, mtime_ns: int, size: int) -> None:
+        keys = extract_links(relative_path, content) if content else []
+
+        with self._graph_lock:
+            file_id = self._ids.get(relative_path)
+            if file_id is None:
+                file_id = self._add_node(relative_path)
+            else:
+                self._unlink(file_id)
+
+            if keys:
+                key_ids = array('I', (self._intern(key) for key in keys))
+                self._out[file_id] = key_ids
+                for key_id in key_ids:
+                    self._refs.setdefault(key_id, array('I')).append(file_id)
+            self._fingerprints[relative_path] = (mtime_ns, size)
+
+    def _remove_document(self, relative_path: str) -> None:
+        with self._graph_lock:
+            file_id = self._ids.pop(relative_path, None)
+            if file_id is None:
+                return
+
+            self._unlink(file_id)
+            self._fingerprints.pop(relative_path, None)
+
+            name = self._path_keys[file_id].rpartition('/')[2]
+            same_name = self._names.get(name)
+            if same_name is not None:
+                same_name.remove(file_id)
+                if not same_name:
+                    del self._names[name]
+
+            self._paths[file_id] = None
+            self._path_keys[file_id] = None
+
+    def _commit(self) -> None:
+        pass
+
+    def _add_node(self, relative_path: str) -> int:
+        """登记文件节点（调用方需持有图谱锁）"""
+        file_id = len(self._paths)
+        path_key = _link_key(relative_path)
+        self._paths.append(relative_path)
+        self._path_keys.append(path_key)
+        self._ids[relative_path] = file_id
+        self._names.setdefault(path_key.rpartition('/')[2], []).append(file_id)
+        return file_id
+
+    def _unlink(self, file_id: int) -> None:
+        """移除笔记的全部出链及对应的反向引用（调用方需持有图谱锁）"""
+        for key_id in self._out.pop(file_id, ()):
+            refs = self._refs.get(key_id)
+            if refs is None:
+                continue
+            try:
+                refs.remove(file_id)
+            except ValueError:
+                continue
+            if not refs:
+                del self._refs[key_id]
+
+    def _intern(self, key: str) -> int:
+        """获取链接键的整数 id（调用方需持有图谱锁）"""
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._keys.append(key)
+            self._key_ids[key] = key_id
+        return key_id
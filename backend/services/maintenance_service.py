@@ -0,0 +1,311 @@
+"""
+后台维护调度服务
+在进程内按固定间隔执行维护任务（孤儿会话清理、会话压缩、缓存清理、日志滚动）：
+- 每个任务的执行时间带随机抖动，避免多个任务同时触发
+- 同一任务不会重叠执行，上一次未结束时跳过本次
+- 每次执行有工作时长预算，并按占空比让出 CPU / 磁盘
+- 有流式响应进行中时暂停，等待交互空闲后再继续，不与用户请求争抢资源
+"""
+import random
+import threading
+import time
+from typing import Any, Callable
+
+from ..core import get_logger
+from ..utils.stream_utils import stream_activity
+
+
+logger = get_logger(__name__)
+
+# 流式响应结束后需要安静的时间（秒）才开始或继续维护
+_IDLE_QUIET = 2.0
+
+# 等待交互空闲的最长时间（秒），超时后放弃本次执行
+_IDLE_WAIT_MAX = 300.0
+
+# 等待空闲时的轮询间隔（秒）
+_IDLE_POLL = 0.5
+
+# 连续工作多久后按占空比休眠一次（秒）
+_WORK_SLICE = 0.05
+
+
+class MaintenanceBudget:
+    """
+    单次维护执行的资源预算
+
+    任务在每个工作单位之间调用 checkpoint()：按占空比休眠、在交互繁忙时暂停，
+    返回 False 表示应当提前结束（预算用尽、等待空闲超时或调度器停止）
+    """
+
+    def __init__(self, seconds: float, duty_cycle: float, stop_event: threading.Event):
+        """
+        初始化预算
+
+        Args:
+            seconds: 工作时长上限（秒，不含休眠与暂停）
+            duty_cycle: 工作时间占比（0~1），其余时间休眠
+            stop_event: 调度器停止信号
+        """
+        self.seconds = seconds
+        self.duty_cycle = duty_cycle
+        self._stop_event = stop_event
+
+        self.used = 0.0
+        self.paused = 0.0
+        self.exhausted = False
+        self._slice_started = time.monotonic()
+
+    def checkpoint(self) -> bool:
+        """
+        在工作单位之间调用，按预算休眠或暂停
+
+        Returns:
+            是否可以继续工作
+        """
+        elapsed = self.finish()
+        if self._stop_event.is_set():
+            return False
+        if self.used >= self.seconds:
+            self.exhausted = True
+            return False
+
+        # 按占空比休眠，工作时间越长休眠越久
+        if elapsed >= _WORK_SLICE and self.duty_cycle < 1:
+            if self._stop_event.wait(elapsed * (1 - self.duty_cycle) / self.duty_cycle):
+                return False
+
+        if not self._wait_idle():
+            return False
+        self._slice_started = time.monotonic()
+        return True
+
+    def finish(self) -> float:
+        """
+        结算当前工作片段的耗时
+
+        Returns:
+            本片段的工作时长（秒）
+        """
+        now = time.monotonic()
+        elapsed = now - self._slice_started
+        self.used += elapsed
+        self._slice_started = now
+        return elapsed
+
+    def _wait_idle(self) -> bool:
+        """等待没有进行中的流式响应，超时或停止时返回 False"""
+        if stream_activity.is_idle(_IDLE_QUIET):
+            return True
+        started = time.monotonic()
+        try:
+            while not stream_activity.is_idle(_IDLE_QUIET):
+                if time.monotonic() - started >= _IDLE_WAIT_MAX:
+                    return False
+                if self._stop_event.wait(_IDLE_POLL):
+                    return False
+            return True
+        finally:
+            self.paused += time.monotonic() - started
+
+
+class _MaintenanceJob:
+    """维护任务及其运行状态"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[MaintenanceBudget], Any],
+        interval: float,
+        jitter: float,
+        budget: float,
+        duty_cycle: float,
+        initial_delay: float
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.budget = budget
+        self.duty_cycle = duty_cycle
+
+        # 重叠执行保护
+        self.running = threading.Lock()
+        self.next_run_at = time.time() + self._jittered(initial_delay)
+
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_started_at: float | None = None
+        self.last_finished_at: float | None = None
+        self.last_duration: float | None = None
+        self.last_busy: float | None = None
+        self.last_paused: float | None = None
+        self.last_exhausted = False
+        self.last_result: Any = None
+        self.last_error: str | None = None
+
+    def schedule_next(self) -> None:
+        self.next_run_at = time.time() + self._jittered(self.interval)
+
+    def _jittered(self, delay: float) -> float:
+        return max(0.0, delay + random.uniform(-self.jitter, self.jitter) * delay)
+
+
+class MaintenanceScheduler:
+    """进程内的后台维护调度器（单个后台线程依次执行到期任务）"""
+
+    def __init__(self):
+        self._jobs: dict[str, _MaintenanceJob] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[MaintenanceBudget], Any],
+        interval: float,
+        jitter: float = 0.1,
+        budget: float = 30.0,
+        duty_cycle: float = 0.25,
+        initial_delay: float | None = None
+    ) -> None:
+        """
+        注册维护任务
+
+        Args:
+            name: 任务名称
+            func: 任务函数，接收 MaintenanceBudget，返回值作为最近一次的执行结果
+            interval: 执行间隔（秒）
+            jitter: 间隔的随机抖动比例（0.1 表示 ±10%）
+            budget: 单次执行的工作时长上限（秒）
+            duty_cycle: 工作时间占比，其余时间休眠让出资源
+            initial_delay: 启动后首次执行的延迟（秒），默认等于执行间隔
+        """
+        job = _MaintenanceJob(
+            name, func, interval, jitter, budget, duty_cycle,
+            interval if initial_delay is None else initial_delay
+        )
+        with self._lock:
+            self._jobs[name] = job
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """启动调度线程"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self._stop_event,),
+                name="maintenance-scheduler",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止调度线程；执行中的任务会在下一个 checkpoint 处结束
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop_event.set()
+            self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def status(self) -> dict:
+        """
+        获取调度器与各任务的状态
+
+        Returns:
+            包含运行状态、进行中的流式响应数与任务列表的字典
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+            running = self._thread is not None and self._thread.is_alive()
+        return {
+            "running": running,
+            "active_streams": stream_activity.active,
+            "jobs": [
+                {
+                    "name": job.name,
+                    "interval": job.interval,
+                    "jitter": job.jitter,
+                    "budget": job.budget,
+                    "duty_cycle": job.duty_cycle,
+                    "state": "running" if job.running.locked() else "idle",
+                    "next_run_at": job.next_run_at,
+                    "runs": job.runs,
+                    "skipped": job.skipped,
+                    "failures": job.failures,
+                    "last_started_at": job.last_started_at,
+                    "last_finished_at": job.last_finished_at,
+                    "last_duration": job.last_duration,
+                    "last_busy": job.last_busy,
+                    "last_paused": job.last_paused,
+                    "last_exhausted": job.last_exhausted,
+                    "last_result": job.last_result,
+                    "last_error": job.last_error,
+                }
+                for job in jobs
+            ],
+        }
+
+    def _run(self, stop_event: threading.Event) -> None:
+        """调度线程主循环"""
+        while not stop_event.is_set():
+            with self._lock:
+                jobs = list(self._jobs.values())
+            now = time.time()
+            due = sorted((job for job in jobs if job.next_run_at <= now), key=lambda job: job.next_run_at)
+            for job in due:
+                if stop_event.is_set():
+                    return
+                self._execute(job, stop_event)
+                job.schedule_next()
+
+            next_at = min((job.next_run_at for job in jobs), default=None)
+            delay = 60.0 if next_at is None else max(0.0, next_at - time.time())
+            self._wakeup.clear()
+            self._wakeup.wait(delay)
+
+    def _execute(self, job: _MaintenanceJob, stop_event: threading.Event) -> bool:
+        if not job.running.acquire(blocking=False):
+            job.skipped += 1
+            logger.info(f"维护任务仍在执行，跳过本次: {job.name}")
+            return False
+
+        budget = MaintenanceBudget(job.budget, job.duty_cycle, stop_event)
+        try:
+            # 开始前先等待交互空闲
+            if not budget.checkpoint():
+                job.skipped += 1
+                return False
+
+            job.last_started_at = time.time()
+            started = time.monotonic()
+            try:
+                job.last_result = job.func(budget)
+                job.last_error = None
+            except Exception as e:
+                job.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"维护任务执行失败: {job.name} | {e}")
+            budget.finish()
+
+            job.runs += 1
+            job.last_finished_at = time.time()
+            job.last_duration = round(time.monotonic() - started, 3)
+            job.last_busy = round(budget.used, 3)
+            job.last_paused = round(budget.paused, 3)
+            job.last_exhausted = budget.exhausted
+            return True
+        finally:
+            job.running.release()
@@ -0,0 +1,486 @@
+"""
+笔记元数据索引服务
+在全量对账与每次文件变更时提取 YAML frontmatter、标签、标题大纲、字数与内容哈希，
+持久化到 SQLite，标签浏览、大纲与统计查询无需读取笔记文件
+"""
+import codecs
+import hashlib
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:  # PyYAML 为可选依赖，缺失时按简单的 key: value 格式解析 frontmatter
+    yaml = None
+
+from ..core import get_logger
+from ..utils.knowledge_utils import read_text_data
+from ..utils.text_utils import count_words
+from .background_indexer import BackgroundIndexer, ReaderPool, get_index_dir
+
+
+logger = get_logger(__name__)
+
+# 索引结构版本，变化时自动重建
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    cjk INTEGER NOT NULL,
+    frontmatter TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL COLLATE NOCASE,
+    note_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, note_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_tags_note ON tags (note_id);
+CREATE TABLE IF NOT EXISTS headings (
+    note_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (note_id, seq)
+) WITHOUT ROWID;
+"""
+
+# 文件开头的 --- 包围的 YAML frontmatter
+_FRONTMATTER_PATTERN = re.compile(r'\A---[ \t]*\r?\n(.*?)^(?:---|\.\.\.)[ \t]*\r?$\n?', re.DOTALL | re.MULTILINE)
+
+# ATX 标题（# 标题 #）
+_HEADING_PATTERN = re.compile(r'^ {0,3}(#{1,6})[ \t]+(.+?)(?:[ \t]+#+)?[ \t]*$')
+_FENCE_PATTERN = re.compile(r'^ {0,3}(```|~~~)')
+_INLINE_CODE_PATTERN = re.compile(r'`[^`\n]*`')
+
+# 行内 #标签：# 前为行首或空白，标签内可含 / 表示层级
+_TAG_PATTERN = re.compile(r'(?<!\S)#([^\s#!"$%&\'()*+,.:;<=>?@\[\]^`{|}~\\]+)')
+
+# 简易 frontmatter 解析（无 PyYAML 时使用）
+_FM_KEY_PATTERN = re.compile(r'^([^\s:#][^:]*):[ \t]*(.*)$')
+_FM_ITEM_PATTERN = re.compile(r'^[ \t]+-[ \t]+(.*)$|^-[ \t]+(.*)$')
+
+
+def _normalize_tag(tag: str) -> str | None:
+    """规范化标签：去掉 # 与首尾 /，纯数字不算标签"""
+    tag = tag.strip().lstrip('#').strip('/')
+    if not tag or tag.isdigit() or any(ch.isspace() for ch in tag):
+        return None
+    return tag
+
+
+def _parse_frontmatter(text: str) -> dict:
+    """解析 frontmatter 文本，失败或不是映射时返回空字典"""
+    if yaml is not None:
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    data: dict = {}
+    key = None
+    for line in text.splitlines():
+        item = _FM_ITEM_PATTERN.match(line)
+        if item and key is not None:
+            if not isinstance(data.get(key), list):
+                data[key] = []
+            data[key].append((item.group(1) or item.group(2) or '').strip().strip('\'"'))
+            continue
+        match = _FM_KEY_PATTERN.match(line)
+        if match:
+            key = match.group(1).strip()
+            value = match.group(2).strip()
+            if value.startswith('[') and value.endswith(']'):
+                data[key] = [v.strip().strip('\'"') for v in value[1:-1].split(',') if v.strip()]
+            else:
+                data[key] = value.strip('\'"') if value else None
+    return data
+
+
+def _frontmatter_tags(frontmatter: dict) -> list[str]:
+    """提取 frontmatter 中 tags / tag 字段声明的标签"""
+    tags = []
+    for field in ('tags', 'tag'):
+        value = frontmatter.get(field)
+        if isinstance(value, str):
+            tags.extend(re.split(r'[,\s]+', value))
+        elif isinstance(value, list):
+            tags.extend(str(item) for item in value if item is not None)
+    return tags
+
+
+def _offset_codec(data: bytes, encoding: str | None) -> tuple[str, int, int]:
+    """
+    计算字节偏移使用的编码、起始偏移与每个换行额外的字节数
+
+    带 BOM 的编码解码后不含 BOM，偏移需加上 BOM 长度，且重新编码时不能再次写出 BOM；
+    解码后的内容换行符统一为 \n，CRLF 文件每行需补上 \r 的字节数
+    """
+    if encoding == 'utf-8-sig':
+        codec, base = 'utf-8', len(codecs.BOM_UTF8)
+    elif encoding == 'utf-16':
+        codec = 'utf-16-le' if data.startswith(codecs.BOM_UTF16_LE) else 'utf-16-be'
+        base = len(codecs.BOM_UTF16_LE)
+    else:
+        codec, base = encoding or 'utf-8', 0
+    crlf = '\r\n'.encode(codec)
+    return codec, base, (len(crlf) // 2 if crlf in data else 0)
+
+
+def extract_metadata(relative_path: str, data: bytes, content: str, encoding: str | None) -> dict:
+    """
+    提取笔记元数据
+
+    代码块中的 # 行不算标题或标签；字数统计不含 frontmatter
+
+    Args:
+        relative_path: 笔记相对路径（/ 分隔）
+        data: 文件原始字节
+        content: 解码后的文件内容
+        encoding: 文件编码
+
+    Returns:
+        包含 hash、title、words、chars、cjk、frontmatter、tags、headings 的字典，
+        headings 为 (级别, 标题, 行号, 字节偏移) 列表
+    """
+    frontmatter: dict = {}
+    body_start = 0
+    match = _FRONTMATTER_PATTERN.match(content)
+    if match:
+        frontmatter = _parse_frontmatter(match.group(1))
+        body_start = match.end()
+
+    # frontmatter 可能包含日期等非 JSON 类型，统一转为字符串
+    frontmatter_json = json.dumps(frontmatter, ensure_ascii=False, default=str, skipkeys=True)
+
+    tags: dict[str, str] = {}
+    for tag in _frontmatter_tags(frontmatter):
+        tag = _normalize_tag(tag)
+        if tag:
+            tags.setdefault(tag.lower(), tag)
+
+    codec, byte_base, cr_bytes = _offset_codec(data, encoding)
+    # 增量编码：只编码相邻两个标题之间的文本
+    last_char, last_byte = 0, byte_base
+
+    headings: list[tuple[int, str, int, int]] = []
+    fence: str | None = None
+    line_no = content.count('\n', 0, body_start)
+    position = body_start
+
+    for line in content[body_start:].split('\n'):
+        line_no += 1
+        line_start = position
+        position += len(line) + 1
+        line = line.rstrip('\r')
+
+        if fence is not None:
+            if line.lstrip().startswith(fence):
+                fence = None
+            continue
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence_match:
+            fence = fence_match.group(1)
+            continue
+
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            segment = content[last_char:line_start]
+            last_byte += len(segment.encode(codec)) + segment.count('\n') * cr_bytes
+            last_char = line_start
+            headings.append((len(heading.group(1)), heading.group(2), line_no, last_byte))
+
+        if '#' in line:
+            for tag_match in _TAG_PATTERN.finditer(_INLINE_CODE_PATTERN.sub('', line)):
+                tag = _normalize_tag(tag_match.group(1))
+                if tag:
+                    tags.setdefault(tag.lower(), tag)
+
+    title = frontmatter.get('title')
+    if not isinstance(title, str) or not title.strip():
+        title = next((text for level, text, _, _ in headings if level == 1), Path(relative_path).stem)
+
+    words, chars, cjk = count_words(content[body_start:])
+    return {
+        "hash": hashlib.sha256(data).hexdigest(),
+        "title": title.strip(),
+        "words": words,
+        "chars": chars,
+        "cjk": cjk,
+        "frontmatter": frontmatter_json,
+        "tags": list(tags.values()),
+        "headings": headings,
+    }
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """打开索引数据库连接（WAL 模式，允许读写并发）"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class MetadataIndexService(BackgroundIndexer):
+    """笔记元数据索引服务（单例，由应用持有）"""
+
+    name = "元数据索引"
+
+    def __init__(self, vault_index, reconcile_interval: float = 300.0):
+        """
+        初始化元数据索引服务
+
+        Args:
+            vault_index: 知识库索引服务
+            reconcile_interval: 空闲时与磁盘全量对账的间隔（秒）
+        """
+        super().__init__(vault_index, reconcile_interval)
+        self.db_path: Path | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._readers = ReaderPool()
+
+    # ==================== 查询 ====================
+
+    def list_tags(self, prefix: str | None = None) -> list[dict]:
+        """
+        列出标签及其笔记数
+
+        Args:
+            prefix: 只列出该标签及其子标签（如 project 匹配 project/a）
+
+        Returns:
+            按笔记数降序排列的 {tag, count} 列表
+        """
+        with self._reader() as conn:
+            if conn is None:
+                return []
+
+            where, params = self._tag_filter(prefix)
+            rows = conn.execute(
+                f"SELECT MIN(tag), COUNT(*) FROM tags {'WHERE ' + where if where else ''} "
+                "GROUP BY tag ORDER BY COUNT(*) DESC, tag",
+                params
+            ).fetchall()
+            return [{"tag": tag, "count": count} for tag, count in rows]
+
+    def find_notes(self, tag: str | None = None, limit: int = 50, offset: int = 0) -> tuple[list[dict], int]:
+        """
+        按标签筛选笔记（含子标签）
+
+        Args:
+            tag: 标签，为空时列出全部笔记
+            limit: 返回数量上限
+            offset: 跳过的数量
+
+        Returns:
+            (按路径排序的笔记摘要列表, 命中总数)
+        """
+        with self._reader() as conn:
+            if conn is None:
+                return [], 0
+
+            if tag:
+                where, params = self._tag_filter(tag)
+                if not where:
+                    return [], 0
+                condition = f"WHERE n.id IN (SELECT note_id FROM tags WHERE {where})"
+            else:
+                condition, params = "", []
+
+            total = conn.execute(f"SELECT COUNT(*) FROM notes n {condition}", params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT n.path, n.title, n.words, n.chars, "
+                "(SELECT GROUP_CONCAT(tag, char(10)) FROM tags t WHERE t.note_id = n.id) "
+                f"FROM notes n {condition} ORDER BY n.path LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            ).fetchall()
+
+            return [
+                {"path": path, "title": title, "words": words, "chars": chars, "tags": tags.split("\n") if tags else []}
+                for path, title, words, chars, tags in rows
+            ], total
+
+    def get_note(self, relative_path: str) -> dict | None:
+        """
+        获取单篇笔记的完整元数据（含大纲）
+
+        Args:
+            relative_path: 笔记相对路径
+
+        Returns:
+            元数据字典，未索引时返回 None
+        """
+        with self._reader() as conn:
+            if conn is None:
+                return None
+
+            row = conn.execute(
+                "SELECT id, path, title, words, chars, cjk, hash, mtime_ns, size, frontmatter FROM notes WHERE path = ?",
+                (relative_path,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            note_id, path, title, words, chars, cjk, content_hash, mtime_ns, size, frontmatter = row
+            tags = [tag for (tag,) in conn.execute("SELECT tag FROM tags WHERE note_id = ? ORDER BY tag", (note_id,))]
+            headings = [
+                {"level": level, "title": text, "line": line, "offset": offset}
+                for level, text, line, offset in conn.execute(
+                    "SELECT level, title, line, offset FROM headings WHERE note_id = ? ORDER BY seq", (note_id,)
+                )
+            ]
+            return {
+                "path": path,
+                "title": title,
+                "words": words,
+                "chars": chars,
+                "cjk": cjk,
+                "hash": content_hash,
+                "mtime": mtime_ns / 1e9,
+                "size": size,
+                "tags": tags,
+                "frontmatter": json.loads(frontmatter),
+                "headings": headings,
+            }
+
+    def summary(self) -> dict[str, int]:
+        """
+        获取知识库整体统计
+
+        Returns:
+            包含 notes、words、chars、cjk、tags 的字典
+        """
+        with self._reader() as conn:
+            if conn is None:
+                return {"notes": 0, "words": 0, "chars": 0, "cjk": 0, "tags": 0}
+
+            notes, words, chars, cjk = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(words), 0), COALESCE(SUM(chars), 0), COALESCE(SUM(cjk), 0) FROM notes"
+            ).fetchone()
+            tags = conn.execute("SELECT COUNT(DISTINCT tag) FROM tags").fetchone()[0]
+            return {"notes": notes, "words": words, "chars": chars, "cjk": cjk, "tags": tags}
+
+    @staticmethod
+    def _tag_filter(tag: str | None) -> tuple[str, list[str]]:
+        """构建匹配标签及其子标签的条件（走 tags 主键范围扫描）"""
+        tag = _normalize_tag(tag) if tag else None
+        if not tag:
+            return "", []
+        # '0' 紧随 '/' 之后，[tag/, tag0) 恰好覆盖全部子标签
+        return "(tag = ? OR (tag >= ? AND tag < ?))", [tag, tag + '/', tag + '0']
+
+    def _reader(self):
+        """借出只读连接（查询线程间复用，用完归还），索引尚未建立时为 None"""
+        return self._readers.connection(self.db_path)
+
+    def stop(self, timeout: float | None = None) -> None:
+        super().stop(timeout)
+        # 关闭查询线程的只读连接
+        self._readers.close()
+
+    # ==================== 索引写入（工作线程） ====================
+
+    def _index_path(self, vault_path: Path, relative_path: str) -> None:
+        # 内容哈希与标题字节偏移需要原始字节，一次读取同时拿到字节与解码结果
+        file_path = vault_path / relative_path
+        try:
+            file_stat = file_path.stat()
+            data, content, encoding = read_text_data(file_path)
+        except FileNotFoundError:
+            self._remove(relative_path)
+            return
+        except OSError as e:
+            logger.warning(f"{self.name}读取文件失败: {relative_path} | {e}")
+            self.failed_count += 1
+            return
+
+        try:
+            meta = extract_metadata(relative_path, data, content, encoding)
+            self._store(relative_path, meta, file_stat.st_mtime_ns, file_stat.st_size)
+            self.indexed_count += 1
+        except Exception as e:
+            logger.warning(f"{self.name}索引文件失败: {relative_path} | {e}")
+            self.failed_count += 1
+
+    def _open(self, vault_path: Path) -> None:
+        db_path = get_index_dir(vault_path) / "meta.db"
+        conn = _connect(db_path)
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS headings; DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS notes;")
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+        self._conn = conn
+        self.db_path = db_path
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def _indexed_fingerprints(self) -> dict[str, tuple[int, int]]:
+        rows = self._conn.execute("SELECT path, mtime_ns, size FROM notes").fetchall()
+        return {path: (mtime_ns, size) for path, mtime_ns, size in rows}
+
+    def _index_document(self, relative_path: str, content: str, mtime_ns: int, size: int) -> None:
+        data = content.encode('utf-8')
+        self._store(relative_path, extract_metadata(relative_path, data, content, 'utf-8'), mtime_ns, size)
+
+    def _store(self, relative_path: str, meta: dict, mtime_ns: int, size: int) -> None:
+        """写入或替换单篇笔记的元数据"""
+        conn = self._conn
+        values = (
+            mtime_ns, size, meta["hash"], meta["title"], meta["words"], meta["chars"], meta["cjk"], meta["frontmatter"]
+        )
+        row = conn.execute("SELECT id FROM notes WHERE path = ?", (relative_path,)).fetchone()
+        if row:
+            note_id = row[0]
+            self._delete_children(note_id)
+            conn.execute(
+                "UPDATE notes SET mtime_ns = ?, size = ?, hash = ?, title = ?, words = ?, chars = ?, cjk = ?, "
+                "frontmatter = ? WHERE id = ?",
+                (*values, note_id)
+            )
+        else:
+            note_id = conn.execute(
+                "INSERT INTO notes (path, mtime_ns, size, hash, title, words, chars, cjk, frontmatter) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (relative_path, *values)
+            ).lastrowid
+
+        conn.executemany("INSERT INTO tags (tag, note_id) VALUES (?, ?)", ((tag, note_id) for tag in meta["tags"]))
+        conn.executemany(
+            "INSERT INTO headings (note_id, seq, level, title, line, offset) VALUES (?, ?, ?, ?, ?, ?)",
+            ((note_id, seq, *heading) for seq, heading in enumerate(meta["headings"]))
+        )
+
+    def _remove_document(self, relative_path: str) -> None:
+        conn = self._conn
+        row = conn.execute("SELECT id FROM notes WHERE path = ?", (relative_path,)).fetchone()
+        if row:
+            self._delete_children(row[0])
+            conn.execute("DELETE FROM notes WHERE id = ?", (row[0],))
+
+    def _delete_children(self, note_id: int) -> None:
+        """删除笔记的标签与标题记录"""
+        self._conn.execute("DELETE FROM tags WHERE note_id = ?", (note_id,))
+        self._conn.execute("DELETE FROM headings WHERE note_id = ?", (note_id,))
+
+    def _commit(self) -> None:
+        self._conn.commit()
@@ -0,0 +1,261 @@
+"""
+全文搜索索引服务
+基于 SQLite 持久化的倒排索引，BM25 排序，支持中英文混排检索与摘要提取
+"""
+import heapq
+import math
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from ..core import get_logger
+from ..utils.knowledge_utils import read_cached_text
+from ..utils.text_utils import tokenize, is_cjk
+from .background_indexer import BackgroundIndexer, ReaderPool, get_index_dir
+
+
+logger = get_logger(__name__)
+
+# 索引结构版本，变化时自动重建
+SCHEMA_VERSION = 2
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 文件名词项的权重（相当于在正文中重复出现的次数）
+TITLE_WEIGHT = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+"""
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """打开索引数据库连接（WAL 模式，允许读写并发）"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # 加大页缓存，减少批量写入倒排表时的 B 树换页
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+class SearchIndexService(BackgroundIndexer):
+    """全文搜索索引服务（单例，由应用持有）"""
+
+    name = "全文索引"
+
+    def __init__(self, vault_index, reconcile_interval: float = 300.0):
+        """
+        初始化搜索索引服务
+
+        Args:
+            vault_index: 知识库索引服务
+            reconcile_interval: 空闲时与磁盘全量对账的间隔（秒）
+        """
+        super().__init__(vault_index, reconcile_interval)
+        self.db_path: Path | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._readers = ReaderPool()
+
+        # 文档总数与总长度（BM25 需要），由写线程维护
+        self._doc_count = 0
+        self._total_length = 0
+
+    # ==================== 查询 ====================
+
+    def search(self, query: str, limit: int = 20) -> tuple[list[dict], int]:
+        """
+        全文搜索
+
+        Args:
+            query: 查询字符串
+            limit: 返回结果数量上限
+
+        Returns:
+            (按相关度排序的结果列表, 命中文档总数)
+            结果项包含 path、title、score、snippet
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._reader() as conn:
+            if not terms or conn is None or self._doc_count == 0:
+                return [], 0
+
+            doc_count = self._doc_count
+            avg_length = self._total_length / doc_count or 1.0
+            scores: dict[int, float] = {}
+
+            for term in terms:
+                if len(term) == 1 and is_cjk(term):
+                    # 单个汉字：匹配以该字开头的所有二元组
+                    rows = conn.execute(
+                        "SELECT p.doc_id, SUM(p.tf), d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+                        "WHERE p.term >= ? AND p.term < ? GROUP BY p.doc_id",
+                        (term, term + '\U0010ffff')
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+                        "WHERE p.term = ?",
+                        (term,)
+                    ).fetchall()
+
+                df = len(rows)
+                if df == 0:
+                    continue
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            if not top:
+                return [], 0
+
+            placeholders = ",".join("?" * len(top))
+            paths = dict(conn.execute(
+                f"SELECT id, path FROM docs WHERE id IN ({placeholders})",
+                [doc_id for doc_id, _ in top]
+            ).fetchall())
+
+        # 摘要需要读取文件，先归还连接
+        results = []
+        for doc_id, score in top:
+            path = paths.get(doc_id)
+            if path is None:
+                continue
+            results.append({
+                "path": path,
+                "title": Path(path).stem,
+                "score": round(score, 4),
+                "snippet": self._snippet(path, terms),
+            })
+        return results, len(scores)
+
+    def _snippet(self, relative_path: str, terms: list[str], before: int = 40, after: int = 80) -> str:
+        """提取首个命中词附近的文本片段（只读取结果文件，经内容缓存）"""
+        root = self.root
+        if root is None:
+            return ""
+        try:
+            content = read_cached_text(root / relative_path)
+        except OSError:
+            return ""
+
+        # 在原文上忽略大小写匹配，偏移直接对应原文（lower() 可能改变字符串长度）
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        match = pattern.search(content)
+        start = max(match.start() - before, 0) if match else 0
+        end = start + before + after
+
+        snippet = re.sub(r'\s+', ' ', content[start:end]).strip()
+        if start > 0:
+            snippet = "…" + snippet
+        if end < len(content):
+            snippet += "…"
+        return snippet
+
+    def _reader(self):
+        """借出只读连接（查询线程间复用，用完归还），索引尚未建立时为 None"""
+        return self._readers.connection(self.db_path)
+
+    def stop(self, timeout: float | None = None) -> None:
+        super().stop(timeout)
+        # 关闭查询线程的只读连接
+        self._readers.close()
+
+    # ==================== 索引写入（工作线程） ====================
+
+    def _open(self, vault_path: Path) -> None:
+        db_path = get_index_dir(vault_path) / "search.db"
+        conn = _connect(db_path)
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS docs;")
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+        self._conn = conn
+        self._refresh_totals()
+        self.db_path = db_path
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def _indexed_fingerprints(self) -> dict[str, tuple[int, int]]:
+        rows = self._conn.execute("SELECT path, mtime_ns, size FROM docs").fetchall()
+        return {path: (mtime_ns, size) for path, mtime_ns, size in rows}
+
+    def _index_document(self, relative_path: str, content: str, mtime_ns: int, size: int) -> None:
+        counts = Counter(tokenize(content))
+        for term in tokenize(Path(relative_path).stem):
+            counts[term] += TITLE_WEIGHT
+        length = sum(counts.values())
+
+        # 按词项排序后插入，提高倒排表 B 树写入的局部性
+        terms = sorted(counts)
+
+        conn = self._conn
+        row = conn.execute("SELECT id, terms FROM docs WHERE path = ?", (relative_path,)).fetchone()
+        if row:
+            doc_id = row[0]
+            self._delete_postings(doc_id, row[1])
+            conn.execute(
+                "UPDATE docs SET mtime_ns = ?, size = ?, length = ?, terms = ? WHERE id = ?",
+                (mtime_ns, size, length, "\n".join(terms), doc_id)
+            )
+        else:
+            doc_id = conn.execute(
+                "INSERT INTO docs (path, mtime_ns, size, length, terms) VALUES (?, ?, ?, ?, ?)",
+                (relative_path, mtime_ns, size, length, "\n".join(terms))
+            ).lastrowid
+
+        conn.executemany(
+            "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+            ((term, doc_id, counts[term]) for term in terms)
+        )
+
+    def _remove_document(self, relative_path: str) -> None:
+        conn = self._conn
+        row = conn.execute("SELECT id, terms FROM docs WHERE path = ?", (relative_path,)).fetchone()
+        if row:
+            self._delete_postings(row[0], row[1])
+            conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    def _delete_postings(self, doc_id: int, terms: str) -> None:
+        """按文档记录的词项列表删除倒排项（走主键，无需额外的 doc_id 索引）"""
+        if terms:
+            self._conn.executemany(
+                "DELETE FROM postings WHERE term = ? AND doc_id = ?",
+                ((term, doc_id) for term in terms.split("\n"))
+            )
+
+    def _commit(self) -> None:
+        self._conn.commit()
+        self._refresh_totals()
+
+    def _refresh_totals(self) -> None:
+        """刷新文档总数与总长度"""
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        self._doc_count = count
+        self._total_length = total
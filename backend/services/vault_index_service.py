@@ -0,0 +1,763 @@
+"""
+知识库索引服务
+维护常驻内存的文件树索引：启动时全量扫描一次，之后由文件监听事件增量更新
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from ..core import get_logger
+from ..core.exceptions import NotFoundException, ServiceUnavailableException
+from ..schemas.responses import FileTreeNode
+from ..utils.knowledge_utils import is_excluded
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog 为可选依赖，缺失时回退为轮询
+    FileSystemEventHandler = object
+    Observer = None
+
+
+logger = get_logger(__name__)
+
+# 查询时等待初始扫描完成的默认超时（秒）
+_READY_TIMEOUT = 30.0
+
+
+def _sort_key(name: str) -> str:
+    """与 Path 排序保持一致（Windows 下不区分大小写）"""
+    return os.path.normcase(name)
+
+
+def _join(parent: str, name: str) -> str:
+    """拼接以 / 分隔的相对路径"""
+    return f"{parent}/{name}" if parent else name
+
+
+def _parent_of(rel: str) -> str:
+    """获取相对路径的父目录（根目录为空字符串）"""
+    return rel.rpartition('/')[0]
+
+
+class _DirState:
+    """单个目录的索引状态"""
+    __slots__ = ('mtime_ns', 'dirs', 'files')
+
+    def __init__(self, mtime_ns: int, dirs: set[str], files: set[str]):
+        self.mtime_ns = mtime_ns
+        self.dirs = dirs
+        self.files = files
+
+
+class _VaultEventHandler(FileSystemEventHandler):
+    """将 watchdog 事件转换为目录重新同步"""
+
+    def __init__(self, service: 'VaultIndexService'):
+        super().__init__()
+        self.service = service
+
+    def on_created(self, event):
+        self.service.refresh_path(event.src_path)
+
+    def on_deleted(self, event):
+        self.service.refresh_path(event.src_path)
+
+    def on_moved(self, event):
+        self.service.refresh_path(event.src_path)
+        self.service.refresh_path(event.dest_path)
+        # 原子保存（写临时文件后替换）表现为移动到已有文件上
+        if not event.is_directory:
+            self.service.file_modified(event.dest_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.service.file_modified(event.src_path)
+
+
+class VaultIndexService:
+    """知识库索引服务（单例，由应用持有）"""
+
+    def __init__(self, poll_interval: float = 2.0):
+        """
+        初始化索引服务
+
+        Args:
+            poll_interval: 轮询模式下检查目录变化的间隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.root: Path | None = None
+        self.generation = 0
+        # 每次重建索引时更新，避免重启后 generation 重复导致 ETag 误匹配
+        self.epoch = 0
+
+        self._lock = threading.RLock()
+        # _ready 仅在扫描成功后设置；_done 在扫描结束（无论成败）后设置，每次启动重新创建
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._stop_event = threading.Event()
+        self._dirs: dict[str, _DirState] = {}
+        self._node_cache: dict[str, list[FileTreeNode]] = {}
+        self._children_cache: dict[str, list[tuple[str, bool]]] = {}
+        # 紧凑格式的序列化结果 ((epoch, generation), JSON 字节)
+        self._compact_cache: tuple[tuple[int, int], bytes] | None = None
+        self._observer = None
+        self._poll_thread: threading.Thread | None = None
+        self._scan_thread: threading.Thread | None = None
+        # 最近一次初始扫描的失败原因
+        self.scan_error: str | None = None
+
+        # 索引启动通知（供全文搜索等下游索引随之重建）
+        self._start_listeners: list[Callable[[Path], None]] = []
+        # 文件级变更通知（供全文搜索等下游索引增量更新）
+        self._file_listeners: list[Callable[[list[str], list[str]], None]] = []
+        self._changed_files: set[str] = set()
+        self._removed_files: set[str] = set()
+        # 初始扫描期间收到变化事件的目录，发布扫描结果后重新同步
+        self._pending_dirs: set[str] = set()
+
+    # ==================== 生命周期 ====================
+
+    def start(self, vault_path: Path) -> None:
+        """
+        启动索引：后台执行初始扫描，并开始监听文件变化
+
+        Args:
+            vault_path: 知识库根目录
+        """
+        observer = self._restart(vault_path)
+        self._stop_observer(observer)
+        self._notify_started(vault_path)
+
+    def _restart(self, vault_path: Path):
+        """重置索引状态并启动初始扫描线程，返回需要在锁外停止的旧 watchdog 监听"""
+        with self._lock:
+            observer = self._reset()
+            self.root = vault_path
+            self.epoch = time.time_ns()
+            self.scan_error = None
+            self._ready = threading.Event()
+            self._done = threading.Event()
+            self._stop_event = threading.Event()
+            self._scan_thread = threading.Thread(
+                target=self._initial_scan,
+                args=(vault_path, self._ready, self._done, self._stop_event),
+                name="vault-index-scan",
+                daemon=True
+            )
+            self._scan_thread.start()
+            return observer
+
+    def _notify_started(self, vault_path: Path) -> None:
+        """在锁外通知启动监听器"""
+        for listener in self._start_listeners:
+            try:
+                listener(vault_path)
+            except Exception as e:
+                logger.warning(f"索引启动监听器执行失败: {e}")
+
+    def stop(self) -> None:
+        """停止文件监听并清空索引"""
+        with self._lock:
+            observer = self._reset()
+        self._stop_observer(observer)
+
+    @staticmethod
+    def _stop_observer(observer) -> None:
+        """
+        在锁外停止 watchdog 监听
+
+        watchdog 在分发事件期间持有自身的锁，事件回调又会等待索引锁，
+        持有索引锁停止监听会互相等待
+        """
+        if observer is not None:
+            observer.stop()
+
+    def _reset(self):
+        """清空索引并解除 watchdog 监听（调用方持有锁），返回需要在锁外停止的监听"""
+        with self._lock:
+            self._stop_event.set()
+            observer, self._observer = self._observer, None
+            self._poll_thread = None
+            self._dirs.clear()
+            self._node_cache.clear()
+            self._children_cache.clear()
+            self._compact_cache = None
+            self._pending_dirs.clear()
+            self.root = None
+            return observer
+
+    def is_serving(self, vault_path: Path) -> bool:
+        """判断当前索引是否对应指定的知识库路径"""
+        return self.root is not None and self.root == vault_path
+
+    def _initial_scan(
+        self,
+        root: Path,
+        ready: threading.Event,
+        done: threading.Event,
+        stop_event: threading.Event
+    ) -> None:
+        """
+        初始全量扫描（后台线程），扫描期间不持有锁，只在发布结果时加锁
+
+        监听在遍历之前启动，遍历期间发生变化的目录先记下，发布结果后再逐个重新同步，
+        避免已遍历过的目录在之后发生变化却一直得不到更新
+        """
+        logger.info(f"开始扫描知识库: {root}")
+
+        pending: set[str] = set()
+        try:
+            with self._lock:
+                if self.root != root or stop_event.is_set():
+                    return
+                self._start_watcher()
+
+            dirs = self._walk(root, stop_event)
+            if dirs is None:
+                return
+            if '' not in dirs:
+                raise FileNotFoundError(f"知识库目录不存在: {root}")
+
+            with self._lock:
+                if self.root != root or stop_event.is_set():
+                    return
+                self._dirs = dirs
+                self._node_cache.clear()
+                self._children_cache.clear()
+                self._compact_cache = None
+                self.generation += 1
+                ready.set()
+                pending, self._pending_dirs = self._pending_dirs, set()
+
+            logger.info(f"知识库扫描完成，共 {len(dirs)} 个目录")
+        except Exception as e:
+            logger.error(f"知识库扫描失败: {root} | {e}", exc_info=True)
+            observer = None
+            with self._lock:
+                if self.root == root and not stop_event.is_set():
+                    # 清空索引状态，下次查询时重新扫描
+                    observer = self._reset()
+                    self.scan_error = f"{type(e).__name__}: {e}"
+            self._stop_observer(observer)
+        finally:
+            done.set()
+
+        # 扫描结果已发布，同步遍历期间发生变化的目录
+        for rel in sorted(pending):
+            self._resync_dir(rel)
+        self._flush_changes()
+
+    def _walk(self, root: Path, stop_event: threading.Event, rel: str = '') -> dict[str, _DirState] | None:
+        """
+        在锁外递归读取目录，返回 {目录相对路径: 目录状态}
+
+        Args:
+            root: 知识库根目录
+            stop_event: 停止信号
+            rel: 起始目录的相对路径，空字符串表示根目录
+
+        Returns:
+            目录状态字典（起始目录不存在时为空），收到停止信号时返回 None
+        """
+        dirs: dict[str, _DirState] = {}
+        pending = [rel]
+        while pending:
+            if stop_event.is_set():
+                return None
+            current = pending.pop()
+            state = self._read_dir(current, root)
+            if state is None:
+                continue
+            dirs[current] = state
+            pending.extend(_join(current, name) for name in state.dirs)
+        return dirs
+
+    def _start_watcher(self) -> None:
+        """优先使用 watchdog 监听，不可用时回退为轮询"""
+        if Observer is not None:
+            try:
+                observer = Observer()
+                observer.daemon = True
+                observer.schedule(_VaultEventHandler(self), str(self.root), recursive=True)
+                observer.start()
+                self._observer = observer
+                logger.info("知识库监听已启动（watchdog）")
+                return
+            except Exception as e:
+                logger.warning(f"watchdog 启动失败，回退为轮询: {e}")
+
+        self._poll_thread = threading.Thread(
+            target=self._poll_loop,
+            args=(self._stop_event,),
+            name="vault-index-poll",
+            daemon=True
+        )
+        self._poll_thread.start()
+        logger.info(f"知识库监听已启动（轮询，间隔 {self.poll_interval}s）")
+
+    def _poll_loop(self, stop_event: threading.Event) -> None:
+        """轮询目录 mtime，仅重新同步发生变化的目录"""
+        while not stop_event.wait(self.poll_interval):
+            with self._lock:
+                if self.root is None:
+                    return
+                snapshot = [(rel, state.mtime_ns) for rel, state in self._dirs.items()]
+                root = self.root
+
+            for rel, mtime_ns in snapshot:
+                try:
+                    current = (root / rel).stat().st_mtime_ns
+                except OSError:
+                    current = None
+                if current != mtime_ns:
+                    self._resync_dir(rel)
+
+            self._flush_changes()
+
+    # ==================== 查询 ====================
+
+    def get_tree(self, vault_path: Path, timeout: float | None = None) -> list[FileTreeNode]:
+        """
+        获取完整文件树（直接从内存返回）
+
+        Args:
+            vault_path: 知识库根目录，与当前索引不一致时重新建立索引
+            timeout: 等待初始扫描完成的超时时间（秒），None 表示使用默认超时
+
+        Returns:
+            文件树节点列表
+        """
+        self._ensure_ready(vault_path, timeout)
+
+        with self._lock:
+            return self._build_nodes('')
+
+    def get_compact_tree(self, vault_path: Path, timeout: float | None = None) -> bytes:
+        """
+        获取紧凑格式的完整文件树（已序列化的 JSON）
+
+        以平行数组表示，同一目录的子节点按排序连续排列，不构建节点对象，也不重复存储完整路径：
+        - names: 节点名称
+        - parents: 父节点下标，根目录下的节点为 -1（父节点下标总小于子节点）
+        - flags: 位标记，1 表示目录
+
+        节点的完整路径可由父节点链上的名称以 / 拼接得到。
+        序列化结果按索引版本缓存，文件树未变化时重复请求无需再次构建
+
+        Args:
+            vault_path: 知识库根目录
+            timeout: 等待初始扫描完成的超时时间（秒），None 表示使用默认超时
+
+        Returns:
+            UTF-8 编码的 JSON 对象 {"format": "compact", "names", "parents", "flags"}
+        """
+        self._ensure_ready(vault_path, timeout)
+
+        with self._lock:
+            version = (self.epoch, self.generation)
+            if self._compact_cache is not None and self._compact_cache[0] == version:
+                return self._compact_cache[1]
+
+            names: list[str] = []
+            parents: list[int] = []
+            flags: list[int] = []
+
+            # 栈中保存 (目录相对路径, 该目录的节点下标)，逆序入栈使目录按排序顺序展开
+            stack: list[tuple[str, int]] = [('', -1)]
+            while stack:
+                rel, parent = stack.pop()
+                pending = []
+                for name, is_dir in self._children(rel):
+                    index = len(names)
+                    names.append(name)
+                    parents.append(parent)
+                    flags.append(1 if is_dir else 0)
+                    if is_dir:
+                        pending.append((_join(rel, name), index))
+                stack.extend(reversed(pending))
+
+            payload = json.dumps(
+                {"format": "compact", "names": names, "parents": parents, "flags": flags},
+                ensure_ascii=False,
+                separators=(',', ':')
+            ).encode('utf-8')
+            self._compact_cache = (version, payload)
+            return payload
+
+    def tree_etag(self, vault_path: Path, timeout: float | None = None) -> str:
+        """
+        获取文件树的版本标识（索引每次变化都会更新）
+
+        Args:
+            vault_path: 知识库根目录
+            timeout: 等待初始扫描完成的超时时间（秒），None 表示使用默认超时
+
+        Returns:
+            版本标识字符串
+        """
+        self._ensure_ready(vault_path, timeout)
+
+        with self._lock:
+            return f"tree-{self.epoch:x}-{self.generation:x}"
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """
+        等待初始扫描成功完成
+
+        Args:
+            timeout: 超时时间（秒），None 表示一直等待
+
+        Returns:
+            是否已成功完成（扫描失败时等到超时返回 False）
+        """
+        return self._ready.wait(timeout)
+
+    def list_files(self) -> list[str]:
+        """
+        获取索引中所有文件的相对路径（快照）
+
+        Returns:
+            文件相对路径列表（使用 / 分隔）
+        """
+        with self._lock:
+            return [_join(rel, name) for rel, state in self._dirs.items() for name in state.files]
+
+    def add_start_listener(self, listener: Callable[[Path], None]) -> None:
+        """
+        注册索引启动监听器
+
+        无论索引由配置变更还是首次查询启动，监听器都会在锁外被调用
+
+        Args:
+            listener: 接收知识库根目录的函数
+        """
+        if listener not in self._start_listeners:
+            self._start_listeners.append(listener)
+
+    def add_file_listener(self, listener: Callable[[list[str], list[str]], None]) -> None:
+        """
+        注册文件变更监听器
+
+        监听器在索引线程中被调用，应尽快返回（例如只把任务放入队列）
+
+        Args:
+            listener: 接收 (变更或新增的文件列表, 删除的文件列表) 的函数
+        """
+        if listener not in self._file_listeners:
+            self._file_listeners.append(listener)
+
+    def _ensure_ready(self, vault_path: Path, timeout: float | None) -> None:
+        """
+        确保索引对应指定知识库且初始扫描已完成
+
+        Raises:
+            ServiceUnavailableException: 等待超时或初始扫描失败时
+        """
+        with self._lock:
+            started = not self.is_serving(vault_path)
+            observer = self._restart(vault_path) if started else None
+            ready, done = self._ready, self._done
+        if started:
+            self._stop_observer(observer)
+            self._notify_started(vault_path)
+
+        if not done.wait(_READY_TIMEOUT if timeout is None else timeout):
+            raise ServiceUnavailableException("知识库索引尚未就绪，请稍后重试", error_code="INDEX_NOT_READY")
+        if not ready.is_set():
+            raise ServiceUnavailableException(
+                f"知识库索引失败: {self.scan_error or '索引已被重建'}", error_code="INDEX_FAILED"
+            )
+
+    def list_dir(
+        self,
+        vault_path: Path,
+        path: str = '',
+        depth: int = 1,
+        cursor: str | None = None,
+        limit: int = 200,
+        timeout: float | None = None
+    ) -> tuple[list[FileTreeNode], str | None]:
+        """
+        分层获取单个目录的子节点（分页）
+
+        Args:
+            vault_path: 知识库根目录
+            path: 目录相对路径，空字符串表示根目录
+            depth: 展开层数，1 表示只返回直接子节点
+            cursor: 上一页返回的游标（最后一个节点的名称）
+            limit: 每页最大节点数
+            timeout: 等待初始扫描完成的超时时间（秒），None 表示使用默认超时
+
+        Returns:
+            (节点列表, 下一页游标)，没有更多数据时游标为 None
+
+        Raises:
+            NotFoundException: 目录不存在或已被排除时
+        """
+        self._ensure_ready(vault_path, timeout)
+        rel = path.strip('/')
+
+        with self._lock:
+            if rel not in self._dirs:
+                raise NotFoundException(f"目录不存在: {path}")
+
+            items = self._children(rel)
+            start = 0
+            if cursor:
+                start = bisect.bisect_right(items, _sort_key(cursor), key=lambda item: _sort_key(item[0]))
+
+            page = items[start:start + limit]
+            next_cursor = page[-1][0] if page and start + limit < len(items) else None
+            nodes = [self._make_node(_join(rel, name), name, is_dir, depth) for name, is_dir in page]
+
+        return nodes, next_cursor
+
+    def _make_node(self, rel: str, name: str, is_dir: bool, depth: int) -> FileTreeNode:
+        """构建分层加载模式的节点，超过展开层数的目录只返回 has_children 标记"""
+        if not is_dir:
+            return FileTreeNode(key=rel, title=name, is_leaf=True, has_children=False)
+
+        children = None
+        if depth > 1:
+            children = [
+                self._make_node(_join(rel, child), child, child_is_dir, depth - 1)
+                for child, child_is_dir in self._children(rel)
+            ]
+        return FileTreeNode(key=rel, title=name, is_leaf=False, children=children, has_children=True)
+
+    def _children(self, rel: str) -> list[tuple[str, bool]]:
+        """获取目录下排序后的可见子项 (名称, 是否目录)，结果按目录缓存"""
+        cached = self._children_cache.get(rel)
+        if cached is not None:
+            return cached
+
+        state = self._dirs.get(rel)
+        if state is None:
+            return []
+
+        items = [(name, False) for name in state.files]
+        # 只保留非空目录（与完整文件树保持一致）
+        items += [(name, True) for name in state.dirs if self._children(_join(rel, name))]
+        items.sort(key=lambda item: _sort_key(item[0]))
+
+        self._children_cache[rel] = items
+        return items
+
+    def _build_nodes(self, rel: str) -> list[FileTreeNode]:
+        """构建目录的子节点列表，未变化的目录直接复用缓存"""
+        cached = self._node_cache.get(rel)
+        if cached is not None:
+            return cached
+
+        nodes = []
+        for name, is_dir in self._children(rel):
+            child_rel = _join(rel, name)
+            if is_dir:
+                nodes.append(FileTreeNode(key=child_rel, title=name, is_leaf=False, children=self._build_nodes(child_rel)))
+            else:
+                nodes.append(FileTreeNode(key=child_rel, title=name, is_leaf=True, children=None))
+
+        self._node_cache[rel] = nodes
+        return nodes
+
+    # ==================== 增量更新 ====================
+
+    def notify_path_changed(self, relative_path: str) -> None:
+        """
+        通知索引某个文件已变更（用于应用自身的写入，无需等待监听事件）
+
+        Args:
+            relative_path: 相对于知识库根目录的路径（使用 / 分隔）
+        """
+        if self.root is None:
+            return
+        self.file_modified(str(self.root / relative_path))
+        self.refresh_path(str(self.root / relative_path))
+
+    def refresh_path(self, path: str) -> None:
+        """
+        根据变更路径重新同步其所在目录
+
+        Args:
+            path: 发生变化的绝对路径
+        """
+        rel = self._to_relative(path, require_ready=False)
+        if rel is None:
+            return
+
+        with self._lock:
+            if not self._ready.is_set():
+                # 初始扫描尚未发布，记下目录待发布后同步
+                self._pending_dirs.add(_parent_of(rel))
+                return
+
+        self._resync_dir(_parent_of(rel))
+        self._flush_changes()
+
+    def file_modified(self, path: str) -> None:
+        """
+        通知文件内容发生变化（不影响文件树结构）
+
+        Args:
+            path: 发生变化的绝对路径
+        """
+        rel = self._to_relative(path)
+        if rel is None or is_excluded(rel.rpartition('/')[2], False):
+            return
+
+        with self._lock:
+            self._changed_files.add(rel)
+        self._flush_changes()
+
+    def _to_relative(self, path: str, require_ready: bool = True) -> str | None:
+        """将绝对路径转换为索引内的相对路径，索引未就绪（require_ready 时）或路径被排除时返回 None"""
+        root = self.root
+        if root is None or (require_ready and not self._ready.is_set()):
+            return None
+
+        try:
+            rel = Path(os.path.relpath(path, root)).as_posix()
+        except ValueError:
+            return None
+        if rel == '.' or rel.startswith('..'):
+            return None
+
+        # 排除目录内的变化（如 .obsidian、.git）不影响文件树
+        parts = rel.split('/')
+        if any(is_excluded(part, True) for part in parts[:-1]):
+            return None
+
+        return rel
+
+    def _flush_changes(self) -> None:
+        """在锁外通知文件变更监听器"""
+        with self._lock:
+            if not self._changed_files and not self._removed_files:
+                return
+            changed = sorted(self._changed_files)
+            removed = sorted(self._removed_files - self._changed_files)
+            self._changed_files.clear()
+            self._removed_files.clear()
+
+        for listener in self._file_listeners:
+            try:
+                listener(changed, removed)
+            except Exception as e:
+                logger.warning(f"文件变更监听器执行失败: {e}")
+
+    def _resync_dir(self, rel: str) -> None:
+        """
+        将单个目录与磁盘状态同步
+
+        读取目录与扫描新增子目录都在锁外进行，只在写入索引时加锁；
+        读取期间目录已被其他线程同步时按最新状态重试
+        """
+        while True:
+            with self._lock:
+                root, stop_event = self.root, self._stop_event
+                if root is None:
+                    return
+                # 父目录尚未索引时，向上找到已索引的祖先目录
+                while rel and rel not in self._dirs:
+                    rel = _parent_of(rel)
+                old_state = self._dirs.get(rel)
+
+            new_state = self._read_dir(rel, root)
+            subtrees: dict[str, _DirState] = {}
+            if new_state is not None:
+                added_dirs = new_state.dirs - old_state.dirs if old_state is not None else new_state.dirs
+                for name in added_dirs:
+                    scanned = self._walk(root, stop_event, _join(rel, name))
+                    if scanned is None:
+                        return
+                    subtrees.update(scanned)
+
+            with self._lock:
+                if self.root != root:
+                    return
+                if self._dirs.get(rel) is not old_state:
+                    continue
+
+                if new_state is None:
+                    # 目录已被删除，继续同步其父目录
+                    self._drop_subtree(rel)
+                    if not rel:
+                        return
+                    rel = _parent_of(rel)
+                    continue
+
+                if old_state is not None:
+                    for name in old_state.dirs - new_state.dirs:
+                        self._drop_subtree(_join(rel, name))
+                    added_files = new_state.files - old_state.files
+                    self._removed_files.update(_join(rel, name) for name in old_state.files - new_state.files)
+                    changed = old_state.dirs != new_state.dirs or old_state.files != new_state.files
+                else:
+                    added_files = new_state.files
+                    changed = True
+
+                self._dirs[rel] = new_state
+                self._changed_files.update(_join(rel, name) for name in added_files)
+                # 新增子目录中的文件全部记为新增
+                for sub_rel, state in subtrees.items():
+                    self._dirs[sub_rel] = state
+                    self._changed_files.update(_join(sub_rel, name) for name in state.files)
+
+                if changed:
+                    self._invalidate(rel)
+                    self.generation += 1
+                return
+
+    def _read_dir(self, rel: str, root: Path | None = None) -> _DirState | None:
+        """读取单层目录内容（默认相对于当前索引根目录），目录不存在时返回 None"""
+        root = root or self.root
+        path = root / rel if rel else root
+        dirs: set[str] = set()
+        files: set[str] = set()
+
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                        is_file = not is_dir and entry.is_file()
+                    except OSError:
+                        continue
+                    if is_excluded(entry.name, is_dir):
+                        continue
+                    if is_dir:
+                        dirs.add(entry.name)
+                    elif is_file:
+                        files.add(entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        except PermissionError:
+            # 跳过无权限访问的目录
+            return _DirState(0, set(), set())
+
+        return _DirState(mtime_ns, dirs, files)
+
+    def _drop_subtree(self, rel: str) -> None:
+        """从索引中移除目录及其所有子目录"""
+        prefix = f"{rel}/"
+        for key in [k for k in self._dirs if k == rel or k.startswith(prefix)]:
+            self._removed_files.update(_join(key, name) for name in self._dirs[key].files)
+            del self._dirs[key]
+            self._node_cache.pop(key, None)
+            self._children_cache.pop(key, None)
+        self._invalidate(_parent_of(rel) if rel else '')
+
+    def _invalidate(self, rel: str) -> None:
+        """使目录及其所有祖先目录的节点缓存失效"""
+        while True:
+            self._node_cache.pop(rel, None)
+            self._children_cache.pop(rel, None)
+            if not rel:
+                break
+            rel = _parent_of(rel)
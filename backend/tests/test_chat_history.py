@@ -0,0 +1,207 @@
+"""
+只追加 jsonl 会话历史（FileChatMessageHistory）的存储测试
+"""
+import os
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from backend.ai_engine.memory import chat_history
+from backend.ai_engine.memory.chat_history import FileChatMessageHistory
+from backend.ai_engine.memory.session_cache import SessionCache
+
+
+def make_history(tmp_path, cache: SessionCache | None = None, **kwargs) -> FileChatMessageHistory:
+    return FileChatMessageHistory(
+        "session",
+        base_dir=tmp_path / "sessions",
+        fsync=False,
+        cache=cache,
+        rollup_queue=None,
+        archive_dir=tmp_path / "archive",
+        **kwargs
+    )
+
+
+def turn(index: int) -> list:
+    return [HumanMessage(content=f"问题 {index}"), AIMessage(content=f"回答 {index}")]
+
+
+def contents(messages) -> list[str]:
+    return [message.content for message in messages]
+
+
+# ==================== 读取 ====================
+
+def test_torn_last_line_is_ignored_and_isolated(tmp_path):
+    history = make_history(tmp_path)
+    history.add_messages(turn(0))
+    session_path = history._get_session_path()
+
+    # 模拟写入中途崩溃：最后一行只有半条记录且没有换行
+    with open(session_path, "ab") as f:
+        f.write(b'{"type": "message", "message": {"type": "hu')
+
+    assert contents(make_history(tmp_path).messages) == ["问题 0", "回答 0"]
+
+    # 新记录另起一行，不会与半行粘连
+    history.add_messages(turn(1))
+    assert contents(make_history(tmp_path).messages) == ["问题 0", "回答 0", "问题 1", "回答 1"]
+
+
+def test_checkpoint_found_across_tail_blocks(tmp_path, monkeypatch):
+    # 块很小时 checkpoint 行会被块边界截断
+    monkeypatch.setattr(chat_history, "_TAIL_BLOCK_SIZE", 16)
+    history = make_history(tmp_path)
+    for index in range(3):
+        history.add_messages(turn(index))
+    dead = history._append(turn(2), "摘要", checkpoint=True)
+    history.add_messages(turn(3))
+
+    assert dead == 6
+    with open(history._get_session_path(), "rb") as f:
+        lines, offset = FileChatMessageHistory._read_tail(f)
+    assert offset > 0
+    assert lines[0].startswith(chat_history._CHECKPOINT_PREFIX)
+
+    summary, messages = make_history(tmp_path)._load()
+    assert summary == "摘要"
+    assert contents(messages) == ["问题 2", "回答 2", "问题 3", "回答 3"]
+
+
+# ==================== 压缩 ====================
+
+def test_compact_keeps_only_latest_checkpoint(tmp_path):
+    cache = SessionCache()
+    history = make_history(tmp_path, cache=cache)
+    for index in range(5):
+        history.add_messages(turn(index))
+    history._append(turn(4), "摘要", checkpoint=True)
+    session_path = history._get_session_path()
+    size = session_path.stat().st_size
+
+    assert history.compact()
+    assert session_path.stat().st_size < size
+    assert not history.compact()
+
+    # 压缩前后内容等价，缓存仍然命中且与磁盘一致
+    hits = cache.stats()["hits"]
+    assert history._load() == make_history(tmp_path)._load()
+    assert cache.stats()["hits"] == hits + 1
+
+
+def test_compaction_racing_with_append_loses_nothing(tmp_path):
+    cache = SessionCache()
+    writer = make_history(tmp_path, cache=cache)
+    compactor = make_history(tmp_path, cache=cache)
+    writer.add_messages(turn(0))
+    writer._append(turn(0), "摘要", checkpoint=True)
+
+    rounds = 200
+    errors: list[BaseException] = []
+    compacted: list[bool] = []
+    done = threading.Event()
+
+    def append() -> None:
+        try:
+            for index in range(1, rounds + 1):
+                writer.add_messages(turn(index))
+                if index % 20 == 0:
+                    # 写入新的 checkpoint，让压缩始终有失效记录可移除
+                    summary, messages = writer._load()
+                    writer._append(messages, summary, checkpoint=True)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def compact() -> None:
+        try:
+            while not done.is_set():
+                if compactor.compact():
+                    compacted.append(True)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append), threading.Thread(target=compact)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert not errors
+    assert compacted
+    expected = [text for index in range(rounds + 1) for text in (f"问题 {index}", f"回答 {index}")]
+    summary, messages = make_history(tmp_path)._load()
+    assert summary == "摘要"
+    assert contents(messages) == expected
+    # 缓存与磁盘一致
+    assert writer._load() == (summary, messages)
+    assert not list(writer._get_session_path().parent.glob(".*.tmp"))
+
+
+# ==================== 归档 ====================
+
+def test_reload_from_checkpoint_after_archive_and_promote(tmp_path):
+    history = make_history(tmp_path, cache=SessionCache())
+    for index in range(3):
+        history.add_messages(turn(index))
+    history._append(turn(2), "摘要", checkpoint=True)
+    history.add_messages(turn(3))
+    session_path = history._get_session_path()
+    archive_path = history._archive_path()
+
+    # 最近刚写入的会话不归档
+    assert history.archive(max_idle=3600) is None
+
+    old = session_path.stat().st_mtime - 7200
+    os.utime(session_path, (old, old))
+    result = history.archive(max_idle=3600)
+
+    assert result is not None
+    assert not session_path.exists()
+    assert archive_path.exists()
+
+    # 解压恢复后从 checkpoint 重新读取
+    summary, messages = make_history(tmp_path)._load()
+    assert summary == "摘要"
+    assert contents(messages) == ["问题 2", "回答 2", "问题 3", "回答 3"]
+    assert session_path.exists()
+    assert not archive_path.exists()
+
+
+def test_append_to_archived_session_promotes_first(tmp_path):
+    history = make_history(tmp_path)
+    history.add_messages(turn(0))
+    history._append(turn(0), "摘要", checkpoint=True)
+    session_path = history._get_session_path()
+    old = session_path.stat().st_mtime - 7200
+    os.utime(session_path, (old, old))
+    assert history.archive(max_idle=3600) is not None
+
+    history.add_messages(turn(1))
+
+    summary, messages = make_history(tmp_path)._load()
+    assert summary == "摘要"
+    assert contents(messages) == ["问题 0", "回答 0", "问题 1", "回答 1"]
+    assert not history._archive_path().exists()
+
+
+def test_promote_without_archive(tmp_path):
+    history = make_history(tmp_path)
+    assert not history._promote()
+    assert history._load() == (None, [])
+
+
+def test_clear_removes_archive(tmp_path):
+    history = make_history(tmp_path)
+    history.add_messages(turn(0))
+    session_path = history._get_session_path()
+    old = session_path.stat().st_mtime - 7200
+    os.utime(session_path, (old, old))
+    assert history.archive(max_idle=3600) is not None
+
+    history.clear()
+
+    assert not history._archive_path().exists()
+    assert make_history(tmp_path)._load() == (None, [])
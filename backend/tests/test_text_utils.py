@@ -0,0 +1,117 @@
+"""
+局部更新（PATCH /knowledge/file）的编辑应用测试
+"""
+import pytest
+
+from backend.core import ValidationException
+from backend.utils import knowledge_utils
+from backend.utils.knowledge_utils import file_fingerprint, patch_file
+from backend.utils.text_utils import apply_edits, utf16_to_codepoint_offsets
+
+
+# ==================== UTF-16 偏移 ====================
+
+def test_utf16_offsets_without_astral_chars_are_unchanged():
+    assert utf16_to_codepoint_offsets("abc", [0, 2, 3]) == {0: 0, 2: 2, 3: 3}
+
+
+def test_utf16_offsets_skip_surrogate_pairs():
+    # 😀 在 UTF-16 中占 2 个码元，在码点中占 1 个
+    text = "a😀b😀c"
+    assert utf16_to_codepoint_offsets(text, [0, 1, 3, 4, 6, 7]) == {0: 0, 1: 1, 3: 2, 4: 3, 6: 4, 7: 5}
+
+
+def test_utf16_offset_inside_surrogate_pair_rejected():
+    with pytest.raises(ValueError):
+        utf16_to_codepoint_offsets("a😀b", [2])
+
+
+def test_apply_edits_with_utf16_offsets():
+    text = "😀hello😀world"
+    # 替换 UTF-16 区间 [2, 7) 即 "hello"
+    assert apply_edits(text, [(2, 7, "HI")], utf16=True) == "😀HI😀world"
+    # 同一区间按码点计算时偏移不同
+    assert apply_edits(text, [(1, 6, "HI")]) == "😀HI😀world"
+
+
+def test_apply_edits_utf16_offset_at_end_of_text():
+    text = "x😀"
+    assert apply_edits(text, [(3, 3, "!")], utf16=True) == "x😀!"
+
+
+# ==================== 区间校验 ====================
+
+def test_apply_edits_multiple_edits_relative_to_original():
+    assert apply_edits("abcdef", [(4, 6, "XY"), (0, 1, "")]) == "bcdXY"
+
+
+def test_apply_edits_inserts_at_same_position_keep_order():
+    assert apply_edits("ab", [(1, 1, "1"), (1, 1, "2")]) == "a12b"
+
+
+@pytest.mark.parametrize("edits", [
+    [(0, 3, "x"), (2, 4, "y")],
+    [(1, 4, "x"), (2, 3, "y")],
+])
+def test_apply_edits_overlapping_rejected(edits):
+    with pytest.raises(ValueError):
+        apply_edits("abcdef", edits)
+
+
+@pytest.mark.parametrize("edits", [
+    [(0, 7, "x")],
+    [(3, 2, "x")],
+    [(7, 7, "x")],
+])
+def test_apply_edits_out_of_range_rejected(edits):
+    with pytest.raises(ValueError):
+        apply_edits("abcdef", edits)
+
+
+def test_apply_edits_by_line():
+    text = "one\ntwo\nthree"
+    assert apply_edits(text, [(1, 2, "TWO\n")], by_line=True) == "one\nTWO\nthree"
+    # 最后一行之后的行号可用于追加
+    assert apply_edits(text, [(3, 3, "\nfour")], by_line=True) == "one\ntwo\nthree\nfour"
+    with pytest.raises(ValueError):
+        apply_edits(text, [(0, 5, "")], by_line=True)
+
+
+# ==================== CRLF 文件 ====================
+
+@pytest.fixture
+def vault(tmp_path, monkeypatch):
+    monkeypatch.setattr(knowledge_utils, "get_vault_path", lambda: tmp_path)
+    return tmp_path
+
+
+def test_patch_crlf_file_uses_normalised_offsets(vault):
+    note = vault / "note.md"
+    note.write_bytes(b"line one\r\nline two\r\nline three\r\n")
+    version = file_fingerprint(note.stat())
+
+    # 偏移基于换行符统一为 \n 后的内容："line two" 位于 [9, 17)
+    result = patch_file("note.md", version, [(9, 17, "second\nline")])
+
+    assert note.read_bytes() == b"line one\r\nsecond\r\nline\r\nline three\r\n"
+    assert result.version == file_fingerprint(note.stat())
+
+
+def test_patch_crlf_file_by_line(vault):
+    note = vault / "note.md"
+    note.write_bytes(b"a\r\nb\r\nc\r\n")
+
+    patch_file("note.md", file_fingerprint(note.stat()), [(1, 2, "B\r\n")], by_line=True)
+
+    assert note.read_bytes() == b"a\r\nB\r\nc\r\n"
+
+
+def test_patch_rejects_invalid_edits_without_writing(vault):
+    note = vault / "note.md"
+    note.write_bytes(b"abc\r\n")
+    before = note.read_bytes()
+
+    with pytest.raises(ValidationException):
+        patch_file("note.md", file_fingerprint(note.stat()), [(0, 2, "x"), (1, 3, "y")])
+
+    assert note.read_bytes() == before
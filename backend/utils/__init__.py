@@ -1,14 +1,23 @@
 """
 工具模块 - 提供各种工具函数
 """
-from .stream_utils import create_json_stream
+from .stream_utils import create_json_stream, stream_activity
+from .content_cache import content_cache
 from .knowledge_utils import (
     read_file as read_knowledge_file,
-    write_file
+    write_file,
+    aread_file as aread_knowledge_file,
+    awrite_file,
+    apatch_file
 )
 
 __all__ = [
     "create_json_stream",
+    "stream_activity",
+    "content_cache",
     "read_knowledge_file",
-    "write_file"
+    "write_file",
+    "aread_knowledge_file",
+    "awrite_file",
+    "apatch_file"
 ]
\ No newline at end of file
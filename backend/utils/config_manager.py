@@ -3,10 +3,16 @@
 负责配置文件的读取、写入和验证
 """
 import json
+import os
+import tempfile
+import threading
 from pathlib import Path
+from typing import Literal
+
 from pydantic import BaseModel, ValidationError
 
 from ..core.exceptions import ConfigError
+from ..core.io_executor import run_io
 
 
 class ConfigModel(BaseModel):
@@ -16,6 +22,20 @@ class ConfigModel(BaseModel):
     model_name: str
     prompts: dict[str, dict[str, str]] = {}  # 提示词配置 {task_type: {system, human}}
 
+    # 高级配置（界面不提供编辑，保存配置时保留原值）
+    io_max_workers: int = 8  # I/O 线程池大小
+    advise_retrieval: bool = True  # AI 建议对长笔记只发送大纲与相关片段
+    advise_context_tokens: int = 3000  # AI 建议放入提示词的笔记内容 token 预算
+    advise_full_note_tokens: int = 2000  # 笔记不超过该长度时始终发送全文
+    advise_top_k: int = 8  # AI 建议最多选取的片段数
+    history_backend: Literal["jsonl", "sqlite"] = "jsonl"  # 会话历史存储：每会话一个 JSONL 文件或单个 SQLite 数据库
+    history_token_budgets: dict[str, int] = {"advise": 3000, "edit": 6000}  # 各任务放入提示词的历史（摘要 + 消息）token 预算
+    history_archive_days: int = 30  # 会话闲置超过该天数后压缩归档，下次访问时自动恢复（0 表示不归档）
+
+
+# 界面可编辑的配置字段，其余字段在写入配置时沿用已有值
+EDITABLE_FIELDS = {"obsidian_vault_path", "api_key", "model_name", "prompts"}
+
 
 class ConfigManager:
     """配置管理器"""
@@ -26,6 +46,11 @@ class ConfigManager:
     def __init__(self):
         self.config_dir = Path.home() / self.CONFIG_DIR_NAME
         self.config_file = self.config_dir / self.CONFIG_FILE_NAME
+
+        # 已校验的配置快照及其对应的文件版本 (mtime_ns, size, inode)
+        self._snapshot: ConfigModel | None = None
+        self._snapshot_version: tuple[int, int, int] | None = None
+        self._lock = threading.Lock()
     
     def _ensure_config_dir(self) -> None:
         """确保配置目录存在"""
@@ -34,7 +59,10 @@ class ConfigManager:
     
     def read_config(self) -> ConfigModel | None:
         """
-        读取配置文件
+        读取配置（优先返回内存快照）
+
+        每次调用只 stat 一次配置文件，文件未变化时直接返回已校验的快照，
+        文件被修改（包括外部编辑）后才重新解析。返回的对象被多处共享，调用方不应修改
 
         Returns:
             ConfigModel: 配置对象，如果文件不存在则返回 None
@@ -42,9 +70,29 @@ class ConfigManager:
         Raises:
             ConfigError: 文件读取失败或配置格式错误时抛出
         """
-        if not self.config_file.exists():
+        try:
+            file_stat = self.config_file.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._snapshot = None
+                self._snapshot_version = None
             return None
+        except OSError as e:
+            raise ConfigError(f"读取配置文件失败: {e}")
+
+        version = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+        with self._lock:
+            if self._snapshot is not None and self._snapshot_version == version:
+                return self._snapshot
 
+        config = self._load_config()
+        with self._lock:
+            self._snapshot = config
+            self._snapshot_version = version
+        return config
+
+    def _load_config(self) -> ConfigModel:
+        """解析并校验配置文件"""
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -55,6 +103,15 @@ class ConfigManager:
             raise ConfigError(f"配置数据验证失败: {e}")
         except Exception as e:
             raise ConfigError(f"读取配置文件失败: {e}")
+
+    async def aread_config(self) -> ConfigModel | None:
+        """
+        异步读取配置文件（在 I/O 线程池中执行）
+
+        Returns:
+            ConfigModel: 配置对象，如果文件不存在则返回 None
+        """
+        return await run_io(self.read_config)
     
     def write_config(self, obsidian_vault_path: str, api_key: str, model_name: str, prompts: dict[str, dict[str, str]] | None = None) -> ConfigModel:
         """
@@ -74,12 +131,19 @@ class ConfigManager:
         """
         self._ensure_config_dir()
 
+        # 沿用已有的高级配置
+        try:
+            existing = self.read_config()
+        except ConfigError:
+            existing = None
+
         try:
-            config_data = {
+            config_data = existing.model_dump(exclude=EDITABLE_FIELDS) if existing else {}
+            config_data.update({
                 "obsidian_vault_path": obsidian_vault_path,
                 "api_key": api_key,
                 "model_name": model_name
-            }
+            })
             if prompts:
                 config_data["prompts"] = prompts
             config = ConfigModel(**config_data)
@@ -87,12 +151,33 @@ class ConfigManager:
             raise ConfigError(f"配置数据验证失败: {e}")
 
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config.model_dump(), f, ensure_ascii=False, indent=2)
+            file_stat = self._atomic_write(config)
         except Exception as e:
             raise ConfigError(f"写入配置文件失败: {e}")
 
+        # 直接以写入的配置更新快照，无需再次解析
+        with self._lock:
+            self._snapshot = config
+            self._snapshot_version = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
         return config
+
+    def _atomic_write(self, config: ConfigModel) -> os.stat_result:
+        """写入临时文件后原子替换配置文件，读取方不会看到写了一半的内容"""
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.CONFIG_FILE_NAME}.", suffix=".tmp", dir=self.config_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config.model_dump(), f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, self.config_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+        return self.config_file.stat()
     
     def delete_config(self) -> bool:
         """
@@ -109,10 +194,14 @@ class ConfigManager:
 
         try:
             self.config_file.unlink()
-            return True
         except Exception as e:
             raise ConfigError(f"删除配置文件失败: {e}")
 
+        with self._lock:
+            self._snapshot = None
+            self._snapshot_version = None
+        return True
+
 
 # 全局配置管理器实例
 config_manager = ConfigManager()
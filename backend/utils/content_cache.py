@@ -0,0 +1,249 @@
+"""
+笔记内容缓存模块
+按文件路径缓存已解码的笔记内容与探测到的文件编码，以 (mtime_ns, size) 校验有效性
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class _CacheEntry:
+    """缓存条目"""
+    __slots__ = ('mtime_ns', 'size', 'content', 'nbytes', 'accessed')
+
+    def __init__(self, mtime_ns: int, size: int, content: str):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content = content
+        self.nbytes = sys.getsizeof(content)
+        self.accessed = time.monotonic()
+
+
+class ContentCache:
+    """按字节数限制容量的 LRU 内容缓存（线程安全）"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 4096):
+        """
+        初始化内容缓存
+
+        Args:
+            max_bytes: 缓存内容占用的最大内存（字节）
+            max_entries: 最大缓存条目数
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, mtime_ns: int, size: int) -> str | None:
+        """
+        获取缓存内容，文件版本不一致时视为未命中并移除旧条目
+
+        Args:
+            key: 缓存键（文件路径）
+            mtime_ns: 文件当前修改时间（纳秒）
+            size: 文件当前大小
+
+        Returns:
+            缓存的内容，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.mtime_ns != mtime_ns or entry.size != size:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry.accessed = time.monotonic()
+            self.hits += 1
+            return entry.content
+
+    def put(self, key: str, mtime_ns: int, size: int, content: str) -> None:
+        """
+        写入缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键（文件路径）
+            mtime_ns: 文件修改时间（纳秒）
+            size: 文件大小
+            content: 已解码的文件内容
+        """
+        entry = _CacheEntry(mtime_ns, size, content)
+        # 单个条目超过总容量时不缓存
+        if entry.nbytes > self.max_bytes:
+            self.invalidate(key)
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """
+        移除指定缓存条目
+
+        Args:
+            key: 缓存键（文件路径）
+        """
+        with self._lock:
+            self._remove(key)
+
+    def trim(self, max_idle: float) -> int:
+        """
+        移除超过指定时长未访问的条目
+
+        Args:
+            max_idle: 最长空闲时间（秒）
+
+        Returns:
+            移除的条目数
+        """
+        cutoff = time.monotonic() - max_idle
+        removed = 0
+        with self._lock:
+            # 条目按访问顺序排列，遇到第一个未过期的条目即可停止
+            while self._entries:
+                key = next(iter(self._entries))
+                if self._entries[key].accessed >= cutoff:
+                    break
+                self._remove(key)
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含命中、未命中、淘汰次数及容量占用的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remove(self, key: str) -> None:
+        """移除条目（调用方需持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+
+class EncodingCache:
+    """
+    文件编码缓存（线程安全）
+
+    条目很小，容量远大于内容缓存：内容被淘汰后再次读取仍可直接按已知编码解码
+    """
+
+    def __init__(self, max_entries: int = 65536):
+        """
+        初始化编码缓存
+
+        Args:
+            max_entries: 最大缓存条目数
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, mtime_ns: int, size: int) -> str | None:
+        """
+        获取文件编码，文件版本不一致时视为未命中
+
+        Args:
+            key: 缓存键（文件路径）
+            mtime_ns: 文件当前修改时间（纳秒）
+            size: 文件当前大小
+
+        Returns:
+            编码名称，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != mtime_ns or entry[1] != size:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: str, mtime_ns: int, size: int, encoding: str) -> None:
+        """
+        记录文件编码
+
+        Args:
+            key: 缓存键（文件路径）
+            mtime_ns: 文件修改时间（纳秒）
+            size: 文件大小
+            encoding: 编码名称
+        """
+        with self._lock:
+            self._entries[key] = (mtime_ns, size, encoding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含条目数、命中与未命中次数的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# 全局内容缓存实例（知识库路由与 AI 服务共用）
+content_cache = ContentCache()
+
+# 全局编码缓存实例
+encoding_cache = EncodingCache()
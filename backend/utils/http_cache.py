@@ -0,0 +1,150 @@
+"""
+HTTP 条件请求工具函数
+提供 ETag / Last-Modified 的生成、If-None-Match / If-Match / If-Range 的匹配与 Range 请求头解析
+"""
+from email.utils import formatdate
+
+
+def make_etag(fingerprint: str) -> str:
+    """
+    将版本指纹包装为强 ETag
+
+    Args:
+        fingerprint: 版本指纹
+
+    Returns:
+        带引号的 ETag 字符串
+    """
+    return f'"{fingerprint}"'
+
+
+def format_http_date(timestamp: float) -> str:
+    """
+    格式化 HTTP 日期（用于 Last-Modified）
+
+    Args:
+        timestamp: Unix 时间戳（秒）
+
+    Returns:
+        RFC 7231 格式的日期字符串
+    """
+    return formatdate(timestamp, usegmt=True)
+
+
+def _parse_etags(header_value: str) -> list[str]:
+    """解析逗号分隔的 ETag 列表"""
+    return [tag.strip() for tag in header_value.split(',') if tag.strip()]
+
+
+def if_none_match(header_value: str | None, etag: str) -> bool:
+    """
+    判断 If-None-Match 是否命中（命中时应返回 304）
+
+    使用弱比较：忽略 W/ 前缀
+
+    Args:
+        header_value: If-None-Match 请求头
+        etag: 当前资源的 ETag
+
+    Returns:
+        True 表示客户端缓存仍然有效
+    """
+    if not header_value:
+        return False
+
+    tags = _parse_etags(header_value)
+    if '*' in tags:
+        return True
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def if_match(header_value: str | None, etag: str | None) -> bool:
+    """
+    判断 If-Match 前置条件是否满足
+
+    使用强比较：弱 ETag 永远不匹配
+
+    Args:
+        header_value: If-Match 请求头，为空时视为满足
+        etag: 当前资源的 ETag，资源不存在时为 None
+
+    Returns:
+        True 表示允许继续写入
+    """
+    if not header_value:
+        return True
+    if etag is None:
+        return False
+
+    tags = _parse_etags(header_value)
+    if '*' in tags:
+        return True
+    return etag in tags
+
+
+def if_range(header_value: str | None, etag: str, last_modified: str) -> bool:
+    """
+    判断 If-Range 前置条件是否满足（不满足时应忽略 Range 返回完整内容）
+
+    Args:
+        header_value: If-Range 请求头，为空时视为满足
+        etag: 当前资源的 ETag
+        last_modified: 当前资源的 Last-Modified（HTTP 日期格式）
+
+    Returns:
+        True 表示可以按 Range 返回部分内容
+    """
+    if not header_value:
+        return True
+
+    value = header_value.strip()
+    if value.startswith('"') or value.startswith('W/'):
+        # ETag 形式使用强比较
+        return value == etag
+    return value == last_modified
+
+
+def parse_range(header_value: str, size: int) -> tuple[int, int] | None:
+    """
+    解析单段 Range 请求头
+
+    仅支持 bytes 单位的单个区间，多区间或格式无法识别时返回 None（按完整内容响应）
+
+    Args:
+        header_value: Range 请求头，如 bytes=0-1023、bytes=1024-、bytes=-512
+        size: 资源总字节数
+
+    Returns:
+        闭区间 (start, end)
+
+    Raises:
+        ValueError: 区间无法满足时（应返回 416）
+    """
+    unit, _, spec = header_value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    first, last = first.strip(), last.strip()
+    if not sep or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        # 后缀区间：最后 N 个字节
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("区间长度为 0")
+        start = max(size - suffix, 0)
+        end = size - 1
+
+    if start >= size:
+        raise ValueError("区间超出文件范围")
+
+    return start, min(end, size - 1)
@@ -2,14 +2,85 @@
 知识库文件操作工具函数
 提供对Obsidian Vault知识库的文件操作
 """
+import asyncio
+import codecs
+import os
+import shutil
+import stat
+import tempfile
+import threading
 from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable
+
 from .config_manager import config_manager
-from ..core.exceptions import NotFoundException, ValidationException
+from .content_cache import content_cache, encoding_cache
+from .http_cache import make_etag, if_match as etag_matches
+from .text_utils import detect_encoding, decode_text, detect_newline, normalize_newlines, apply_edits
+from ..core.exceptions import (
+    BaseBusinessException, NotFoundException, ValidationException, ConflictException, PreconditionFailedException
+)
 from ..schemas.responses import FileReadResult, FileWriteResult, FileTreeNode
+from ..core.logger import get_logger
+from ..core.io_executor import io_executor, run_io
+
+logger = get_logger(__name__)
+
+
+# 排除的目录和文件
+EXCLUDE_DIRS = {'.obsidian', '.git', '.myapp', 'node_modules', '__pycache__', '.venv'}
+EXCLUDE_FILES = {'.DS_Store'}
 
+# 原始文件探测编码时读取的采样字节数
+ENCODING_SAMPLE_SIZE = 64 * 1024
 
+# 文件写入监听器（写入成功后以相对路径回调）
+_write_listeners: list[Callable[[str], None]] = []
 
-def _get_vault_path() -> Path:
+# 串行化应用内的文件写入，保证局部更新的“校验版本 - 写入”不被并发写入打断
+_write_lock = threading.RLock()
+
+
+def is_excluded(name: str, is_dir: bool) -> bool:
+    """
+    判断目录项是否应从文件树中排除
+
+    Args:
+        name: 文件或目录名
+        is_dir: 是否为目录
+
+    Returns:
+        True 表示应跳过
+    """
+    # 跳过排除的目录
+    if is_dir and name in EXCLUDE_DIRS:
+        return True
+    # 跳过其他隐藏文件和排除的文件
+    if name.startswith('.') and name not in EXCLUDE_DIRS:
+        return True
+    return name in EXCLUDE_FILES
+
+
+def register_write_listener(listener: Callable[[str], None]) -> None:
+    """
+    注册文件写入监听器
+
+    Args:
+        listener: 监听器函数，接收写入文件的相对路径（使用 / 分隔）
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify_write_listeners(relative_path: str) -> None:
+    """通知所有写入监听器，单个监听器失败不影响写入结果"""
+    for listener in _write_listeners:
+        try:
+            listener(relative_path)
+        except Exception as e:
+            logger.warning(f"写入监听器执行失败: {e}")
+
+
+def get_vault_path() -> Path:
     """
     获取知识库路径
 
@@ -23,11 +94,14 @@ def _get_vault_path() -> Path:
     if not config:
         raise NotFoundException("请先配置 Obsidian Vault 路径")
 
+    # 单次 stat 同时校验存在性与类型
     vault_path = Path(config.obsidian_vault_path)
-    if not vault_path.exists():
+    try:
+        vault_stat = vault_path.stat()
+    except OSError:
         raise NotFoundException(f"知识库路径不存在: {config.obsidian_vault_path}")
 
-    if not vault_path.is_dir():
+    if not stat.S_ISDIR(vault_stat.st_mode):
         raise ValidationException(f"知识库路径不是目录: {config.obsidian_vault_path}")
 
     return vault_path
@@ -50,20 +124,10 @@ def build_file_tree(root_path: Path, relative_path: Path | None = None) -> list[
     current_path = root_path / relative_path
     nodes = []
 
-    # 排除的目录和文件
-    exclude_dirs = {'.obsidian', '.git', '.myapp', 'node_modules', '__pycache__', '.venv'}
-    exclude_files = {'.DS_Store'}
-
     try:
         # 遍历当前目录
         for item in sorted(current_path.iterdir()):
-            # 跳过排除的目录
-            if item.is_dir() and item.name in exclude_dirs:
-                continue
-            # 跳过其他隐藏文件和排除的文件
-            if item.name.startswith('.') and item.name not in exclude_dirs:
-                continue
-            if item.name in exclude_files:
+            if is_excluded(item.name, item.is_dir()):
                 continue
 
             rel_item_path = relative_path / item.name
@@ -103,84 +167,499 @@ def get_full_path(relative_path: str) -> Path:
     Returns:
         文件的完整路径
     """
-    vault_path = _get_vault_path()
+    vault_path = get_vault_path()
+    return _resolve_in_vault(vault_path, vault_path.resolve(), relative_path)
+
+
+def _resolve_in_vault(vault_path: Path, vault_root: Path, relative_path: str) -> Path:
+    """
+    拼接文件路径并校验其位于知识库目录内
+
+    Args:
+        vault_path: 知识库根目录
+        vault_root: 已 resolve 的知识库根目录（批量操作时只需解析一次）
+        relative_path: 相对于知识库根目录的文件路径
+
+    Returns:
+        文件的完整路径
+    """
     file_path = vault_path / relative_path
 
     # 安全检查：确保文件在知识库目录内
     try:
-        file_path.resolve().relative_to(vault_path.resolve())
+        file_path.resolve().relative_to(vault_root)
     except ValueError:
         raise ValidationException("无效的文件路径")
 
     return file_path
 
 
-def read_file(relative_path: str) -> FileReadResult:
+def get_file_stat(relative_path: str) -> os.stat_result:
     """
-    读取知识库文件内容
+    获取知识库文件的状态信息（不读取内容）
 
     Args:
         relative_path: 相对于知识库根目录的文件路径
 
     Returns:
-        包含文件信息的字典
+        文件的 stat 结果
 
     Raises:
         NotFoundException: 文件不存在时
         ValidationException: 文件路径无效时
     """
-    file_path = get_full_path(relative_path)
+    return _stat_regular_file(get_full_path(relative_path), relative_path)
 
-    if not file_path.exists():
+
+def _stat_regular_file(file_path: Path, relative_path: str) -> os.stat_result:
+    """stat 文件并校验其为普通文件"""
+    try:
+        file_stat = file_path.stat()
+    except FileNotFoundError:
         raise NotFoundException(f"文件不存在: {relative_path}")
 
-    if not file_path.is_file():
+    if not stat.S_ISREG(file_stat.st_mode):
         raise ValidationException("路径不是文件")
 
-    # 读取文件内容
+    return file_stat
+
+
+def file_fingerprint(file_stat: os.stat_result) -> str:
+    """
+    根据 (inode, mtime, size) 生成文件版本指纹
+
+    Args:
+        file_stat: 文件的 stat 结果
+
+    Returns:
+        版本指纹字符串
+    """
+    return f"{file_stat.st_ino:x}-{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+
+
+def read_text_file(file_path: Path) -> str:
+    """
+    读取文本文件内容（只读盘一次）
+
+    文件版本对应的编码已知时直接解码，否则探测编码（BOM / UTF-8 / GB18030）并记录
+
+    Args:
+        file_path: 文件完整路径
+
+    Returns:
+        解码后的文件内容，无法识别为文本时返回空字符串
+    """
+    return read_text_data(file_path)[1]
+
+
+def read_cached_text(file_path: Path) -> str:
+    """
+    读取文本文件内容（优先使用内容缓存，未命中时读盘并写入缓存）
+
+    Args:
+        file_path: 文件完整路径
+
+    Returns:
+        解码后的文件内容
+
+    Raises:
+        OSError: 文件不存在或无法读取时
+    """
+    file_stat = file_path.stat()
+    cache_key = str(file_path)
+    content = content_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+    if content is None:
+        content = read_text_file(file_path)
+        content_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, content)
+    return content
+
+
+def read_text_data(file_path: Path) -> tuple[bytes, str, str | None]:
+    """
+    读取文本文件的原始字节与解码结果（只读盘一次）
+
+    供需要同时使用字节内容的调用方（如计算内容哈希、字节偏移）使用
+
+    Args:
+        file_path: 文件完整路径
+
+    Returns:
+        (原始字节, 解码后的文件内容, 编码名称)，无法识别为文本时内容为空字符串、编码为 None；
+        内容的换行符统一为 \n，写回时沿用文件原有的换行符
+    """
+    with open(file_path, 'rb') as f:
+        file_stat = os.fstat(f.fileno())
+        data = f.read()
+
+    cache_key = str(file_path)
+    encoding = encoding_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+    if encoding is not None:
+        try:
+            return data, normalize_newlines(data.decode(encoding)), encoding
+        except UnicodeDecodeError:
+            pass
+
+    content, encoding = decode_text(data)
+    if encoding is not None:
+        encoding_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, encoding)
+    return data, content, encoding
+
+
+def get_file_encoding(file_path: Path) -> str | None:
+    """
+    获取文件当前的文本编码（优先使用编码缓存）
+
+    Args:
+        file_path: 文件完整路径
+
+    Returns:
+        编码名称，文件不存在或不是文本时返回 None
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        # 尝试其他编码
+        file_stat = file_path.stat()
+    except OSError:
+        return None
+
+    cache_key = str(file_path)
+    encoding = encoding_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+    if encoding is None:
         try:
-            with open(file_path, 'r', encoding='gbk') as f:
-                content = f.read()
-        except:
-            content = ""
+            encoding = detect_encoding(file_path.read_bytes())
+        except OSError:
+            return None
+        if encoding is not None:
+            encoding_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, encoding)
+    return encoding
+
+
+def open_raw_file(relative_path: str) -> tuple[BinaryIO, os.stat_result, str | None]:
+    """
+    以二进制方式打开知识库文件，用于流式传输
+
+    文件状态取自已打开的文件句柄，保证与后续读取的字节一致
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+
+    Returns:
+        (文件对象, stat 结果, 探测到的文本编码)，二进制文件的编码为 None；
+        调用方负责关闭文件对象
+
+    Raises:
+        NotFoundException: 文件不存在时
+        ValidationException: 文件路径无效时
+    """
+    file_path = get_full_path(relative_path)
+    _stat_regular_file(file_path, relative_path)
+
+    try:
+        file = open(file_path, 'rb')
+    except FileNotFoundError:
+        raise NotFoundException(f"文件不存在: {relative_path}")
+
+    try:
+        file_stat = os.fstat(file.fileno())
+        if not stat.S_ISREG(file_stat.st_mode):
+            raise ValidationException("路径不是文件")
+
+        encoding = encoding_cache.get(str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+        if encoding is None:
+            sample = file.read(ENCODING_SAMPLE_SIZE)
+            file.seek(0)
+            encoding = detect_encoding(sample, final=len(sample) >= file_stat.st_size)
+    except BaseException:
+        file.close()
+        raise
+
+    return file, file_stat, encoding
+
+
+def read_file(relative_path: str) -> FileReadResult:
+    """
+    读取知识库文件内容
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+
+    Returns:
+        包含文件信息的字典
+
+    Raises:
+        NotFoundException: 文件不存在时
+        ValidationException: 文件路径无效时
+    """
+    return _read_file_at(get_full_path(relative_path), relative_path)
+
+
+def _read_file_at(file_path: Path, relative_path: str) -> FileReadResult:
+    """读取已解析路径的知识库文件（优先使用内容缓存）"""
+    file_stat = _stat_regular_file(file_path, relative_path)
+
+    # 优先从内容缓存读取（文件版本变化时自动失效）
+    cache_key = str(file_path)
+    content = content_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+
+    if content is None:
+        content = read_text_file(file_path)
+        content_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, content)
 
     return FileReadResult(
         success=True,
         filename=file_path.name,
-        file_size=file_path.stat().st_size,
+        file_size=file_stat.st_size,
         file_path=relative_path.replace('\\', '/'),
         content=content,
     )
 
 
-def write_file(relative_path: str, content: str) -> FileWriteResult:
+def write_file(relative_path: str, content: str, expected_etag: str | None = None) -> FileWriteResult:
     """
     写入知识库文件内容
 
+    已有文件沿用其原编码（含 BOM），新文件使用 UTF-8；
+    携带 expected_etag（If-Match 请求头）时，在写锁内校验版本后再写入，校验与写入不会被并发写入打断
+
     Args:
         relative_path: 相对于知识库根目录的文件路径
         content: 文件内容
+        expected_etag: If-Match 请求头的值，为空时不校验
 
     Returns:
         包含写入结果的字典
+
+    Raises:
+        PreconditionFailedException: 文件当前版本与 expected_etag 不匹配时
     """
     file_path = get_full_path(relative_path)
 
     # 父目录不存在时创建
     _ = file_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # 写入文件内容
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    with _write_lock:
+        if expected_etag:
+            try:
+                current_etag = make_etag(file_fingerprint(file_path.stat()))
+            except FileNotFoundError:
+                current_etag = None
+            if not etag_matches(expected_etag, current_etag):
+                raise PreconditionFailedException("文件已被修改，请重新加载后再保存", error_code="VERSION_MISMATCH")
+
+        encoding = get_file_encoding(file_path) or 'utf-8'
+        file_stat = _store_file(file_path, relative_path, content, encoding)
+
+    return _write_result(file_path, relative_path, content, file_stat)
+
+
+def patch_file(
+    relative_path: str,
+    base_version: str,
+    edits: list[tuple[int, int, str]],
+    by_line: bool = False,
+    utf16: bool = False
+) -> FileWriteResult:
+    """
+    对知识库文件做局部更新
+
+    仅当文件当前版本与 base_version 一致时，在服务端应用编辑操作并原子写回；
+    区间相对于读取接口返回的内容（换行符已统一为 \n），写回时沿用文件原有的换行符
+
+    Args:
+        relative_path: 相对于知识库根目录的文件路径
+        base_version: 客户端编辑所基于的版本（ETag 或版本指纹）
+        edits: (start, end, replacement) 列表，区间相对于基准版本
+        by_line: 为 True 时区间为行号，否则为字符偏移
+        utf16: 字符偏移是否按 UTF-16 码元计算，否则按 Unicode 码点
+
+    Returns:
+        包含写入结果的字典
+
+    Raises:
+        NotFoundException: 文件不存在时
+        ValidationException: 文件不是文本或编辑区间无效时
+        ConflictException: 文件已被修改、基准版本不一致时
+    """
+    file_path = get_full_path(relative_path)
+    expected = base_version.strip().removeprefix('W/').strip('"')
+
+    with _write_lock:
+        file_stat = _stat_regular_file(file_path, relative_path)
+        if file_fingerprint(file_stat) != expected:
+            raise ConflictException("文件已被修改，请重新加载后再保存", error_code="VERSION_CONFLICT")
+
+        cache_key = str(file_path)
+        content = content_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+        if content is None:
+            content = read_text_file(file_path)
+            # 读取期间文件被外部修改时，内容已不对应基准版本
+            if file_fingerprint(file_path.stat()) != expected:
+                raise ConflictException("文件已被修改，请重新加载后再保存", error_code="VERSION_CONFLICT")
+
+        encoding = encoding_cache.get(cache_key, file_stat.st_mtime_ns, file_stat.st_size)
+        if encoding is None:
+            encoding = get_file_encoding(file_path)
+        if encoding is None:
+            raise ValidationException("文件不是文本文件，无法局部更新")
+
+        try:
+            edits = [(start, end, normalize_newlines(replacement)) for start, end, replacement in edits]
+            content = apply_edits(content, edits, by_line=by_line, utf16=utf16)
+        except ValueError as e:
+            raise ValidationException(str(e))
 
+        file_stat = _store_file(file_path, relative_path, content, encoding)
+
+    return _write_result(file_path, relative_path, content, file_stat)
+
+
+def _write_result(file_path: Path, relative_path: str, content: str, file_stat: os.stat_result) -> FileWriteResult:
+    """构建写入结果，版本指纹取自写锁内的 stat，不会混入之后其他写入的版本"""
     return FileWriteResult(
         success=True,
         filename=file_path.name,
         file_size=len(content),
         file_path=relative_path.replace('\\', '/'),
+        version=file_fingerprint(file_stat),
+        mtime=file_stat.st_mtime,
     )
+
+
+def _store_file(file_path: Path, relative_path: str, content: str, encoding: str) -> os.stat_result:
+    """
+    写入文件并刷新内容与编码缓存、通知写入监听器（调用方需持有写锁）
+
+    Returns:
+        写入后文件的 stat 结果
+    """
+    # 缓存与读取结果一致，换行符统一为 \n
+    content = normalize_newlines(content)
+    cache_key = str(file_path)
+    content_cache.invalidate(cache_key)
+    _atomic_write_text(file_path, content, encoding)
+
+    # 写入后直接缓存新内容与编码，后续 AI 请求无需再读盘
+    file_stat = file_path.stat()
+    content_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, content)
+    encoding_cache.put(cache_key, file_stat.st_mtime_ns, file_stat.st_size, encoding)
+
+    _notify_write_listeners(relative_path.replace('\\', '/'))
+    return file_stat
+
+
+def _file_newline(file_path: Path, encoding: str) -> str | None:
+    """探测已有文件的换行符（读取开头的采样），文件不存在时返回 None"""
+    try:
+        with open(file_path, 'rb') as f:
+            sample = f.read(ENCODING_SAMPLE_SIZE)
+    except FileNotFoundError:
+        return None
+    text = codecs.getincrementaldecoder(encoding)(errors='ignore').decode(sample)
+    return detect_newline(text)
+
+
+def _atomic_write_text(file_path: Path, content: str, encoding: str) -> None:
+    """
+    原子写入文本文件：先写同目录下的临时文件并落盘，再替换目标文件
+
+    content 的换行符为 \n，写入时转换为原文件的换行符（新文件使用系统默认），
+    读取后原样保存不会改变文件字节；
+    写入中途失败或进程崩溃时，原文件保持完整；替换后保留原文件权限
+    """
+    newline = _file_newline(file_path, encoding)
+    if newline is None:
+        # 新文件没有可破坏的旧内容，直接写入即可获得默认权限
+        with open(file_path, 'w', encoding=encoding) as f:
+            f.write(content)
+        return
+
+    # 符号链接替换其指向的文件，保留链接本身
+    target = Path(os.path.realpath(file_path))
+
+    # 临时文件以 . 开头，不会出现在文件树中
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline=newline) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.copymode(target, tmp_name)
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+async def aread_file(relative_path: str) -> FileReadResult:
+    """异步读取知识库文件内容（在 I/O 线程池中执行）"""
+    return await run_io(read_file, relative_path)
+
+
+async def aread_files(relative_paths: list[str]) -> AsyncIterator[tuple[int, FileReadResult | BaseBusinessException]]:
+    """
+    并发读取多个知识库文件
+
+    知识库路径只读取与解析一次；并发度为 I/O 线程池的一半，给其他请求留出线程
+
+    Args:
+        relative_paths: 相对于知识库根目录的文件路径列表
+
+    Yields:
+        (路径在列表中的下标, 读取结果或业务异常)，按完成顺序产出；
+        单个文件失败不影响其他文件
+
+    Raises:
+        NotFoundException: 未配置知识库或知识库路径不存在时
+    """
+    vault_path = await aget_vault_path()
+    vault_root = await run_io(vault_path.resolve)
+    semaphore = asyncio.Semaphore(max(1, io_executor.max_workers // 2))
+
+    def read_one(relative_path: str) -> FileReadResult:
+        return _read_file_at(_resolve_in_vault(vault_path, vault_root, relative_path), relative_path)
+
+    async def task(index: int, relative_path: str) -> tuple[int, FileReadResult | BaseBusinessException]:
+        async with semaphore:
+            try:
+                return index, await run_io(read_one, relative_path)
+            except BaseBusinessException as e:
+                return index, e
+            except OSError as e:
+                logger.warning(f"批量读取文件失败: {relative_path} | {e}")
+                return index, BaseBusinessException(f"读取文件失败: {e}", error_code="READ_FAILED")
+
+    tasks = [asyncio.ensure_future(task(index, path)) for index, path in enumerate(relative_paths)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        # 客户端提前断开时取消尚未开始的读取
+        for pending in tasks:
+            pending.cancel()
+
+
+async def awrite_file(relative_path: str, content: str, expected_etag: str | None = None) -> FileWriteResult:
+    """异步写入知识库文件内容（在 I/O 线程池中执行）"""
+    return await run_io(write_file, relative_path, content, expected_etag)
+
+
+async def apatch_file(
+    relative_path: str,
+    base_version: str,
+    edits: list[tuple[int, int, str]],
+    by_line: bool = False,
+    utf16: bool = False
+) -> FileWriteResult:
+    """异步局部更新知识库文件（在 I/O 线程池中执行）"""
+    return await run_io(patch_file, relative_path, base_version, edits, by_line, utf16)
+
+
+async def aget_file_stat(relative_path: str) -> os.stat_result:
+    """异步获取知识库文件状态（在 I/O 线程池中执行）"""
+    return await run_io(get_file_stat, relative_path)
+
+
+async def aget_vault_path() -> Path:
+    """异步获取知识库路径（在 I/O 线程池中执行）"""
+    return await run_io(get_vault_path)
@@ -1,11 +1,51 @@
 """
 流式响应工具函数 - 提供通用的流式响应处理
 """
+import threading
+import time
+
 from ..schemas import StreamChunk, StreamComplete, StreamError
 from ..core.error_handler import log_exception
 from collections.abc import Callable, AsyncGenerator
 
 
+class StreamActivity:
+    """进行中的流式响应计数（后台维护任务据此避开交互高峰）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.last_finished_at = 0.0
+
+    def enter(self) -> None:
+        """流式响应开始"""
+        with self._lock:
+            self.active += 1
+
+    def exit(self) -> None:
+        """流式响应结束"""
+        with self._lock:
+            self.active -= 1
+            self.last_finished_at = time.monotonic()
+
+    def is_idle(self, quiet: float = 0.0) -> bool:
+        """
+        判断当前是否空闲
+
+        Args:
+            quiet: 最近一次流式响应结束后需要经过的时间（秒）
+
+        Returns:
+            没有进行中的流式响应且已安静 quiet 秒时返回 True
+        """
+        with self._lock:
+            return self.active == 0 and time.monotonic() - self.last_finished_at >= quiet
+
+
+# 全局流式响应计数
+stream_activity = StreamActivity()
+
+
 
 def create_json_stream(
     stream_generator: Callable[..., AsyncGenerator[str, None]],
@@ -32,6 +72,7 @@ def create_json_stream(
     """
     async def generate() -> AsyncGenerator[str, None]:
         """内部流式生成器"""
+        stream_activity.enter()
         try:
             # ① 遍历服务层返回的纯文本
             async for chunk in stream_generator(*args, **kwargs):
@@ -62,5 +103,7 @@ def create_json_stream(
 
             error_model = StreamError(message=error_message)
             yield error_model.model_dump_json() + "\n"
+        finally:
+            stream_activity.exit()
     
     return generate
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""
+文本处理工具函数
+提供中英文混排文本的分词（中文按二元组切分，英文数字按单词切分）与文件编码探测
+"""
+import codecs
+import re
+
+# 中日韩统一表意文字及常用扩展区
+_CJK_RANGES = (
+    r'\u3400-\u4dbf'
+    r'\u4e00-\u9fff'
+    r'\uf900-\ufaff'
+    r'\u3040-\u30ff'  # 日文假名
+    r'\uac00-\ud7af'  # 韩文音节
+)
+
+# 一段连续的中日韩字符，或一个英文/数字单词
+_TOKEN_PATTERN = re.compile(rf'([{_CJK_RANGES}]+)|[0-9A-Za-z_]+(?:[\'.-][0-9A-Za-z_]+)*')
+_CJK_PATTERN = re.compile(rf'[{_CJK_RANGES}]')
+_CJK_RUN_PATTERN = re.compile(rf'[{_CJK_RANGES}]+')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def is_cjk(char: str) -> bool:
+    """
+    判断字符是否为中日韩字符
+
+    Args:
+        char: 单个字符
+
+    Returns:
+        是否为中日韩字符
+    """
+    return bool(_CJK_PATTERN.match(char))
+
+
+def count_cjk(text: str) -> int:
+    """
+    统计文本中的中日韩字符数
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        中日韩字符数
+    """
+    return sum(len(run) for run in _CJK_RUN_PATTERN.findall(text))
+
+
+def count_words(text: str) -> tuple[int, int, int]:
+    """
+    中英文混排字数统计
+
+    每个中日韩字符计为一个字，英文和数字按单词计数
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        (字数, 非空白字符数, 中日韩字符数)
+    """
+    words = 0
+    cjk = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        if match.lastindex:
+            cjk += len(match.group())
+        else:
+            words += 1
+    chars = len(text) - sum(len(run) for run in _WHITESPACE_PATTERN.findall(text))
+    return words + cjk, chars, cjk
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    中英文混排分词
+
+    英文和数字按单词切分并转为小写；中日韩字符按相邻二元组切分，
+    单个汉字的片段保留为单字。
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项列表（保留重复，用于统计词频）
+    """
+    tokens: list[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        segment = match.group()
+        if match.lastindex:
+            if len(segment) == 1:
+                tokens.append(segment)
+            else:
+                tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+        else:
+            tokens.append(segment.lower())
+    return tokens
+
+
+# UTF-8 之外的回退编码（GB18030 兼容 GBK，且能严格校验字节序列）
+_FALLBACK_ENCODING = 'gb18030'
+
+# 字节序标记与对应编码
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(data: bytes, final: bool = True) -> str | None:
+    """
+    探测字节内容的文本编码
+
+    依次检查 BOM、UTF-8 合法性，含 NUL 字节的非 UTF-8 内容视为二进制，
+    其余按 GB18030 校验
+
+    Args:
+        data: 文件内容或文件开头的采样
+        final: data 是否为完整内容；为 False 时允许末尾出现被截断的多字节字符
+
+    Returns:
+        编码名称，无法识别为文本（如二进制文件）时返回 None
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(data, final)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if b'\x00' in data:
+        return None
+
+    try:
+        codecs.getincrementaldecoder(_FALLBACK_ENCODING)().decode(data, final)
+        return _FALLBACK_ENCODING
+    except UnicodeDecodeError:
+        return None
+
+
+def normalize_newlines(text: str) -> str:
+    """
+    统一换行符为 \n（与文本模式读取的通用换行一致）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        换行符统一后的文本
+    """
+    if '\r' not in text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def detect_newline(text: str) -> str:
+    """
+    探测文本使用的换行符（以第一个换行为准）
+
+    Args:
+        text: 未经换行符统一的文本
+
+    Returns:
+        '\r\n'、'\r' 或 '\n'；没有换行时返回 '\n'
+    """
+    index = text.find('\r')
+    if index == -1:
+        return '\n'
+    if 0 <= text.find('\n') < index:
+        return '\n'
+    return '\r\n' if text.startswith('\n', index + 1) else '\r'
+
+
+def decode_text(data: bytes) -> tuple[str, str | None]:
+    """
+    探测编码并解码完整的文件内容，换行符统一为 \n
+
+    探测与解码合并进行：UTF-8 文件只解码一次，GBK 文件最多再解码一次
+
+    Args:
+        data: 完整的文件内容
+
+    Returns:
+        (解码后的文本, 编码名称)，无法识别为文本时返回 ("", None)
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            try:
+                return normalize_newlines(data.decode(encoding)), encoding
+            except UnicodeDecodeError:
+                return "", None
+
+    try:
+        return normalize_newlines(data.decode('utf-8')), 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if b'\x00' in data:
+        return "", None
+
+    try:
+        return normalize_newlines(data.decode(_FALLBACK_ENCODING)), _FALLBACK_ENCODING
+    except UnicodeDecodeError:
+        return "", None
+
+
+def utf16_to_codepoint_offsets(text: str, offsets: list[int]) -> dict[int, int]:
+    """
+    把 UTF-16 码元偏移（JavaScript 字符串下标）转换为 Unicode 码点偏移
+
+    Args:
+        text: 文本
+        offsets: UTF-16 码元偏移列表
+
+    Returns:
+        {UTF-16 偏移: 码点偏移}；超出文本末尾的偏移原样保留，由调用方做越界检查
+
+    Raises:
+        ValueError: 偏移落在代理对（如 emoji）中间时
+    """
+    # 不含辅助平面字符时两种偏移相同
+    if not text or max(text) <= '\uffff':
+        return {offset: offset for offset in offsets}
+
+    result: dict[int, int] = {}
+    pending = sorted(set(offsets))
+    index = 0
+    units = 0
+    for position, char in enumerate(text):
+        while index < len(pending) and pending[index] <= units:
+            if pending[index] < units:
+                raise ValueError(f"偏移位于代理对中间: {pending[index]}")
+            result[pending[index]] = position
+            index += 1
+        if index == len(pending):
+            return result
+        units += 2 if char > '\uffff' else 1
+
+    for offset in pending[index:]:
+        if offset < units:
+            raise ValueError(f"偏移位于代理对中间: {offset}")
+        result[offset] = len(text) + offset - units
+    return result
+
+
+def apply_edits(
+    text: str,
+    edits: list[tuple[int, int, str]],
+    by_line: bool = False,
+    utf16: bool = False
+) -> str:
+    """
+    将一组编辑操作应用到文本
+
+    所有区间都相对于原始文本，互不重叠；同一位置的多个插入按传入顺序排列
+
+    Args:
+        text: 原始文本
+        edits: (start, end, replacement) 列表，表示把 [start, end) 替换为 replacement
+        by_line: 为 True 时 start/end 为行号（按 \n 分行，从 0 开始），否则为字符偏移
+        utf16: 字符偏移是否按 UTF-16 码元计算（JavaScript 客户端），否则按 Unicode 码点
+
+    Returns:
+        编辑后的文本
+
+    Raises:
+        ValueError: 区间越界、倒置、相互重叠或落在代理对中间时
+    """
+    if utf16 and not by_line:
+        mapping = utf16_to_codepoint_offsets(text, [offset for start, end, _ in edits for offset in (start, end)])
+        edits = [(mapping[start], mapping[end], replacement) for start, end, replacement in edits]
+
+    if by_line:
+        line_starts = [0] + [match.end() for match in re.finditer('\n', text)]
+        if line_starts[-1] != len(text):
+            line_starts.append(len(text))
+
+        def to_offset(line: int) -> int:
+            if line >= len(line_starts):
+                raise ValueError(f"行号超出范围: {line}")
+            return line_starts[line]
+
+        edits = [(to_offset(start), to_offset(end), replacement) for start, end, replacement in edits]
+
+    parts: list[str] = []
+    position = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        if end < start or end > len(text):
+            raise ValueError(f"编辑区间无效: [{start}, {end})")
+        if start < position:
+            raise ValueError(f"编辑区间重叠: [{start}, {end})")
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
@@ -20,6 +20,47 @@ export const getFileTree = async () => {
   return response.data;
 };
 
+/**
+ * 以紧凑格式获取完整文件树，并在客户端还原为与 getFileTree 相同的嵌套结构
+ * 紧凑格式：names / parents（父节点下标，根目录下为 -1）/ flags（1 表示目录）平行数组
+ */
+export const getFileTreeCompact = async () => {
+  const response = await apiClient.get('/knowledge/tree', {
+    params: { format: 'compact' },
+  });
+  const { names, parents, flags } = response.data.data;
+
+  // 父节点下标总小于子节点，顺序遍历即可逐个挂载
+  const nodes = new Array(names.length);
+  const tree = [];
+  for (let i = 0; i < names.length; i += 1) {
+    const parent = parents[i] >= 0 ? nodes[parents[i]] : null;
+    const isDir = (flags[i] & 1) === 1;
+    const node = {
+      key: parent ? `${parent.key}/${names[i]}` : names[i],
+      title: names[i],
+      is_leaf: !isDir,
+      children: isDir ? [] : null,
+    };
+    nodes[i] = node;
+    (parent ? parent.children : tree).push(node);
+  }
+
+  return { ...response.data, data: { tree } };
+};
+
+/**
+ * 分层获取知识库目录（按需展开）
+ * @param {string} path - 目录相对路径，空字符串表示根目录
+ * @param {object} options - 可选参数 { depth, cursor, limit }
+ */
+export const getTreeLevel = async (path = '', options = {}) => {
+  const response = await apiClient.get('/knowledge/tree', {
+    params: { path, ...options },
+  });
+  return response.data;
+};
+
 /**
  * 读取文件内容
  * @param {string} relativePath - 相对路径
@@ -29,6 +70,28 @@ export const getFileContent = async (relativePath) => {
   return response.data;
 };
 
+/**
+ * 读取文件原始内容（流式传输，支持按字节区间分段读取）
+ * @param {string} relativePath - 相对路径
+ * @param {object} range - 可选字节区间 { start, end }，end 为闭区间
+ * @returns {Promise<{ content: string, encoding: string, contentRange: string | undefined }>}
+ */
+export const getFileRaw = async (relativePath, range) => {
+  const headers = {};
+  if (range) {
+    headers.Range = `bytes=${range.start}-${range.end ?? ''}`;
+  }
+  const response = await apiClient.get(`/knowledge/raw/${relativePath}`, {
+    headers,
+    responseType: 'text',
+  });
+  return {
+    content: response.data,
+    encoding: response.headers['x-file-encoding'],
+    contentRange: response.headers['content-range'],
+  };
+};
+
 /**
  * 更新文件内容
  * @param {string} relativePath - 相对路径
@@ -38,3 +101,30 @@ export const updateFileContent = async (relativePath, content) => {
   const response = await apiClient.put(`/knowledge/file/${relativePath}`, { content });
   return response.data;
 };
+
+/**
+ * 局部更新文件内容
+ * @param {string} relativePath - 相对路径
+ * @param {string} baseVersion - 编辑所基于的版本（读取文件时返回的 ETag）
+ * @param {Array<{start: number, end: number, text: string}>} edits - 编辑操作，区间相对于基准版本
+ * @param {string} mode - 'offset' 按字符偏移（JavaScript 字符串下标，即 UTF-16 码元），'line' 按行号
+ * @returns {Promise<{ data: object, version: string }>} version 为新版本，可用于下一次局部更新
+ */
+export const patchFileContent = async (relativePath, baseVersion, edits, mode = 'offset') => {
+  const response = await apiClient.patch(`/knowledge/file/${relativePath}`, {
+    base_version: baseVersion,
+    mode,
+    edits,
+  });
+  return { data: response.data, version: response.headers.etag };
+};
+
+/**
+ * 批量读取文件内容
+ * @param {string[]} paths - 相对路径列表（最多 200 个）
+ * @returns {Promise<object>} results 按请求顺序排列，每项包含 path、success、data 或 message
+ */
+export const getFilesBatch = async (paths) => {
+  const response = await apiClient.post('/knowledge/files:batch', { paths });
+  return response.data;
+};